@@ -129,6 +129,8 @@ async def main():
     finally:
         # 停止全局GC管理器
         await gc_manager.stop()
+        # 关闭服务器级线程池
+        ws_server.worker_pools.shutdown()
 
         # 取消所有任务（关键修复点）
         stdin_task.cancel()
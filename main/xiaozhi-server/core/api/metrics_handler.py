@@ -0,0 +1,43 @@
+import hmac
+from aiohttp import web
+from core.api.base_handler import BaseHandler
+from core.utils.metrics import render_prometheus
+
+TAG = __name__
+
+
+class MetricsHandler(BaseHandler):
+    def __init__(self, config: dict):
+        super().__init__(config)
+        metrics_config = config.get("metrics") or {}
+        self.token = str(metrics_config.get("token") or "")
+
+    def _verify_token(self, request) -> bool:
+        """配置了token时校验 Authorization: Bearer <token>"""
+        if not self.token:
+            return True
+        auth_header = request.headers.get("Authorization", "")
+        if not auth_header.startswith("Bearer "):
+            return False
+        return hmac.compare_digest(
+            auth_header[7:].encode("utf-8"), self.token.encode("utf-8")
+        )
+
+    async def handle_get(self, request):
+        """处理 /metrics GET 请求，输出 Prometheus 文本格式的运行指标"""
+        if not self._verify_token(request):
+            return web.Response(
+                text="无效的认证token", content_type="text/plain", status=401
+            )
+        try:
+            response = web.Response(
+                text=render_prometheus(),
+                content_type="text/plain",
+                headers={"Cache-Control": "no-cache"},
+            )
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"生成运行指标失败: {e}")
+            response = web.Response(
+                text="metrics接口异常", content_type="text/plain", status=500
+            )
+        return response
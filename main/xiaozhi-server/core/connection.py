@@ -26,7 +26,6 @@ from core.utils.modules_initialize import (
 )
 from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
-from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
 from core.providers.asr.dto.dto import InterfaceType
 from core.handle.textHandle import handleTextMessage
@@ -41,8 +40,16 @@ from config.manage_api_client import DeviceNotFoundException, DeviceBindExceptio
 from core.utils.prompt_manager import PromptManager
 from core.utils.voiceprint_provider import VoiceprintProvider
 from core.utils import textUtils
+from core.utils.async_pipeline import LoopQueue, is_async_pipeline_enabled
+from core.utils.worker_pool import get_worker_pools, PoolRejectedError
+from core.utils.latency_trace import get_latency_tracer, mark_stage
+from core.utils.metrics import get_server_metrics
 
 TAG = __name__
+# LLM提供商出错时不抛出异常，而是以包含该标记的文本回复（例如【OpenAI服务响应异常: ...】）
+LLM_ERROR_MARKER = "服务响应异常"
+# LLM线程池饱和、本轮对话无法提交时的回复
+BUSY_REPLY = "当前使用的人比较多，请稍后再试一下"
 
 auto_import_modules("plugins_func.functions")
 
@@ -51,6 +58,19 @@ class TTSException(RuntimeError):
     pass
 
 
+class _ChatTurn:
+    """一次LLM流式回复的处理状态，chat与achat共用"""
+
+    def __init__(self):
+        self.tool_call_flag = False
+        # 支持多个并行工具调用 - 使用列表存储
+        self.tool_calls_list = []  # 格式: [{"id": "", "name": "", "arguments": ""}]
+        self.content_arguments = ""
+        self.response_message = []
+        self.emotion_flag = True
+        self.error_recorded = False
+
+
 class ConnectionHandler:
     def __init__(
         self,
@@ -94,7 +114,19 @@ class ConnectionHandler:
         # 线程任务相关
         self.loop = None  # 在 handle_connection 中获取运行中的事件循环
         self.stop_event = threading.Event()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # 阻塞任务统一提交到服务器级共享线程池
+        self.worker_pools = (
+            server.worker_pools
+            if server is not None and hasattr(server, "worker_pools")
+            else get_worker_pools(config)
+        )
+        # 异步流水线模式：队列由协程消费，不再为每个连接创建线程
+        self.async_pipeline = is_async_pipeline_enabled(self.config)
+        self.pipeline_tasks = []
+        # 异步流水线模式下进行中的对话协程
+        self.chat_tasks = set()
+        # 当前对话轮次的延迟追踪
+        self.turn_trace = None
 
         # 添加上报线程池
         self.report_queue = queue.Queue()
@@ -118,6 +150,7 @@ class ConnectionHandler:
 
         # vad相关变量
         self.client_audio_buffer = bytearray()
+        self.vad_state = None  # 每个连接独立的VAD解码器和模型状态
         self.client_have_voice = False
         self.client_voice_window = deque(maxlen=5)
         self.first_activity_time = 0.0  # 记录首次活动的时间（毫秒）
@@ -129,6 +162,8 @@ class ConnectionHandler:
         # 因为实际部署时可能会用到公共的本地ASR，不能把变量暴露给公共ASR
         # 所以涉及到ASR的变量，需要在这里定义，属于connection的私有变量
         self.asr_audio = []
+        # 本地ASR分段识别状态
+        self.asr_partial = None
         self.asr_audio_queue = queue.Queue()
 
         # llm相关变量
@@ -169,6 +204,9 @@ class ConnectionHandler:
         try:
             # 获取运行中的事件循环（必须在异步上下文中）
             self.loop = asyncio.get_running_loop()
+            if self.async_pipeline:
+                self.asr_audio_queue = LoopQueue(self.loop)
+                self.report_queue = LoopQueue(self.loop)
 
             # 获取并验证headers
             self.headers = dict(ws.request.headers)
@@ -237,7 +275,7 @@ class ConnectionHandler:
         """保存记忆并关闭连接"""
         try:
             if self.memory:
-                # 使用线程池异步保存记忆
+                # 使用后台线程池异步保存记忆
                 def save_memory_task():
                     try:
                         # 创建新事件循环（避免与主循环冲突）
@@ -254,8 +292,8 @@ class ConnectionHandler:
                         except Exception:
                             pass
 
-                # 启动线程保存记忆，不等待完成
-                threading.Thread(target=save_memory_task, daemon=True).start()
+                # 提交到后台线程池保存记忆，不等待完成
+                self.submit_task("background", save_memory_task)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"Memory saving failed: {e}")
         finally:
@@ -311,7 +349,7 @@ class ConnectionHandler:
                     return
 
             # 不需要头部处理或没有头部时，直接处理原始消息
-            self.asr_audio_queue.put(message)
+            self.asr_audio_queue.put_nowait(message)
 
     async def _process_mqtt_audio_message(self, message):
         """
@@ -338,7 +376,7 @@ class ConnectionHandler:
             elif len(message) > 16:
                 # 没有指定长度或长度无效，去掉头部后处理剩余数据
                 audio_data = message[16:]
-                self.asr_audio_queue.put(audio_data)
+                self.asr_audio_queue.put_nowait(audio_data)
                 return True
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"Failed to parse WebSocket audio packets: {e}")
@@ -356,7 +394,7 @@ class ConnectionHandler:
 
         # 如果时间戳是递增的，直接处理
         if timestamp >= self.last_processed_timestamp:
-            self.asr_audio_queue.put(audio_data)
+            self.asr_audio_queue.put_nowait(audio_data)
             self.last_processed_timestamp = timestamp
 
             # 处理缓冲区中的后续包
@@ -366,7 +404,7 @@ class ConnectionHandler:
                 for ts in sorted(self.audio_timestamp_buffer.keys()):
                     if ts > self.last_processed_timestamp:
                         buffered_audio = self.audio_timestamp_buffer.pop(ts)
-                        self.asr_audio_queue.put(buffered_audio)
+                        self.asr_audio_queue.put_nowait(buffered_audio)
                         self.last_processed_timestamp = ts
                         processed_any = True
                         break
@@ -375,7 +413,7 @@ class ConnectionHandler:
             if len(self.audio_timestamp_buffer) < self.max_timestamp_buffer_size:
                 self.audio_timestamp_buffer[timestamp] = audio_data
             else:
-                self.asr_audio_queue.put(audio_data)
+                self.asr_audio_queue.put_nowait(audio_data)
 
     async def handle_restart(self, message):
         """处理服务器重启请求"""
@@ -493,6 +531,10 @@ class ConnectionHandler:
             return
         if self.chat_history_conf == 0:
             return
+        if self.async_pipeline:
+            self.spawn_pipeline_task(self._report_task)
+            self.logger.bind(tag=TAG).info("TTS reporting task has been started")
+            return
         if self.report_thread is None or not self.report_thread.is_alive():
             self.report_thread = threading.Thread(
                 target=self._report_worker, daemon=True
@@ -549,8 +591,9 @@ class ConnectionHandler:
         try:
             # 异步获取差异化配置
             await self._initialize_private_config_async()
-            # 在线程池中初始化组件
-            self.executor.submit(self._initialize_components)
+            # 在线程池中初始化组件，线程池饱和时拒绝本次连接
+            if self.submit_task("background", self._initialize_components) is None:
+                await self.close(self.websocket)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"Background initialization failed: {e}")
 
@@ -658,10 +701,10 @@ class ConnectionHandler:
         if private_config.get("context_providers", None) is not None:
             self.config["context_providers"] = private_config["context_providers"]
 
-        # 使用 run_in_executor 在线程池中执行 initialize_modules，避免阻塞主循环
+        # 在后台线程池中执行 initialize_modules，避免阻塞主循环
         try:
-            modules = await self.loop.run_in_executor(
-                None,  # 使用默认线程池
+            modules = await self.worker_pools.run(
+                "background",
                 initialize_modules,
                 self.logger,
                 private_config,
@@ -784,7 +827,17 @@ class ConnectionHandler:
         # 更新系统prompt至上下文
         self.dialogue.update_system_message(self.prompt)
 
-    def chat(self, query, depth=0):
+    def start_chat(self, query):
+        """开始一轮对话：异步流水线模式下在事件循环中进行，否则提交到LLM线程池"""
+        if self.async_pipeline:
+            task = self.loop.create_task(self.achat(query))
+            self.chat_tasks.add(task)
+            task.add_done_callback(self.chat_tasks.discard)
+        else:
+            self.submit_chat_task(self.chat, query)
+
+    def _prepare_chat(self, query, depth):
+        """chat与achat共用：开始新一轮对话、检查递归深度，返回本次请求可用的functions"""
         if query is not None:
             self.logger.bind(tag=TAG).info(f"LLM received user message: {query}")
 
@@ -827,7 +880,130 @@ class ConnectionHandler:
             and not force_final_answer
         ):
             functions = self.func_handler.get_functions()
-        response_message = []
+        return functions
+
+    def _handle_llm_response(self, turn, response, functions):
+        """处理一条流式响应：累积工具调用、发送情绪和文本到TTS"""
+        mark_stage(self, "llm_first_token")
+        if self.intent_type == "function_call" and functions is not None:
+            content, tools_call = response
+            if "content" in response:
+                content = response["content"]
+                tools_call = None
+            if content is not None and len(content) > 0:
+                turn.content_arguments += content
+
+            if not turn.tool_call_flag and turn.content_arguments.startswith(
+                "<tool_call>"
+            ):
+                turn.tool_call_flag = True
+
+            if tools_call is not None and len(tools_call) > 0:
+                turn.tool_call_flag = True
+                self._merge_tool_calls(turn.tool_calls_list, tools_call)
+        else:
+            content = response
+
+        # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
+        if turn.emotion_flag and content is not None and content.strip():
+            asyncio.run_coroutine_threadsafe(
+                textUtils.get_emotion(self, content),
+                self.loop,
+            )
+            turn.emotion_flag = False
+
+        if content is not None and len(content) > 0:
+            if not turn.error_recorded and LLM_ERROR_MARKER in content:
+                turn.error_recorded = True
+                get_server_metrics().record_provider_error("llm", self.llm)
+            if not turn.tool_call_flag:
+                turn.response_message.append(content)
+                self.tts.tts_text_queue.put(
+                    TTSMessageDTO(
+                        sentence_id=self.sentence_id,
+                        sentence_type=SentenceType.MIDDLE,
+                        content_type=ContentType.TEXT,
+                        content_detail=content,
+                    )
+                )
+
+    def _collect_tool_calls(self, turn):
+        """流式响应结束后整理工具调用，返回需要执行的工具调用列表"""
+        if not turn.tool_call_flag:
+            return []
+        tool_calls_list = turn.tool_calls_list
+        response_message = turn.response_message
+        content_arguments = turn.content_arguments
+        bHasError = False
+        # 处理基于文本的工具调用格式
+        if len(tool_calls_list) == 0 and content_arguments:
+            a = extract_json_from_string(content_arguments)
+            if a is not None:
+                try:
+                    content_arguments_json = json.loads(a)
+                    tool_calls_list.append(
+                        {
+                            "id": str(uuid.uuid4().hex),
+                            "name": content_arguments_json["name"],
+                            "arguments": json.dumps(
+                                content_arguments_json["arguments"],
+                                ensure_ascii=False,
+                            ),
+                        }
+                    )
+                except Exception as e:
+                    bHasError = True
+                    response_message.append(a)
+            else:
+                bHasError = True
+                response_message.append(content_arguments)
+            if bHasError:
+                self.logger.bind(tag=TAG).error(
+                    f"function call error: {content_arguments}"
+                )
+
+        if bHasError or len(tool_calls_list) == 0:
+            return []
+
+        # 如需要大模型先处理一轮，添加相关处理后的日志情况
+        if len(response_message) > 0:
+            text_buff = "".join(response_message)
+            self.tts_MessageText = text_buff
+            self.dialogue.put(Message(role="assistant", content=text_buff))
+        response_message.clear()
+
+        self.logger.bind(tag=TAG).debug(f"检测到 {len(tool_calls_list)} 个工具调用")
+        for tool_call_data in tool_calls_list:
+            self.logger.bind(tag=TAG).debug(
+                f"function_name={tool_call_data['name']}, function_id={tool_call_data['id']}, function_arguments={tool_call_data['arguments']}"
+            )
+        return tool_calls_list
+
+    def _finish_chat(self, turn, depth):
+        """存储本轮回复，最顶层时发送LAST请求"""
+        # 存储对话内容
+        if len(turn.response_message) > 0:
+            text_buff = "".join(turn.response_message)
+            self.tts_MessageText = text_buff
+            self.dialogue.put(Message(role="assistant", content=text_buff))
+        if depth == 0:
+            self.tts.tts_text_queue.put(
+                TTSMessageDTO(
+                    sentence_id=self.sentence_id,
+                    sentence_type=SentenceType.LAST,
+                    content_type=ContentType.ACTION,
+                )
+            )
+            self.llm_finish_task = True
+            # 使用lambda延迟计算，只有在DEBUG级别时才执行get_llm_dialogue()
+            self.logger.bind(tag=TAG).debug(
+                lambda: json.dumps(
+                    self.dialogue.get_llm_dialogue(), indent=4, ensure_ascii=False
+                )
+            )
+
+    def chat(self, query, depth=0):
+        functions = self._prepare_chat(query, depth)
 
         try:
             # 使用带记忆的对话
@@ -837,6 +1013,7 @@ class ConnectionHandler:
                     self.memory.query_memory(query), self.loop
                 )
                 memory_str = future.result()
+                mark_stage(self, "memory_query")
 
             if self.intent_type == "function_call" and functions is not None:
                 # 使用支持functions的streaming接口
@@ -856,146 +1033,108 @@ class ConnectionHandler:
                 )
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"LLM Error processing {query}: {e}")
+            get_server_metrics().record_provider_error("llm", self.llm)
             return None
 
         # 处理流式响应
-        tool_call_flag = False
-        # 支持多个并行工具调用 - 使用列表存储
-        tool_calls_list = []  # 格式: [{"id": "", "name": "", "arguments": ""}]
-        content_arguments = ""
+        turn = _ChatTurn()
         self.client_abort = False
-        emotion_flag = True
         for response in llm_responses:
             if self.client_abort:
                 break
-            if self.intent_type == "function_call" and functions is not None:
-                content, tools_call = response
-                if "content" in response:
-                    content = response["content"]
-                    tools_call = None
-                if content is not None and len(content) > 0:
-                    content_arguments += content
-
-                if not tool_call_flag and content_arguments.startswith("<tool_call>"):
-                    # print("content_arguments", content_arguments)
-                    tool_call_flag = True
-
-                if tools_call is not None and len(tools_call) > 0:
-                    tool_call_flag = True
-                    self._merge_tool_calls(tool_calls_list, tools_call)
-            else:
-                content = response
+            self._handle_llm_response(turn, response, functions)
 
-            # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
-            if emotion_flag and content is not None and content.strip():
-                asyncio.run_coroutine_threadsafe(
-                    textUtils.get_emotion(self, content),
+        # 处理function call
+        tool_calls_list = self._collect_tool_calls(turn)
+        if tool_calls_list:
+            # 收集所有工具调用的 Future
+            futures_with_data = []
+            for tool_call_data in tool_calls_list:
+                future = asyncio.run_coroutine_threadsafe(
+                    self.func_handler.handle_llm_function_call(self, tool_call_data),
                     self.loop,
                 )
-                emotion_flag = False
+                futures_with_data.append((future, tool_call_data))
 
-            if content is not None and len(content) > 0:
-                if not tool_call_flag:
-                    response_message.append(content)
-                    self.tts.tts_text_queue.put(
-                        TTSMessageDTO(
-                            sentence_id=self.sentence_id,
-                            sentence_type=SentenceType.MIDDLE,
-                            content_type=ContentType.TEXT,
-                            content_detail=content,
-                        )
-                    )
-        # 处理function call
-        if tool_call_flag:
-            bHasError = False
-            # 处理基于文本的工具调用格式
-            if len(tool_calls_list) == 0 and content_arguments:
-                a = extract_json_from_string(content_arguments)
-                if a is not None:
-                    try:
-                        content_arguments_json = json.loads(a)
-                        tool_calls_list.append(
-                            {
-                                "id": str(uuid.uuid4().hex),
-                                "name": content_arguments_json["name"],
-                                "arguments": json.dumps(
-                                    content_arguments_json["arguments"],
-                                    ensure_ascii=False,
-                                ),
-                            }
-                        )
-                    except Exception as e:
-                        bHasError = True
-                        response_message.append(a)
-                else:
-                    bHasError = True
-                    response_message.append(content_arguments)
-                if bHasError:
-                    self.logger.bind(tag=TAG).error(
-                        f"function call error: {content_arguments}"
-                    )
+            # 等待协程结束（实际等待时长为最慢的那个）
+            tool_results = []
+            for future, tool_call_data in futures_with_data:
+                result = future.result()
+                tool_results.append((result, tool_call_data))
 
-            if not bHasError and len(tool_calls_list) > 0:
-                # 如需要大模型先处理一轮，添加相关处理后的日志情况
-                if len(response_message) > 0:
-                    text_buff = "".join(response_message)
-                    self.tts_MessageText = text_buff
-                    self.dialogue.put(Message(role="assistant", content=text_buff))
-                response_message.clear()
+            # 统一处理所有工具调用结果
+            if tool_results and self._handle_function_result(tool_results):
+                self.chat(None, depth=depth + 1)
 
-                self.logger.bind(tag=TAG).debug(
-                    f"检测到 {len(tool_calls_list)} 个工具调用"
-                )
-
-                # 收集所有工具调用的 Future
-                futures_with_data = []
-                for tool_call_data in tool_calls_list:
-                    self.logger.bind(tag=TAG).debug(
-                        f"function_name={tool_call_data['name']}, function_id={tool_call_data['id']}, function_arguments={tool_call_data['arguments']}"
-                    )
-
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.func_handler.handle_llm_function_call(
-                            self, tool_call_data
-                        ),
-                        self.loop,
-                    )
-                    futures_with_data.append((future, tool_call_data))
+        self._finish_chat(turn, depth)
+        return True
 
-                # 等待协程结束（实际等待时长为最慢的那个）
-                tool_results = []
-                for future, tool_call_data in futures_with_data:
-                    result = future.result()
-                    tool_results.append((result, tool_call_data))
+    async def achat(self, query, depth=0):
+        """chat的异步版本，在事件循环中运行，直接等待记忆查询、LLM流式输出和工具调用"""
+        functions = self._prepare_chat(query, depth)
 
-                # 统一处理所有工具调用结果
-                if tool_results:
-                    self._handle_function_result(tool_results, depth=depth)
+        try:
+            # 使用带记忆的对话
+            memory_str = None
+            if self.memory is not None:
+                memory_str = await self.memory.query_memory(query)
+                mark_stage(self, "memory_query")
 
-        # 存储对话内容
-        if len(response_message) > 0:
-            text_buff = "".join(response_message)
-            self.tts_MessageText = text_buff
-            self.dialogue.put(Message(role="assistant", content=text_buff))
-        if depth == 0:
-            self.tts.tts_text_queue.put(
-                TTSMessageDTO(
-                    sentence_id=self.sentence_id,
-                    sentence_type=SentenceType.LAST,
-                    content_type=ContentType.ACTION,
-                )
+            dialogue = self.dialogue.get_llm_dialogue_with_memory(
+                memory_str, self.config.get("voiceprint", {})
             )
-            self.llm_finish_task = True
-            # 使用lambda延迟计算，只有在DEBUG级别时才执行get_llm_dialogue()
-            self.logger.bind(tag=TAG).debug(
-                lambda: json.dumps(
-                    self.dialogue.get_llm_dialogue(), indent=4, ensure_ascii=False
+            if self.intent_type == "function_call" and functions is not None:
+                llm_responses = self.llm.aresponse_with_functions(
+                    self.session_id, dialogue, functions=functions
                 )
+            else:
+                llm_responses = self.llm.aresponse(self.session_id, dialogue)
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"LLM Error processing {query}: {e}")
+            get_server_metrics().record_provider_error("llm", self.llm)
+            return None
+
+        # 处理流式响应
+        turn = _ChatTurn()
+        self.client_abort = False
+        try:
+            async for response in llm_responses:
+                if self.client_abort:
+                    break
+                self._handle_llm_response(turn, response, functions)
+        except PoolRejectedError as e:
+            # 只有同步接口的provider需要LLM线程池；本地过载，不计入提供商失败
+            self.logger.bind(tag=TAG).warning(f"LLM Error processing {query}: {e}")
+            get_server_metrics().record_pool_rejected(e.pool)
+        except Exception as e:
+            # 流式输出中途出错时也要结束本轮，否则设备收不到结束消息
+            self.logger.bind(tag=TAG).error(f"LLM Error processing {query}: {e}")
+            get_server_metrics().record_provider_error("llm", self.llm)
+        finally:
+            # 提前结束时关闭上游的流式请求
+            await llm_responses.aclose()
+
+        # 处理function call
+        tool_calls_list = self._collect_tool_calls(turn)
+        if tool_calls_list:
+            # 并发执行所有工具调用（实际等待时长为最慢的那个）
+            results = await asyncio.gather(
+                *[
+                    self.func_handler.handle_llm_function_call(self, tool_call_data)
+                    for tool_call_data in tool_calls_list
+                ]
             )
+            tool_results = list(zip(results, tool_calls_list))
 
+            # 统一处理所有工具调用结果
+            if tool_results and self._handle_function_result(tool_results):
+                await self.achat(None, depth=depth + 1)
+
+        self._finish_chat(turn, depth)
         return True
 
-    def _handle_function_result(self, tool_results, depth):
+    def _handle_function_result(self, tool_results):
+        """处理工具调用结果，返回是否需要再次请求LLM"""
         need_llm_tools = []
 
         for result, tool_call_data in tool_results:
@@ -1047,7 +1186,7 @@ class ConnectionHandler:
                         )
                     )
 
-            self.chat(None, depth=depth + 1)
+        return bool(need_llm_tools)
 
     def _report_worker(self):
         """聊天记录上报工作线程"""
@@ -1058,11 +1197,9 @@ class ConnectionHandler:
                 if item is None:  # 检测毒丸对象
                     break
                 try:
-                    # 检查线程池状态
-                    if self.executor is None:
-                        continue
-                    # 提交任务到线程池
-                    self.executor.submit(self._process_report, *item)
+                    # 提交任务到后台线程池
+                    if self.submit_task("background", self._process_report, *item) is None:
+                        self.report_queue.task_done()
                 except Exception as e:
                     self.logger.bind(tag=TAG).error(f"Chat history reporting thread exception: {e}")
             except queue.Empty:
@@ -1072,6 +1209,64 @@ class ConnectionHandler:
 
         self.logger.bind(tag=TAG).info("The chat history reporting thread has exited")
 
+    async def _report_task(self):
+        """聊天记录上报协程（异步流水线模式）"""
+        try:
+            while not self.stop_event.is_set():
+                item = await self.report_queue.get()
+                if item is None:  # 检测毒丸对象
+                    break
+                try:
+                    await report(self, *item)
+                except Exception as e:
+                    self.logger.bind(tag=TAG).error(f"Report and process exceptions: {e}")
+                finally:
+                    self.report_queue.task_done()
+        finally:
+            self.logger.bind(tag=TAG).info("The chat history reporting task has exited")
+
+    def submit_task(self, pool_name, fn, *args):
+        """提交阻塞任务到服务器级线程池，线程池饱和时丢弃任务并返回None"""
+        try:
+            return self.worker_pools.submit(pool_name, fn, *args)
+        except PoolRejectedError:
+            self.logger.bind(tag=TAG).warning(
+                f"线程池 {pool_name} 已饱和，丢弃任务: {getattr(fn, '__name__', fn)}"
+            )
+            return None
+
+    def submit_chat_task(self, fn, *args):
+        """提交一轮对话到LLM线程池，线程池饱和时回复用户稍后再试，而不是静默丢弃本轮对话"""
+        if self.submit_task("llm", fn, *args) is not None:
+            return True
+        get_server_metrics().record_pool_rejected("llm")
+        self.sentence_id = str(uuid.uuid4().hex)
+        self.tts.tts_text_queue.put(
+            TTSMessageDTO(
+                sentence_id=self.sentence_id,
+                sentence_type=SentenceType.FIRST,
+                content_type=ContentType.ACTION,
+            )
+        )
+        self.tts.tts_one_sentence(self, ContentType.TEXT, content_detail=BUSY_REPLY)
+        self.tts.tts_text_queue.put(
+            TTSMessageDTO(
+                sentence_id=self.sentence_id,
+                sentence_type=SentenceType.LAST,
+                content_type=ContentType.ACTION,
+            )
+        )
+        return False
+
+    def spawn_pipeline_task(self, coro_func, *args):
+        """在事件循环中启动流水线协程，可在任意线程调用，连接关闭时统一取消"""
+
+        def _start():
+            if not self.stop_event.is_set():
+                self.pipeline_tasks.append(self.loop.create_task(coro_func(*args)))
+
+        self.loop.call_soon_threadsafe(_start)
+
     def _process_report(self, type, text, audio_data, report_time):
         """处理上报任务"""
         try:
@@ -1116,6 +1311,12 @@ class ConnectionHandler:
             if self.stop_event:
                 self.stop_event.set()
 
+            # 取消异步流水线中的消费协程和进行中的对话
+            for task in [*self.pipeline_tasks, *self.chat_tasks]:
+                if not task.done():
+                    task.cancel()
+            self.pipeline_tasks.clear()
+
             # 清空任务队列
             self.clear_queues()
 
@@ -1158,15 +1359,15 @@ class ConnectionHandler:
             if self.tts:
                 await self.tts.close()
 
-            # 最后关闭线程池（避免阻塞）
-            if self.executor:
-                try:
-                    self.executor.shutdown(wait=False)
-                except Exception as executor_error:
-                    self.logger.bind(tag=TAG).error(
-                        f"Error closing thread pool: {executor_error}"
-                    )
-                self.executor = None
+            # 释放LLM provider为本连接保存的会话状态
+            if self.llm:
+                self.llm.release_session(self.session_id)
+
+            # 连接在回复过程中关闭时，输出已记录的阶段
+            if self.turn_trace is not None and not self.turn_trace.finished:
+                self.turn_trace.interrupted = True
+                get_latency_tracer().finish(self.turn_trace)
+
             self.logger.bind(tag=TAG).info("Connection resources released")
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"Error closing connection: {e}")
@@ -1196,6 +1397,9 @@ class ConnectionHandler:
                     except queue.Empty:
                         break
 
+            # 丢弃尚未播放的预合成句子
+            self.tts.cancel_lookahead()
+
             # 重置音频流控器（取消后台任务并清空队列）
             if hasattr(self, "audio_rate_controller") and self.audio_rate_controller:
                 self.audio_rate_controller.reset()
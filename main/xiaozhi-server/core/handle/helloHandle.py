@@ -134,7 +134,7 @@ async def wakeupWordsResponse(conn):
             return
 
         # 生成TTS音频
-        tts_result = await asyncio.to_thread(conn.tts.to_tts, result)
+        tts_result = await conn.worker_pools.run("transcode", conn.tts.to_tts, result)
         if not tts_result:
             return
 
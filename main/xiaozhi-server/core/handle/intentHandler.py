@@ -7,6 +7,7 @@ from core.handle.helloHandle import checkWakeupWords
 from plugins_func.register import Action, ActionResponse
 from core.handle.sendAudioHandle import send_stt_message
 from core.utils.util import remove_punctuation_and_length
+from core.utils.intent_classifier import classify_fast_intent
 from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType
 
 TAG = __name__
@@ -35,8 +36,12 @@ async def handle_user_intent(conn, text):
     if conn.intent_type == "function_call":
         # 使用支持function calling的聊天方法,不再进行意图分析
         return False
-    # 使用LLM进行意图分析
-    intent_result = await analyze_intent_with_llm(conn, text)
+    # 常用指令先在本地识别，置信度不足时再使用LLM进行意图分析
+    intent_result = None
+    if conn.intent_type == "intent_llm":
+        intent_result = classify_fast_intent(conn, text)
+    if intent_result is None:
+        intent_result = await analyze_intent_with_llm(conn, text)
     if not intent_result:
         return False
     # 会话开始时生成sentence_id
@@ -112,7 +117,7 @@ async def process_intent_result(conn, intent_result, original_text):
                     response = conn.intent.replyResult(context_prompt, original_text)
                     speak_txt(conn, response)
                 
-                conn.executor.submit(process_context_result)
+                conn.submit_chat_task(process_context_result)
                 return True
 
             function_args = {}
@@ -180,7 +185,7 @@ async def process_intent_result(conn, intent_result, original_text):
                             speak_txt(conn, text)
 
             # 将函数执行放在线程池中
-            conn.executor.submit(process_function_call)
+            conn.submit_chat_task(process_function_call)
             return True
         return False
     except json.JSONDecodeError as e:
@@ -5,6 +5,7 @@ from core.utils.util import audio_to_data
 from core.handle.abortHandle import handleAbortMessage
 from core.handle.intentHandler import handle_user_intent
 from core.utils.output_counter import check_device_output_limit
+from core.utils.latency_trace import mark_stage
 from core.handle.sendAudioHandle import send_stt_message, SentenceType
 
 TAG = __name__
@@ -12,7 +13,7 @@ TAG = __name__
 
 async def handleAudioMessage(conn, audio):
     # 当前片段是否有人说话
-    have_voice = conn.vad.is_vad(conn, audio)
+    have_voice = await conn.vad.is_vad(conn, audio)
     # 如果设备刚刚被唤醒，短暂忽略VAD检测
     if hasattr(conn, "just_woken_up") and conn.just_woken_up:
         have_voice = False
@@ -80,6 +81,7 @@ async def startToChat(conn, text):
 
     # 首先进行意图分析，使用实际文本内容
     intent_handled = await handle_user_intent(conn, actual_text)
+    mark_stage(conn, "intent")
 
     if intent_handled:
         # 如果意图已被处理，不再进行聊天
@@ -87,7 +89,7 @@ async def startToChat(conn, text):
 
     # 意图未被处理，继续常规聊天流程，使用实际文本内容
     await send_stt_message(conn, actual_text)
-    conn.executor.submit(conn.chat, actual_text)
+    conn.start_chat(actual_text)
 
 
 async def no_voice_close_connect(conn, have_voice):
@@ -3,6 +3,8 @@ import time
 import asyncio
 from core.utils import textUtils
 from core.utils.util import audio_to_data
+from core.utils.latency_trace import get_latency_tracer, mark_stage
+from core.utils.metrics import get_server_metrics
 from core.providers.tts.dto.dto import SentenceType
 from core.utils.audioRateController import AudioRateController
 
@@ -234,6 +236,10 @@ async def _do_send_audio(conn, opus_packet, flow_control):
         # 直接发送opus数据包
         await conn.websocket.send(opus_packet)
 
+    mark_stage(conn, "first_packet_sent")
+    mark_stage(conn, "last_packet_sent", overwrite=True)
+    get_server_metrics().record_audio_packets()
+
     # 更新流控状态
     flow_control["packet_count"] = packet_index + 1
     flow_control["sequence"] = sequence + 1
@@ -259,6 +265,7 @@ async def send_tts_message(conn, state, text=None):
             await sendAudio(conn, audios)
         # 等待所有音频包发送完成
         await _wait_for_audio_completion(conn)
+        get_latency_tracer().finish(conn.turn_trace)
         # 清除服务端讲话状态
         conn.clearSpeakStatus()
 
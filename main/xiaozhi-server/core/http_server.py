@@ -3,6 +3,8 @@ from aiohttp import web
 from config.logger import setup_logging
 from core.api.ota_handler import OTAHandler
 from core.api.vision_handler import VisionHandler
+from core.api.metrics_handler import MetricsHandler
+from core.utils.metrics import get_server_metrics
 
 TAG = __name__
 
@@ -13,6 +15,7 @@ class SimpleHttpServer:
         self.logger = setup_logging()
         self.ota_handler = OTAHandler(config)
         self.vision_handler = VisionHandler(config)
+        self.metrics_handler = MetricsHandler(config)
 
     def _get_websocket_url(self, local_ip: str, port: int) -> str:
         """获取websocket地址
@@ -58,6 +61,9 @@ class SimpleHttpServer:
                     web.options("/mcp/vision/explain", self.vision_handler.handle_post),
                 ]
             )
+            if get_server_metrics(self.config).enabled:
+                # Prometheus抓取运行指标
+                app.add_routes([web.get("/metrics", self.metrics_handler.handle_get)])
 
             # 运行服务
             runner = web.AppRunner(app)
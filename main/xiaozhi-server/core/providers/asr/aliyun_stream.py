@@ -1,69 +1,17 @@
 import json
-import time
 import uuid
-import hmac
-import base64
-import hashlib
 import asyncio
-import requests
 import websockets
 import opuslib_next
-from urllib import parse
-from datetime import datetime
 from config.logger import setup_logging
 from core.providers.asr.base import ASRProviderBase
+from core.utils.aliyun_token import get_aliyun_token_manager
 from core.providers.asr.dto.dto import InterfaceType
 
 TAG = __name__
 logger = setup_logging()
 
 
-class AccessToken:
-    @staticmethod
-    def _encode_text(text):
-        encoded_text = parse.quote_plus(text)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def _encode_dict(dic):
-        keys = dic.keys()
-        dic_sorted = [(key, dic[key]) for key in sorted(keys)]
-        encoded_text = parse.urlencode(dic_sorted)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def create_token(access_key_id, access_key_secret):
-        parameters = {
-            "AccessKeyId": access_key_id,
-            "Action": "CreateToken",
-            "Format": "JSON",
-            "RegionId": "cn-shanghai",
-            "SignatureMethod": "HMAC-SHA1",
-            "SignatureNonce": str(uuid.uuid1()),
-            "SignatureVersion": "1.0",
-            "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "Version": "2019-02-28",
-        }
-        query_string = AccessToken._encode_dict(parameters)
-        string_to_sign = (
-            "GET" + "&" + AccessToken._encode_text("/") + "&" + AccessToken._encode_text(query_string)
-        )
-        secreted_string = hmac.new(
-            bytes(access_key_secret + "&", encoding="utf-8"),
-            bytes(string_to_sign, encoding="utf-8"),
-            hashlib.sha1,
-        ).digest()
-        signature = base64.b64encode(secreted_string)
-        signature = AccessToken._encode_text(signature)
-        full_url = "http://nls-meta.cn-shanghai.aliyuncs.com/?Signature=%s&%s" % (signature, query_string)
-        response = requests.get(full_url)
-        if response.ok:
-            root_obj = response.json()
-            if "Token" in root_obj:
-                return root_obj["Token"]["Id"], root_obj["Token"]["ExpireTime"]
-        return None, None
-
-
 class ASRProvider(ASRProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__()
@@ -92,35 +40,20 @@ class ASRProvider(ASRProviderBase):
         self.max_sentence_silence = config.get("max_sentence_silence")
         self.output_dir = config.get("output_dir", "./audio_output")
         self.delete_audio_file = delete_audio_file
-        self.expire_time = None
 
         self.task_id = uuid.uuid4().hex
 
-        # Token管理
-        if self.access_key_id and self.access_key_secret:
-            self._refresh_token()
-        elif not self.token:
+        # Token由进程内共享的Token管理器按需获取和刷新
+        if not (self.access_key_id and self.access_key_secret) and not self.token:
             raise ValueError("必须提供access_key_id+access_key_secret或者直接提供token")
 
-    def _refresh_token(self):
-        """刷新Token"""
-        self.token, expire_time_str = AccessToken.create_token(self.access_key_id, self.access_key_secret)
-        if not self.token:
-            raise ValueError("无法获取有效的访问Token")
-        
-        try:
-            expire_str = str(expire_time_str).strip()
-            if expire_str.isdigit():
-                expire_time = datetime.fromtimestamp(int(expire_str))
-            else:
-                expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
-            self.expire_time = expire_time.timestamp() - 60
-        except:
-            self.expire_time = None
-
-    def _is_token_expired(self):
-        """检查Token是否过期"""
-        return self.expire_time and time.time() > self.expire_time
+    async def _get_token(self):
+        """获取访问Token，使用AccessKey时从共享的Token管理器读取"""
+        if self.access_key_id and self.access_key_secret:
+            self.token = await get_aliyun_token_manager().get_token(
+                self.access_key_id, self.access_key_secret
+            )
+        return self.token
 
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
@@ -156,11 +89,8 @@ class ASRProvider(ASRProviderBase):
 
     async def _start_recognition(self, conn):
         """开始识别会话"""
-        if self._is_token_expired():
-            self._refresh_token()
-        
         # 建立连接
-        headers = {"X-NLS-Token": self.token}
+        headers = {"X-NLS-Token": await self._get_token()}
         self.asr_ws = await websockets.connect(
             self.ws_url,
             additional_headers=headers,
@@ -15,18 +15,55 @@ from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
 from core.utils.util import remove_punctuation_and_length
+from core.utils.latency_trace import get_latency_tracer, mark_stage
+from core.utils.metrics import get_server_metrics
 from core.handle.receiveAudioHandle import handleAudioMessage
 
 TAG = __name__
 logger = setup_logging()
 
+# 每个音频包的时长（毫秒）
+AUDIO_PACKET_MS = 60
+
+
+class PartialASRState:
+    """说话过程中已提前识别的分段：cut之前的音频已提交识别，boundary为切分处的音频包，
+    voiced为切分之后有声音的包数"""
+
+    def __init__(self):
+        self.cut = 0
+        self.boundary = None
+        self.voiced = 0
+        self.tasks = []
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+
+def join_asr_texts(texts: List[str]) -> str:
+    """拼接分段识别结果，英文单词之间补空格"""
+    result = ""
+    for text in texts:
+        text = (text or "").strip()
+        if not text:
+            continue
+        if result and result[-1].isascii() and result[-1].isalnum() and text[0].isascii() and text[0].isalnum():
+            result += " "
+        result += text
+    return result
+
 
 class ASRProviderBase(ABC):
     def __init__(self):
-        pass
+        # 本地模型的分段识别：说话过程中遇到停顿且累计超过该时长就提前识别，0为关闭
+        self.partial_chunk_ms = 0
 
     # 打开音频通道
     async def open_audio_channels(self, conn):
+        if conn.async_pipeline:
+            conn.spawn_pipeline_task(self.asr_text_priority_task, conn)
+            return
         conn.asr_priority_thread = threading.Thread(
             target=self.asr_text_priority_thread, args=(conn,), daemon=True
         )
@@ -50,6 +87,20 @@ class ASRProviderBase(ABC):
                 )
                 continue
 
+    # 有序处理ASR音频（异步流水线模式，直接在事件循环中消费）
+    async def asr_text_priority_task(self, conn):
+        while not conn.stop_event.is_set():
+            try:
+                message = await conn.asr_audio_queue.get()
+                await handleAudioMessage(conn, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理ASR文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+                continue
+
     # 接收音频
     async def receive_audio(self, conn, audio, audio_have_voice):
         if conn.client_listen_mode == "manual":
@@ -70,20 +121,82 @@ class ASRProviderBase(ABC):
                 conn.asr_audio.clear()
                 conn.reset_vad_states()
 
+                # 过短的音频按噪声丢弃，不开始新的一轮追踪
                 if len(asr_audio_task) > 15:
+                    get_latency_tracer().start_turn(conn)
                     await self.handle_voice_stop(conn, asr_audio_task)
+                else:
+                    self._pop_partial_state(conn, asr_audio_task)
+            elif self.partial_chunk_ms > 0:
+                self._maybe_recognize_partial(conn, have_voice)
+
+    def _maybe_recognize_partial(self, conn, have_voice):
+        """说话过程中遇到停顿时，把上次切分之后的音频提前交给本地模型识别"""
+        state = conn.asr_partial
+        if state is None:
+            state = conn.asr_partial = PartialASRState()
+        if have_voice:
+            state.voiced += 1
+            return
+        # 只在停顿处切分，且切分后要有足够的有声音频，句尾的静音不会单独识别
+        if state.voiced * AUDIO_PACKET_MS < self.partial_chunk_ms:
+            return
+
+        chunk = conn.asr_audio[state.cut :]
+        state.cut = len(conn.asr_audio)
+        state.boundary = conn.asr_audio[-1]
+        state.voiced = 0
+        state.tasks.append(asyncio.create_task(self._recognize_partial(conn, chunk)))
+
+    async def _recognize_partial(self, conn, chunk: List[bytes]) -> str:
+        text, _ = await self.speech_to_text(chunk, conn.session_id, conn.audio_format)
+        if text:
+            logger.bind(tag=TAG).debug(f"分段识别结果: {text}")
+        return text or ""
+
+    def _pop_partial_state(self, conn, asr_audio_task: List[bytes]) -> Optional[PartialASRState]:
+        """取出本句的分段识别状态，与本句音频对不上（音频被清空过）时丢弃"""
+        state, conn.asr_partial = conn.asr_partial, None
+        if state is None or not state.tasks:
+            return None
+        if (
+            state.cut > len(asr_audio_task)
+            or asr_audio_task[state.cut - 1] is not state.boundary
+        ):
+            state.cancel()
+            return None
+        return state
+
+    async def _speech_to_text_with_partial(
+        self, conn, asr_audio_task: List[bytes], state: PartialASRState
+    ):
+        """只识别最后一次切分之后的尾部音频，再与已完成的分段结果拼接"""
+        tail = asr_audio_task[state.cut :]
+        tail_text = ""
+        if tail and state.voiced > 0:
+            tail_text, _ = await self.speech_to_text(
+                tail, conn.session_id, conn.audio_format
+            )
+        texts = await asyncio.gather(*state.tasks, return_exceptions=True)
+        texts = [t for t in texts if isinstance(t, str)]
+        return join_asr_texts(texts + [tail_text]), None
 
     # 处理语音停止
     async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
         """并行处理ASR和声纹识别"""
         try:
             total_start_time = time.monotonic()
+            # 手动模式、流式ASR等没有经过VAD停止检测的，从这里开始计时
+            trace = conn.turn_trace
+            if trace is None or trace.finished or trace.has("opus_decode"):
+                get_latency_tracer().start_turn(conn)
 
             # 准备音频数据
             if conn.audio_format == "pcm":
                 pcm_data = asr_audio_task
             else:
                 pcm_data = self.decode_opus(asr_audio_task)
+            mark_stage(conn, "opus_decode")
 
             combined_pcm_data = b"".join(pcm_data)
 
@@ -92,8 +205,16 @@ class ASRProviderBase(ABC):
             if conn.voiceprint_provider and combined_pcm_data:
                 wav_data = self._pcm_to_wav(combined_pcm_data)
 
-            # 定义ASR任务
-            asr_task = self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
+            # 定义ASR任务，说话过程中已分段识别的只需识别尾部
+            partial_state = self._pop_partial_state(conn, asr_audio_task)
+            if partial_state is not None:
+                asr_task = self._speech_to_text_with_partial(
+                    conn, asr_audio_task, partial_state
+                )
+            else:
+                asr_task = self.speech_to_text(
+                    asr_audio_task, conn.session_id, conn.audio_format
+                )
 
             if conn.voiceprint_provider and wav_data:
                 voiceprint_task = conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
@@ -102,12 +223,18 @@ class ASRProviderBase(ABC):
                     asr_task, voiceprint_task, return_exceptions=True
                 )
             else:
-                asr_result = await asr_task
+                try:
+                    asr_result = await asr_task
+                except Exception as e:
+                    # 与并发等待时一致，按识别失败处理
+                    asr_result = e
                 voiceprint_result = None
+            mark_stage(conn, "asr_result")
 
             # 记录识别结果 - 检查是否为异常
             if isinstance(asr_result, Exception):
                 logger.bind(tag=TAG).error(f"ASR识别失败: {asr_result}")
+                get_server_metrics().record_provider_error("asr", self)
                 raw_text = ""
             else:
                 raw_text, _ = asr_result
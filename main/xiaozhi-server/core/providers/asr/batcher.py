@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, Callable, List
+from config.logger import setup_logging
+from core.utils.worker_pool import get_worker_pools
+
+TAG = __name__
+logger = setup_logging()
+
+
+class LocalASRBatcher:
+    """本地ASR批量推理调度器
+
+    多个连接共用一个本地模型时，把一个短时间窗口内到达的语音合并成一个批次，
+    在推理线程池中一次推理，再把结果分别返回给等待的协程。
+    """
+
+    def __init__(
+        self,
+        infer: Callable[[List[Any]], List[str]],
+        max_batch_size: int = 8,
+        max_wait_ms: int = 20,
+    ):
+        """
+        Args:
+            infer: 批量推理函数，输入音频列表，按顺序返回识别文本列表
+            max_batch_size: 每批最多的语音条数
+            max_wait_ms: 收到第一条语音后最多等待多久凑批
+        """
+        self.infer = infer
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, int(max_wait_ms)) / 1000
+        self._queue = None
+        self._batch_task = None
+
+    async def submit(self, audio) -> str:
+        """提交一条语音，等待所在批次的识别结果"""
+        if self.max_batch_size == 1:
+            return (await get_worker_pools().run("inference", self.infer, [audio]))[0]
+
+        if self._batch_task is None or self._batch_task.done():
+            self._queue = asyncio.Queue()
+            self._batch_task = asyncio.create_task(self._batch_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((audio, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # 等待期间已被取消的请求不再推理
+        return [(audio, future) for audio, future in batch if not future.done()]
+
+    async def _batch_loop(self):
+        pools = get_worker_pools()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            try:
+                results = await pools.run(
+                    "inference", self.infer, [audio for audio, _ in batch]
+                )
+                if len(batch) > 1:
+                    logger.bind(tag=TAG).debug(f"本地ASR批量推理: {len(batch)} 条")
+                for (_, future), text in zip(batch, results):
+                    if not future.done():
+                        future.set_result(text)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"本地ASR批量推理失败: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
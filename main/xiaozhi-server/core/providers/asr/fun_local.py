@@ -4,7 +4,7 @@ import sys
 import time
 import shutil
 import psutil
-import asyncio
+import numpy as np
 
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
@@ -12,6 +12,7 @@ from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.providers.asr.batcher import LocalASRBatcher
 
 TAG = __name__
 logger = setup_logging()
@@ -51,6 +52,16 @@ class ASRProvider(ASRProviderBase):
         self.model_dir = config.get("model_dir")
         self.output_dir = config.get("output_dir")  # Modify configuration key name
         self.delete_audio_file = delete_audio_file
+        partial_chunk_ms = config.get("partial_chunk_ms", 0)
+        self.partial_chunk_ms = int(partial_chunk_ms) if partial_chunk_ms else 0
+        # Multiple connections share one model; utterances arriving within a short window are batched
+        max_batch_size = config.get("max_batch_size", 8)
+        max_batch_wait_ms = config.get("max_batch_wait_ms", 20)
+        self.batcher = LocalASRBatcher(
+            self._generate_batch,
+            int(max_batch_size) if max_batch_size else 8,
+            int(max_batch_wait_ms) if max_batch_wait_ms not in (None, "") else 20,
+        )
 
         # Ensure the output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
@@ -63,6 +74,21 @@ class ASRProvider(ASRProviderBase):
                 # device="cuda:0",  # Enable GPU acceleration
             )
 
+    def _generate_batch(self, pcm_list: List[bytes]) -> List[str]:
+        """批量识别，多条语音作为一个批次输入模型"""
+        waveforms = [
+            np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+            for pcm in pcm_list
+        ]
+        results = self.model.generate(
+            input=waveforms,
+            cache={},
+            language="auto",
+            use_itn=True,
+            batch_size=len(waveforms),
+        )
+        return [rich_transcription_postprocess(result["text"]) for result in results]
+
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -92,17 +118,9 @@ class ASRProvider(ASRProviderBase):
                 else:
                     file_path = self.save_audio_to_file(pcm_data, session_id)
 
-                # Speech Recognition - Using Thread Pools to Avoid Blocking the Event Loop
+                # Speech Recognition - Batched on the inference pool to avoid blocking the event loop
                 start_time = time.time()
-                result = await asyncio.to_thread(
-                    self.model.generate,
-                    input=combined_pcm_data,
-                    cache={},
-                    language="auto",
-                    use_itn=True,
-                    batch_size_s=60,
-                )
-                text = await asyncio.to_thread(rich_transcription_postprocess, result[0]["text"])
+                text = await self.batcher.submit(combined_pcm_data)
                 logger.bind(tag=TAG).debug(
                     f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
                 )
@@ -4,8 +4,8 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.utils.http_client import get_http_clients
 
-import requests
 
 TAG = __name__
 logger = setup_logging()
@@ -47,20 +47,22 @@ class ASRProvider(ASRProviderBase):
 
 
             with open(file_path, "rb") as audio_file:  # 使用with语句确保文件关闭
+                # 读入内存后上传，请求失败重试时可以重新发送
                 files = {
-                    "file": audio_file
+                    "file": (os.path.basename(file_path), audio_file.read())
                 }
 
-                start_time = time.time()
-                response = requests.post(
-                    self.api_url,
-                    files=files,
-                    data=data,
-                    headers=headers
-                )
-                logger.bind(tag=TAG).debug(
-                    f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {response.text}"
-                )
+            start_time = time.time()
+            response = await get_http_clients().arequest(
+                "POST",
+                self.api_url,
+                files=files,
+                data=data,
+                headers=headers
+            )
+            logger.bind(tag=TAG).debug(
+                f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {response.text}"
+            )
 
             if response.status_code == 200:
                 text = response.json().get("text", "")
@@ -7,6 +7,7 @@ from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.batcher import LocalASRBatcher
 
 import numpy as np
 import sherpa_onnx
@@ -42,6 +43,16 @@ class ASRProvider(ASRProviderBase):
         self.output_dir = config.get("output_dir")
         self.model_type = config.get("model_type", "sense_voice")  # 支持 paraformer
         self.delete_audio_file = delete_audio_file
+        partial_chunk_ms = config.get("partial_chunk_ms", 0)
+        self.partial_chunk_ms = int(partial_chunk_ms) if partial_chunk_ms else 0
+        # 多个连接共用模型，短时间内到达的语音合并为一批推理
+        max_batch_size = config.get("max_batch_size", 8)
+        max_batch_wait_ms = config.get("max_batch_wait_ms", 20)
+        self.batcher = LocalASRBatcher(
+            self._decode_batch,
+            int(max_batch_size) if max_batch_size else 8,
+            int(max_batch_wait_ms) if max_batch_wait_ms not in (None, "") else 20,
+        )
 
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
@@ -120,6 +131,16 @@ class ASRProvider(ASRProviderBase):
             samples_float32 = samples_float32 / 32768
             return samples_float32, f.getframerate()
 
+    def _decode_batch(self, batch: List[Tuple[np.ndarray, int]]) -> List[str]:
+        """批量识别，一次 decode_streams 处理整批语音"""
+        streams = []
+        for samples, sample_rate in batch:
+            s = self.model.create_stream()
+            s.accept_waveform(sample_rate, samples)
+            streams.append(s)
+        self.model.decode_streams(streams)
+        return [s.result.text for s in streams]
+
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -137,13 +158,10 @@ class ASRProvider(ASRProviderBase):
                 f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
             )
 
-            # 语音识别
+            # 语音识别，由批量调度器在推理线程池中执行，避免阻塞事件循环
             start_time = time.time()
-            s = self.model.create_stream()
             samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            text = await self.batcher.submit((samples, sample_rate))
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
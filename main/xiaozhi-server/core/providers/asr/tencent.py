@@ -7,9 +7,9 @@ from datetime import datetime, timezone
 import os
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
-import requests
 from core.providers.asr.base import ASRProviderBase
 from config.logger import setup_logging
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -70,7 +70,7 @@ class ASRProvider(ASRProviderBase):
 
             # 发送请求
             start_time = time.time()
-            result = self._send_request(request_body, timestamp, authorization)
+            result = await self._send_request(request_body, timestamp, authorization)
 
             if result:
                 logger.bind(tag=TAG).debug(
@@ -181,7 +181,7 @@ class ASRProvider(ASRProviderBase):
             logger.bind(tag=TAG).error(f"生成认证头失败: {e}", exc_info=True)
             raise RuntimeError(f"生成认证头失败: {e}")
 
-    def _send_request(
+    async def _send_request(
         self, request_body: str, timestamp: str, authorization: str
     ) -> Optional[str]:
         """发送请求到腾讯云API"""
@@ -196,10 +196,12 @@ class ASRProvider(ASRProviderBase):
         }
 
         try:
-            response = requests.post(self.API_URL, headers=headers, data=request_body)
+            response = await get_http_clients().arequest(
+                "POST", self.API_URL, headers=headers, content=request_body
+            )
 
-            if not response.ok:
-                raise IOError(f"请求失败: {response.status_code} {response.reason}")
+            if not response.is_success:
+                raise IOError(f"请求失败: {response.status_code} {response.reason_phrase}")
 
             response_json = response.json()
 
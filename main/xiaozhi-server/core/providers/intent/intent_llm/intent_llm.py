@@ -1,27 +1,60 @@
 from typing import List, Dict
 from ..base import IntentProviderBase
-from plugins_func.functions.play_music import initialize_music_handler
+from plugins_func.functions.play_music import get_ready_music_index
+from core.utils.music_index import normalize_title
+from core.utils.intent_cache import get_intent_cache
+from core.utils.intent_classifier import get_intent_functions
 from config.logger import setup_logging
+import os
 import re
 import json
-import hashlib
 import time
 
 TAG = __name__
 logger = setup_logging()
 
+# 提示词中最多列出的相关歌曲数、智能设备数
+DEFAULT_MUSIC_TOP_K = 10
+DEFAULT_DEVICE_TOP_K = 10
+
+
+def _device_terms(device: str) -> set:
+    """设备描述（位置，设备名，entity_id）中位置和设备名的单字与二元组"""
+    name = normalize_title("".join(device.split(",")[:2]))
+    return set(name) | {name[i : i + 2] for i in range(len(name) - 1)}
+
+
+def select_relevant_devices(text: str, devices: List[str], limit: int) -> List[str]:
+    """
+    选出与用户所说最相关的智能设备
+
+    设备数不超过 limit 时全部返回；否则按位置和设备名与用户所说共有的字词数排序，
+    二元组计2分、单字计1分，只返回得分大于0的设备，同分时保持配置中的顺序。
+    """
+    if len(devices) <= limit:
+        return devices
+    query = normalize_title(text)
+    query_terms = set(query) | {query[i : i + 2] for i in range(len(query) - 1)}
+    scored = []
+    for order, device in enumerate(devices):
+        score = sum(len(term) for term in _device_terms(device) & query_terms)
+        if score > 0:
+            scored.append((-score, order, device))
+    scored.sort()
+    return [device for _, _, device in scored[:limit]]
+
 
 class IntentProvider(IntentProviderBase):
     def __init__(self, config):
         super().__init__(config)
         self.llm = None
         self.promot = ""
-        # 导入全局缓存管理器
-        from core.utils.cache.manager import cache_manager, CacheType
-
-        self.cache_manager = cache_manager
-        self.CacheType = CacheType
         self.history_count = 4  # 默认使用最近4条对话记录
+        # 歌曲和智能设备只列出与用户所说相关的前k个，系统提示词保持不变以便命中前缀缓存
+        music_top_k = config.get("music_top_k")
+        device_top_k = config.get("device_top_k")
+        self.music_top_k = int(music_top_k) if music_top_k else DEFAULT_MUSIC_TOP_K
+        self.device_top_k = int(device_top_k) if device_top_k else DEFAULT_DEVICE_TOP_K
 
     def get_intent_system_prompt(self, functions_list: str) -> str:
         """
@@ -122,6 +155,32 @@ class IntentProvider(IntentProviderBase):
         )
         return llm_result
 
+    def _build_context_prompt(self, conn, text: str) -> str:
+        """与用户所说相关的本地歌曲和智能设备，从音乐索引和设备列表中检索"""
+        context_prompt = ""
+        # 音乐索引首次建立需要遍历音乐目录，在后台进行，建立完成前不提供歌曲候选
+        music_index = get_ready_music_index(conn)
+        if music_index is not None:
+            # 阈值为0：只要与用户所说有共同的字词就作为候选，由大模型判断
+            matches = music_index.search(text, self.music_top_k, threshold=0.0)
+            music_file_names = [os.path.splitext(path)[0] for path, _ in matches]
+            if music_file_names:
+                context_prompt += f"<musicNames>{music_file_names}\n</musicNames>\n"
+
+        home_assistant_cfg = conn.config["plugins"].get("home_assistant")
+        if home_assistant_cfg:
+            devices = home_assistant_cfg.get("devices", [])
+        else:
+            devices = []
+        devices = select_relevant_devices(text, devices, self.device_top_k)
+        if len(devices) > 0:
+            context_prompt += "下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
+            for device in devices:
+                context_prompt += device + "\n"
+        if context_prompt:
+            context_prompt += "\n"
+        return context_prompt
+
     async def detect_intent(self, conn, dialogue_history: List[Dict], text: str) -> str:
         if not self.llm:
             raise ValueError("LLM provider not set")
@@ -135,45 +194,25 @@ class IntentProvider(IntentProviderBase):
         model_info = getattr(self.llm, "model_name", str(self.llm.__class__.__name__))
         logger.bind(tag=TAG).debug(f"使用意图识别模型: {model_info}")
 
-        # 计算缓存键
-        cache_key = hashlib.md5((conn.device_id + text).encode()).hexdigest()
-
-        # 检查缓存
-        cached_intent = self.cache_manager.get(self.CacheType.INTENT, cache_key)
+        # 检查缓存：规范化文本 + 当前注册的函数，与设备无关的意图在设备之间共享
+        intent_cache = get_intent_cache()
+        cache_signature = intent_cache.signature(conn, model_info)
+        cached_intent = intent_cache.get(conn, cache_signature, text)
         if cached_intent is not None:
             cache_time = time.time() - total_start_time
             logger.bind(tag=TAG).debug(
-                f"使用缓存的意图: {cache_key} -> {cached_intent}, 耗时: {cache_time:.4f}秒"
+                f"使用缓存的意图: {text} -> {cached_intent}, 耗时: {cache_time:.4f}秒"
             )
             return cached_intent
 
         if self.promot == "":
-            functions = conn.func_handler.get_functions()
-            if hasattr(conn, "mcp_client"):
-                mcp_tools = conn.mcp_client.get_available_tools()
-                if mcp_tools is not None and len(mcp_tools) > 0:
-                    if functions is None:
-                        functions = []
-                    functions.extend(mcp_tools)
-
+            # 注册的函数加上设备MCP工具，复制列表，不修改工具管理器缓存的函数描述
+            functions = get_intent_functions(conn)
             self.promot = self.get_intent_system_prompt(functions)
 
-        music_config = initialize_music_handler(conn)
-        music_file_names = music_config["music_file_names"]
-        prompt_music = f"{self.promot}\n<musicNames>{music_file_names}\n</musicNames>"
-
-        home_assistant_cfg = conn.config["plugins"].get("home_assistant")
-        if home_assistant_cfg:
-            devices = home_assistant_cfg.get("devices", [])
-        else:
-            devices = []
-        if len(devices) > 0:
-            hass_prompt = "\n下面是我家智能设备列表（位置，设备名，entity_id），可以通过homeassistant控制\n"
-            for device in devices:
-                hass_prompt += device + "\n"
-            prompt_music += hass_prompt
-
-        logger.bind(tag=TAG).debug(f"User prompt: {prompt_music}")
+        # 系统提示词只包含函数说明，每次调用都相同；
+        # 与本次输入相关的歌曲和设备放在用户提示词中
+        context_prompt = self._build_context_prompt(conn, text)
 
         # 构建用户对话历史的提示
         msgStr = ""
@@ -184,7 +223,8 @@ class IntentProvider(IntentProviderBase):
             msgStr += f"{dialogue_history[i].role}: {dialogue_history[i].content}\n"
 
         msgStr += f"User: {text}\n"
-        user_prompt = f"current dialogue:\n{msgStr}"
+        user_prompt = f"{context_prompt}current dialogue:\n{msgStr}"
+        logger.bind(tag=TAG).debug(f"User prompt: {user_prompt}")
 
         # 记录预处理完成时间
         preprocess_time = time.time() - total_start_time
@@ -195,7 +235,7 @@ class IntentProvider(IntentProviderBase):
         logger.bind(tag=TAG).debug(f"开始LLM意图识别调用, 模型: {model_info}")
 
         intent = self.llm.response_no_stream(
-            system_prompt=prompt_music, user_prompt=user_prompt
+            system_prompt=self.promot, user_prompt=user_prompt
         )
 
         # 记录LLM调用完成时间
@@ -256,7 +296,7 @@ class IntentProvider(IntentProviderBase):
                     logger.bind(tag=TAG).info(f"检测到函数调用意图: {function_name}")
 
             # 统一缓存处理和返回
-            self.cache_manager.set(self.CacheType.INTENT, cache_key, intent)
+            intent_cache.put(conn, cache_signature, text, intent)
             postprocess_time = time.time() - postprocess_start_time
             logger.bind(tag=TAG).debug(f"意图后处理耗时: {postprocess_time:.4f}秒")
             return intent
@@ -1,9 +1,46 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 from config.logger import setup_logging
+from core.utils.cache.manager import cache_manager, CacheType
+from core.utils.async_pipeline import iterate_in_thread
 
 TAG = __name__
 logger = setup_logging()
 
+
+class ConversationMap:
+    """设备会话（session_id）到上游平台会话ID的映射
+
+    provider实例被所有连接共用，映射不能随进程无限增长：
+    条目一小时没有对话后过期，总数超过上限时按LRU淘汰，连接关闭时主动释放。
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    def get(self, session_id: str) -> Optional[str]:
+        conversation_id = cache_manager.get(
+            CacheType.LLM_CONVERSATION, session_id, namespace=self.namespace
+        )
+        if conversation_id is not None:
+            # 重新写入以延长过期时间，持续对话的会话不会过期
+            self.set(session_id, conversation_id)
+        return conversation_id
+
+    def set(self, session_id: str, conversation_id: str):
+        cache_manager.set(
+            CacheType.LLM_CONVERSATION,
+            session_id,
+            conversation_id,
+            namespace=self.namespace,
+        )
+
+    def release(self, session_id: str):
+        cache_manager.delete(
+            CacheType.LLM_CONVERSATION, session_id, namespace=self.namespace
+        )
+
+
 class LLMProviderBase(ABC):
     @abstractmethod
     def response(self, session_id, dialogue):
@@ -26,6 +63,10 @@ class LLMProviderBase(ABC):
             logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
             return "【LLM服务响应异常】"
     
+    def release_session(self, session_id):
+        """连接关闭时调用，释放provider为该会话保存的状态"""
+        pass
+
     def response_with_functions(self, session_id, dialogue, functions=None):
         """
         Default implementation for function calling (streaming)
@@ -37,3 +78,20 @@ class LLMProviderBase(ABC):
         for token in self.response(session_id, dialogue):
             yield token, None
 
+    def aresponse(self, session_id, dialogue, **kwargs):
+        """
+        异步流式接口，返回异步生成器，产出内容与 response 相同
+
+        默认在LLM线程池中迭代同步的 response，提供了原生异步SDK的provider应覆盖此方法
+        """
+        return iterate_in_thread(lambda: self.response(session_id, dialogue, **kwargs))
+
+    def aresponse_with_functions(self, session_id, dialogue, functions=None):
+        """
+        异步流式接口，返回异步生成器，产出内容与 response_with_functions 相同
+
+        默认在LLM线程池中迭代同步的 response_with_functions
+        """
+        return iterate_in_thread(
+            lambda: self.response_with_functions(session_id, dialogue, functions)
+        )
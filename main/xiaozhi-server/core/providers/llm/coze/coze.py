@@ -1,6 +1,6 @@
 from config.logger import setup_logging
 import json
-from core.providers.llm.base import LLMProviderBase
+from core.providers.llm.base import LLMProviderBase, ConversationMap
 
 # official coze sdk for Python [cozepy](https://github.com/coze-dev/coze-py)
 from cozepy import COZE_CN_BASE_URL
@@ -22,25 +22,30 @@ class LLMProvider(LLMProviderBase):
         self.personal_access_token = config.get("personal_access_token")
         self.bot_id = str(config.get("bot_id"))
         self.user_id = str(config.get("user_id"))
-        self.session_conversation_map = {}  # 存储session_id和conversation_id的映射
+        # 存储session_id和conversation_id的映射
+        self.session_conversation_map = ConversationMap(f"coze:{self.bot_id}")
+        # 客户端内部维护连接池，所有连接共用一个，不再每轮对话重新创建
+        self.coze = Coze(
+            auth=TokenAuth(token=self.personal_access_token), base_url=COZE_CN_BASE_URL
+        )
         model_key_msg = check_model_key("CozeLLM", self.personal_access_token)
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
-    def response(self, session_id, dialogue, **kwargs):
-        coze_api_token = self.personal_access_token
-        coze_api_base = COZE_CN_BASE_URL
+    def release_session(self, session_id):
+        self.session_conversation_map.release(session_id)
 
+    def response(self, session_id, dialogue, **kwargs):
         last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
 
-        coze = Coze(auth=TokenAuth(token=coze_api_token), base_url=coze_api_base)
+        coze = self.coze
         conversation_id = self.session_conversation_map.get(session_id)
 
         # 如果没有找到conversation_id，则创建新的对话
         if not conversation_id:
             conversation = coze.conversations.create(messages=[])
             conversation_id = conversation.id
-            self.session_conversation_map[session_id] = conversation_id  # 更新映射
+            self.session_conversation_map.set(session_id, conversation_id)  # 更新映射
 
         for event in coze.chat.stream(
             bot_id=self.bot_id,
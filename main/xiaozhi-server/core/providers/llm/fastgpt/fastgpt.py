@@ -1,8 +1,8 @@
 import json
 from config.logger import setup_logging
-import requests
 from core.providers.llm.base import LLMProviderBase
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -24,7 +24,8 @@ class LLMProvider(LLMProviderBase):
             last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
 
             # 发起流式请求
-            with requests.post(
+            with get_http_clients().stream(
+                "POST",
                 f"{self.base_url}/chat/completions",
                 headers={"Authorization": f"Bearer {self.api_key}"},
                 json={
@@ -34,13 +35,12 @@ class LLMProvider(LLMProviderBase):
                     "variables": self.variables,
                     "messages": [{"role": "user", "content": last_msg["content"]}],
                 },
-                stream=True,
             ) as r:
                 for line in r.iter_lines():
                     if line:
                         try:
-                            if line.startswith(b"data: "):
-                                if line[6:].decode("utf-8") == "[DONE]":
+                            if line.startswith("data: "):
+                                if line[6:] == "[DONE]":
                                     break
 
                                 data = json.loads(line[6:])
@@ -125,7 +125,14 @@ class LLMProvider(LLMProviderBase):
     def response_with_functions(self, session_id, dialogue, functions=None):
         yield from self._generate(dialogue, self._build_tools(functions))
 
-    def _generate(self, dialogue, tools):
+    def aresponse(self, session_id, dialogue, **kwargs):
+        return self._agenerate(dialogue, None)
+
+    def aresponse_with_functions(self, session_id, dialogue, functions=None):
+        return self._agenerate(dialogue, self._build_tools(functions))
+
+    @staticmethod
+    def _build_contents(dialogue):
         role_map = {"assistant": "model", "user": "user"}
         contents: list = []
         # 拼接对话
@@ -164,23 +171,26 @@ class LLMProvider(LLMProviderBase):
                     "parts": [{"text": str(m.get("content", ""))}],
                 }
             )
+        return contents
 
-        stream: GenerateContentResponse = self.model.generate_content(
-            contents=contents,
-            generation_config=self.gen_cfg,
-            tools=tools,
-            stream=True,
-            timeout=self.timeout,
-        )
+    @staticmethod
+    def _parse_chunk(chunk, tools):
+        """
+        解析一个chunk
 
-        try:
-            for chunk in stream:
-                cand = chunk.candidates[0]
-                for part in cand.content.parts:
-                    # a) 函数调用-通常是最后一段话才是函数调用
-                    if getattr(part, "function_call", None):
-                        fc = part.function_call
-                        yield None, [
+        Returns:
+            (要输出的内容列表, 是否遇到函数调用)，遇到函数调用后结束本次生成
+        """
+        items = []
+        cand = chunk.candidates[0]
+        for part in cand.content.parts:
+            # a) 函数调用-通常是最后一段话才是函数调用
+            if getattr(part, "function_call", None):
+                fc = part.function_call
+                items.append(
+                    (
+                        None,
+                        [
                             SimpleNamespace(
                                 id=uuid.uuid4().hex,
                                 type="function",
@@ -191,16 +201,55 @@ class LLMProvider(LLMProviderBase):
                                     ),
                                 ),
                             )
-                        ]
-                        return
-                    # b) 普通文本
-                    if getattr(part, "text", None):
-                        yield part.text if tools is None else (part.text, None)
+                        ],
+                    )
+                )
+                return items, True
+            # b) 普通文本
+            if getattr(part, "text", None):
+                items.append(part.text if tools is None else (part.text, None))
+        return items, False
+
+    def _generate(self, dialogue, tools):
+        stream: GenerateContentResponse = self.model.generate_content(
+            contents=self._build_contents(dialogue),
+            generation_config=self.gen_cfg,
+            tools=tools,
+            stream=True,
+            timeout=self.timeout,
+        )
+
+        try:
+            for chunk in stream:
+                items, finished = self._parse_chunk(chunk, tools)
+                yield from items
+                if finished:
+                    return
 
         finally:
             if tools is not None:
                 yield None, None  # function‑mode 结束，返回哑包
 
+    async def _agenerate(self, dialogue, tools):
+        stream = await self.model.generate_content_async(
+            contents=self._build_contents(dialogue),
+            generation_config=self.gen_cfg,
+            tools=tools,
+            stream=True,
+            request_options={"timeout": self.timeout},
+        )
+
+        async for chunk in stream:
+            items, finished = self._parse_chunk(chunk, tools)
+            for item in items:
+                yield item
+            if finished:
+                break
+
+        # 异步生成器被关闭（对话被打断）时不能再yield，哑包只在正常结束时返回
+        if tools is not None:
+            yield None, None  # function‑mode 结束，返回哑包
+
     # 关闭stream，预留后续打断对话功能的功能方法，官方文档推荐打断对话要关闭上一个流，可以有效减少配额计费和资源占用
     @staticmethod
     def _safe_finish_stream(stream: GenerateContentResponse):
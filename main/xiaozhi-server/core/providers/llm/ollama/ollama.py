@@ -1,7 +1,8 @@
 from config.logger import setup_logging
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import json
 from core.providers.llm.base import LLMProviderBase
+from core.utils.async_pipeline import LoopLocal
 
 TAG = __name__
 logger = setup_logging()
@@ -20,32 +21,77 @@ class LLMProvider(LLMProviderBase):
             base_url=self.base_url,
             api_key="ollama",  # Ollama doesn't need an API key but OpenAI client requires one
         )
+        # 异步客户端按事件循环分别创建
+        self.async_client = LoopLocal(
+            lambda: AsyncOpenAI(base_url=self.base_url, api_key="ollama")
+        )
 
         # 检查是否是qwen3模型
         self.is_qwen3 = self.model_name and self.model_name.lower().startswith("qwen3")
 
-    def response(self, session_id, dialogue, **kwargs):
-        try:
-            # 如果是qwen3模型，在用户最后一条消息中添加/no_think指令
-            if self.is_qwen3:
-                # 复制对话列表，避免修改原始对话
-                dialogue_copy = dialogue.copy()
-
-                # 找到最后一条用户消息
-                for i in range(len(dialogue_copy) - 1, -1, -1):
-                    if dialogue_copy[i]["role"] == "user":
-                        # 在用户消息前添加/no_think指令
-                        dialogue_copy[i]["content"] = (
-                            "/no_think " + dialogue_copy[i]["content"]
-                        )
-                        logger.bind(tag=TAG).debug(f"为qwen3模型添加/no_think指令")
-                        break
+    def _prepare_dialogue(self, dialogue):
+        # 如果是qwen3模型，在用户最后一条消息中添加/no_think指令
+        if self.is_qwen3:
+            # 复制对话列表，避免修改原始对话
+            dialogue_copy = dialogue.copy()
+
+            # 找到最后一条用户消息
+            for i in range(len(dialogue_copy) - 1, -1, -1):
+                if dialogue_copy[i]["role"] == "user":
+                    # 在用户消息前添加/no_think指令
+                    dialogue_copy[i]["content"] = (
+                        "/no_think " + dialogue_copy[i]["content"]
+                    )
+                    logger.bind(tag=TAG).debug(f"为qwen3模型添加/no_think指令")
+                    break
+
+            # 使用修改后的对话
+            dialogue = dialogue_copy
+        return dialogue
+
+    @staticmethod
+    def _filter_think(buffer, content, is_active):
+        """
+        把content追加到缓冲区并处理跨chunk的<think>标签
+
+        Returns:
+            (缓冲区, 是否处于标签外, 可输出文本)
+        """
+        # 将内容添加到缓冲区
+        buffer += content
+
+        # 处理缓冲区中的标签
+        while "<think>" in buffer and "</think>" in buffer:
+            # 找到完整的<think></think>标签并移除
+            pre = buffer.split("<think>", 1)[0]
+            post = buffer.split("</think>", 1)[1]
+            buffer = pre + post
+
+        # 处理只有开始标签的情况
+        if "<think>" in buffer:
+            is_active = False
+            buffer = buffer.split("<think>", 1)[0]
+
+        # 处理只有结束标签的情况
+        if "</think>" in buffer:
+            is_active = True
+            buffer = buffer.split("</think>", 1)[1]
+
+        # 如果当前处于活动状态且缓冲区有内容，则输出
+        if is_active and buffer:
+            return "", is_active, buffer  # 清空缓冲区
+        return buffer, is_active, ""
 
-                # 使用修改后的对话
-                dialogue = dialogue_copy
+    @staticmethod
+    def _delta(chunk):
+        return chunk.choices[0].delta if getattr(chunk, "choices", None) else None
 
+    def response(self, session_id, dialogue, **kwargs):
+        try:
             responses = self.client.chat.completions.create(
-                model=self.model_name, messages=dialogue, stream=True
+                model=self.model_name,
+                messages=self._prepare_dialogue(dialogue),
+                stream=True,
             )
             is_active = True
             # 用于处理跨chunk的标签
@@ -53,38 +99,15 @@ class LLMProvider(LLMProviderBase):
 
             for chunk in responses:
                 try:
-                    delta = (
-                        chunk.choices[0].delta
-                        if getattr(chunk, "choices", None)
-                        else None
-                    )
+                    delta = self._delta(chunk)
                     content = delta.content if hasattr(delta, "content") else ""
 
                     if content:
-                        # 将内容添加到缓冲区
-                        buffer += content
-
-                        # 处理缓冲区中的标签
-                        while "<think>" in buffer and "</think>" in buffer:
-                            # 找到完整的<think></think>标签并移除
-                            pre = buffer.split("<think>", 1)[0]
-                            post = buffer.split("</think>", 1)[1]
-                            buffer = pre + post
-
-                        # 处理只有开始标签的情况
-                        if "<think>" in buffer:
-                            is_active = False
-                            buffer = buffer.split("<think>", 1)[0]
-
-                        # 处理只有结束标签的情况
-                        if "</think>" in buffer:
-                            is_active = True
-                            buffer = buffer.split("</think>", 1)[1]
-
-                        # 如果当前处于活动状态且缓冲区有内容，则输出
-                        if is_active and buffer:
-                            yield buffer
-                            buffer = ""  # 清空缓冲区
+                        buffer, is_active, output = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output
 
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"Error processing chunk: {e}")
@@ -95,27 +118,9 @@ class LLMProvider(LLMProviderBase):
 
     def response_with_functions(self, session_id, dialogue, functions=None):
         try:
-            # 如果是qwen3模型，在用户最后一条消息中添加/no_think指令
-            if self.is_qwen3:
-                # 复制对话列表，避免修改原始对话
-                dialogue_copy = dialogue.copy()
-
-                # 找到最后一条用户消息
-                for i in range(len(dialogue_copy) - 1, -1, -1):
-                    if dialogue_copy[i]["role"] == "user":
-                        # 在用户消息前添加/no_think指令
-                        dialogue_copy[i]["content"] = (
-                            "/no_think " + dialogue_copy[i]["content"]
-                        )
-                        logger.bind(tag=TAG).debug(f"为qwen3模型添加/no_think指令")
-                        break
-
-                # 使用修改后的对话
-                dialogue = dialogue_copy
-
             stream = self.client.chat.completions.create(
                 model=self.model_name,
-                messages=dialogue,
+                messages=self._prepare_dialogue(dialogue),
                 stream=True,
                 tools=functions,
             )
@@ -125,11 +130,7 @@ class LLMProvider(LLMProviderBase):
 
             for chunk in stream:
                 try:
-                    delta = (
-                        chunk.choices[0].delta
-                        if getattr(chunk, "choices", None)
-                        else None
-                    )
+                    delta = self._delta(chunk)
                     content = delta.content if hasattr(delta, "content") else None
                     tool_calls = (
                         delta.tool_calls if hasattr(delta, "tool_calls") else None
@@ -142,30 +143,79 @@ class LLMProvider(LLMProviderBase):
 
                     # 处理文本内容
                     if content:
-                        # 将内容添加到缓冲区
-                        buffer += content
-
-                        # 处理缓冲区中的标签
-                        while "<think>" in buffer and "</think>" in buffer:
-                            # 找到完整的<think></think>标签并移除
-                            pre = buffer.split("<think>", 1)[0]
-                            post = buffer.split("</think>", 1)[1]
-                            buffer = pre + post
-
-                        # 处理只有开始标签的情况
-                        if "<think>" in buffer:
-                            is_active = False
-                            buffer = buffer.split("<think>", 1)[0]
-
-                        # 处理只有结束标签的情况
-                        if "</think>" in buffer:
-                            is_active = True
-                            buffer = buffer.split("</think>", 1)[1]
-
-                        # 如果当前处于活动状态且缓冲区有内容，则输出
-                        if is_active and buffer:
-                            yield buffer, None
-                            buffer = ""  # 清空缓冲区
+                        buffer, is_active, output = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output, None
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"Error processing function chunk: {e}")
+                    continue
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Ollama function call: {e}")
+            yield f"【Ollama服务响应异常: {str(e)}】", None
+
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        try:
+            responses = await self.async_client.get().chat.completions.create(
+                model=self.model_name,
+                messages=self._prepare_dialogue(dialogue),
+                stream=True,
+            )
+            is_active = True
+            buffer = ""
+
+            async for chunk in responses:
+                try:
+                    delta = self._delta(chunk)
+                    content = delta.content if hasattr(delta, "content") else ""
+
+                    if content:
+                        buffer, is_active, output = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output
+
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"Error processing chunk: {e}")
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
+            yield "【Ollama服务响应异常】"
+
+    async def aresponse_with_functions(self, session_id, dialogue, functions=None):
+        try:
+            stream = await self.async_client.get().chat.completions.create(
+                model=self.model_name,
+                messages=self._prepare_dialogue(dialogue),
+                stream=True,
+                tools=functions,
+            )
+
+            is_active = True
+            buffer = ""
+
+            async for chunk in stream:
+                try:
+                    delta = self._delta(chunk)
+                    content = delta.content if hasattr(delta, "content") else None
+                    tool_calls = (
+                        delta.tool_calls if hasattr(delta, "tool_calls") else None
+                    )
+
+                    # 如果是工具调用，直接传递
+                    if tool_calls:
+                        yield None, tool_calls
+                        continue
+
+                    if content:
+                        buffer, is_active, output = self._filter_think(
+                            buffer, content, is_active
+                        )
+                        if output:
+                            yield output, None
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"Error processing function chunk: {e}")
                     continue
@@ -4,6 +4,7 @@ from openai.types import CompletionUsage
 from config.logger import setup_logging
 from core.utils.util import check_model_key
 from core.providers.llm.base import LLMProviderBase
+from core.utils.async_pipeline import LoopLocal
 
 TAG = __name__
 logger = setup_logging()
@@ -46,6 +47,14 @@ class LLMProvider(LLMProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
         self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url, timeout=httpx.Timeout(self.timeout))
+        # 异步客户端按事件循环分别创建
+        self.async_client = LoopLocal(
+            lambda: openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+            )
+        )
 
     @staticmethod
     def normalize_dialogue(dialogue):
@@ -55,87 +64,121 @@ class LLMProvider(LLMProviderBase):
                 msg["content"] = ""
         return dialogue
 
-    def response(self, session_id, dialogue, **kwargs):
-        try:
-            dialogue = self.normalize_dialogue(dialogue)
+    def _request_params(self, dialogue, kwargs, functions=None):
+        dialogue = self.normalize_dialogue(dialogue)
+
+        request_params = {
+            "model": self.model_name,
+            "messages": dialogue,
+            "stream": True,
+        }
+        if functions is not None:
+            request_params["tools"] = functions
+
+        # 添加可选参数,只有当参数不为None时才添加
+        optional_params = {
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "temperature": kwargs.get("temperature", self.temperature),
+            "top_p": kwargs.get("top_p", self.top_p),
+            "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
+        }
 
-            request_params = {
-                "model": self.model_name,
-                "messages": dialogue,
-                "stream": True,
-            }
+        for key, value in optional_params.items():
+            if value is not None:
+                request_params[key] = value
+        return request_params
 
-            # 添加可选参数,只有当参数不为None时才添加
-            optional_params = {
-                "max_tokens": kwargs.get("max_tokens", self.max_tokens),
-                "temperature": kwargs.get("temperature", self.temperature),
-                "top_p": kwargs.get("top_p", self.top_p),
-                "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
-            }
+    @staticmethod
+    def _filter_think(chunk, is_active):
+        """提取chunk中的文本并过滤<think>标签内的内容，返回 (可输出文本, 是否处于标签外)"""
+        try:
+            delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
+            content = getattr(delta, "content", "") if delta else ""
+        except IndexError:
+            content = ""
+        if content:
+            if "<think>" in content:
+                is_active = False
+                content = content.split("<think>")[0]
+            if "</think>" in content:
+                is_active = True
+                content = content.split("</think>")[-1]
+        return (content if is_active else ""), is_active
 
-            for key, value in optional_params.items():
-                if value is not None:
-                    request_params[key] = value
+    @staticmethod
+    def _function_chunk(chunk):
+        """解析函数调用模式的chunk，返回 (content, tool_calls)，用量统计chunk返回None"""
+        if getattr(chunk, "choices", None):
+            delta = chunk.choices[0].delta
+            content = getattr(delta, "content", "")
+            tool_calls = getattr(delta, "tool_calls", None)
+            return content, tool_calls
+        if isinstance(getattr(chunk, "usage", None), CompletionUsage):
+            usage_info = getattr(chunk, "usage", None)
+            logger.bind(tag=TAG).info(
+                f"Token 消耗：输入 {getattr(usage_info, 'prompt_tokens', '未知')}，"
+                f"输出 {getattr(usage_info, 'completion_tokens', '未知')}，"
+                f"共计 {getattr(usage_info, 'total_tokens', '未知')}"
+            )
+        return None
 
-            responses = self.client.chat.completions.create(**request_params)
+    def response(self, session_id, dialogue, **kwargs):
+        try:
+            responses = self.client.chat.completions.create(
+                **self._request_params(dialogue, kwargs)
+            )
 
             is_active = True
             for chunk in responses:
-                try:
-                    delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
-                    content = getattr(delta, "content", "") if delta else ""
-                except IndexError:
-                    content = ""
+                content, is_active = self._filter_think(chunk, is_active)
                 if content:
-                    if "<think>" in content:
-                        is_active = False
-                        content = content.split("<think>")[0]
-                    if "</think>" in content:
-                        is_active = True
-                        content = content.split("</think>")[-1]
-                    if is_active:
-                        yield content
+                    yield content
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in response generation: {e}")
 
     def response_with_functions(self, session_id, dialogue, functions=None, **kwargs):
         try:
-            dialogue = self.normalize_dialogue(dialogue)
+            stream = self.client.chat.completions.create(
+                **self._request_params(dialogue, kwargs, functions)
+            )
 
-            request_params = {
-                "model": self.model_name,
-                "messages": dialogue,
-                "stream": True,
-                "tools": functions,
-            }
+            for chunk in stream:
+                item = self._function_chunk(chunk)
+                if item is not None:
+                    yield item
 
-            optional_params = {
-                "max_tokens": kwargs.get("max_tokens", self.max_tokens),
-                "temperature": kwargs.get("temperature", self.temperature),
-                "top_p": kwargs.get("top_p", self.top_p),
-                "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
-            }
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in function call streaming: {e}")
+            yield f"【OpenAI服务响应异常: {e}】", None
 
-            for key, value in optional_params.items():
-                if value is not None:
-                    request_params[key] = value
+    async def aresponse(self, session_id, dialogue, **kwargs):
+        try:
+            responses = await self.async_client.get().chat.completions.create(
+                **self._request_params(dialogue, kwargs)
+            )
 
-            stream = self.client.chat.completions.create(**request_params)
+            is_active = True
+            async for chunk in responses:
+                content, is_active = self._filter_think(chunk, is_active)
+                if content:
+                    yield content
 
-            for chunk in stream:
-                if getattr(chunk, "choices", None):
-                    delta = chunk.choices[0].delta
-                    content = getattr(delta, "content", "")
-                    tool_calls = getattr(delta, "tool_calls", None)
-                    yield content, tool_calls
-                elif isinstance(getattr(chunk, "usage", None), CompletionUsage):
-                    usage_info = getattr(chunk, "usage", None)
-                    logger.bind(tag=TAG).info(
-                        f"Token 消耗：输入 {getattr(usage_info, 'prompt_tokens', '未知')}，"
-                        f"输出 {getattr(usage_info, 'completion_tokens', '未知')}，"
-                        f"共计 {getattr(usage_info, 'total_tokens', '未知')}"
-                    )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+
+    async def aresponse_with_functions(
+        self, session_id, dialogue, functions=None, **kwargs
+    ):
+        try:
+            stream = await self.async_client.get().chat.completions.create(
+                **self._request_params(dialogue, kwargs, functions)
+            )
+
+            async for chunk in stream:
+                item = self._function_chunk(chunk)
+                if item is not None:
+                    yield item
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in function call streaming: {e}")
@@ -152,8 +152,8 @@ class TTSProvider(TTSProviderBase):
                         f"添加音频文件到待播放列表: {message.content_file}"
                     )
                     if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        # 记录音频文件，本次会话的语音播放完后边解码边播放
+                        self._queue_audio_file(message.content_file, message.content_detail)
 
                 if message.sentence_type == SentenceType.LAST:
                     try:
@@ -177,6 +177,7 @@ class TTSProvider(TTSProviderBase):
 
     async def text_to_speak(self, text, _):
         """发送文本到TTS服务进行合成"""
+        self._mark_trace("tts_first_segment")
         try:
             if self.ws is None:
                 logger.bind(tag=TAG).warning("WebSocket连接不存在，终止发送文本")
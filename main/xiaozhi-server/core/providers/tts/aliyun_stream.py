@@ -1,88 +1,39 @@
 import random
 import uuid
 import json
-import hmac
-import hashlib
-import base64
 import time
 import queue
 import asyncio
+import functools
 import traceback
 from asyncio import Task
 import websockets
 import os
-from datetime import datetime
-from urllib import parse
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from core.utils.tts import MarkdownCleaner
 from core.utils import opus_encoder_utils, textUtils
+from core.utils.ws_pool import get_ws_pool
+from core.utils.aliyun_token import get_aliyun_token_manager
 from config.logger import setup_logging
 
 TAG = __name__
 logger = setup_logging()
 
+# 服务端会断开超过10秒没有数据的连接，连接池中空闲的连接以此为准过期
+NLS_IDLE_TIMEOUT = 10
 
-class AccessToken:
-    @staticmethod
-    def _encode_text(text):
-        encoded_text = parse.quote_plus(text)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def _encode_dict(dic):
-        keys = dic.keys()
-        dic_sorted = [(key, dic[key]) for key in sorted(keys)]
-        encoded_text = parse.urlencode(dic_sorted)
-        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
-
-    @staticmethod
-    def create_token(access_key_id, access_key_secret):
-        parameters = {
-            "AccessKeyId": access_key_id,
-            "Action": "CreateToken",
-            "Format": "JSON",
-            "RegionId": "cn-shanghai",  # 使用上海地域进行Token获取
-            "SignatureMethod": "HMAC-SHA1",
-            "SignatureNonce": str(uuid.uuid1()),
-            "SignatureVersion": "1.0",
-            "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "Version": "2019-02-28",
-        }
-
-        query_string = AccessToken._encode_dict(parameters)
-        string_to_sign = (
-            "GET"
-            + "&"
-            + AccessToken._encode_text("/")
-            + "&"
-            + AccessToken._encode_text(query_string)
-        )
-
-        secreted_string = hmac.new(
-            bytes(access_key_secret + "&", encoding="utf-8"),
-            bytes(string_to_sign, encoding="utf-8"),
-            hashlib.sha1,
-        ).digest()
-        signature = base64.b64encode(secreted_string)
-        signature = AccessToken._encode_text(signature)
-
-        full_url = "http://nls-meta.cn-shanghai.aliyuncs.com/?Signature=%s&%s" % (
-            signature,
-            query_string,
-        )
 
-        import requests
-
-        response = requests.get(full_url)
-        if response.ok:
-            root_obj = response.json()
-            key = "Token"
-            if key in root_obj:
-                token = root_obj[key]["Id"]
-                expire_time = root_obj[key]["ExpireTime"]
-                return token, expire_time
-        return None, None
+async def _connect(ws_url, token):
+    """建立新的WebSocket连接，Token在握手时通过请求头发送"""
+    logger.bind(tag=TAG).debug("开始建立新连接...")
+    return await websockets.connect(
+        ws_url,
+        additional_headers={"X-NLS-Token": token},
+        ping_interval=30,
+        ping_timeout=10,
+        close_timeout=10,
+    )
 
 
 class TTSProvider(TTSProviderBase):
@@ -130,6 +81,13 @@ class TTSProvider(TTSProviderBase):
         self.ws = None
         self._monitor_task = None
         self.last_active_time = None
+        # 相同服务地址和账号的连接可以在设备之间复用
+        self.ws_pool_key = (
+            "aliyun_stream",
+            self.ws_url,
+            self.appkey,
+            config.get("access_key_id") or config.get("token"),
+        )
 
         # 专属tts设置
         self.task_id = uuid.uuid4().hex
@@ -139,64 +97,46 @@ class TTSProvider(TTSProviderBase):
             sample_rate=16000, channels=1, frame_size_ms=60
         )
 
-        # Token管理
-        if self.access_key_id and self.access_key_secret:
-            self._refresh_token()
-        else:
-            self.token = config.get("token")
-            self.expire_time = None
+        # 使用AccessKey时Token由进程内共享的Token管理器按需获取和刷新
+        self.token = config.get("token")
 
-    def _refresh_token(self):
-        """刷新Token并记录过期时间"""
+    async def _get_token(self):
+        """获取访问Token，使用AccessKey时从共享的Token管理器读取"""
         if self.access_key_id and self.access_key_secret:
-            self.token, expire_time_str = AccessToken.create_token(
+            self.token = await get_aliyun_token_manager().get_token(
                 self.access_key_id, self.access_key_secret
             )
-            if not expire_time_str:
-                raise ValueError("无法获取有效的Token过期时间")
-
-            expire_str = str(expire_time_str).strip()
-
-            try:
-                if expire_str.isdigit():
-                    expire_time = datetime.fromtimestamp(int(expire_str))
-                else:
-                    expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
-                self.expire_time = expire_time.timestamp() - 60
-            except Exception as e:
-                raise ValueError(f"无效的过期时间格式: {expire_str}") from e
-        else:
-            self.expire_time = None
-
         if not self.token:
             raise ValueError("无法获取有效的访问Token")
+        return self.token
 
-    def _is_token_expired(self):
-        """检查Token是否过期"""
-        if not self.expire_time:
-            return False
-        return time.time() > self.expire_time
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        # 设备接入时预热连接，首次会话不用等待握手
+        await self._get_token()
+        get_ws_pool().prewarm(self.ws_pool_key, self._pool_connect(), NLS_IDLE_TIMEOUT)
+
+    def _pool_connect(self):
+        """连接池使用的建连函数，只携带当前Token，不引用provider实例"""
+        return functools.partial(_connect, self.ws_url, self.token)
 
     async def _ensure_connection(self):
         """确保WebSocket连接可用"""
         try:
-            if self._is_token_expired():
-                logger.bind(tag=TAG).warning("Token已过期，正在自动刷新...")
-                self._refresh_token()
+            await self._get_token()
             current_time = time.time()
-            if self.ws and current_time - self.last_active_time < 10:
+            if self.ws and current_time - self.last_active_time < NLS_IDLE_TIMEOUT:
                 # 10秒内才可以复用链接进行连续对话
                 self.task_id = uuid.uuid4().hex
                 logger.bind(tag=TAG).info(f"使用已有链接..., task_id: {self.task_id}")
                 return self.ws
-            logger.bind(tag=TAG).debug("开始建立新连接...")
-
-            self.ws = await websockets.connect(
-                self.ws_url,
-                additional_headers={"X-NLS-Token": self.token},
-                ping_interval=30,
-                ping_timeout=10,
-                close_timeout=10,
+            if self.ws:
+                ws, self.ws = self.ws, None
+                await get_ws_pool().release(self.ws_pool_key, ws, reusable=False)
+
+            # 优先租用连接池中已建立的连接，10秒内空闲的连接可以直接开始新任务
+            self.ws = await get_ws_pool().acquire(
+                self.ws_pool_key, self._pool_connect(), NLS_IDLE_TIMEOUT
             )
             self.task_id = uuid.uuid4().hex
             logger.bind(tag=TAG).debug(f"WebSocket连接建立成功, task_id: {self.task_id}")
@@ -261,8 +201,8 @@ class TTSProvider(TTSProviderBase):
                         f"添加音频文件到待播放列表: {message.content_file}"
                     )
                     if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        # 记录音频文件，本次会话的语音播放完后边解码边播放
+                        self._queue_audio_file(message.content_file, message.content_detail)
                 if message.sentence_type == SentenceType.LAST:
                     try:
                         logger.bind(tag=TAG).debug("开始结束TTS会话...")
@@ -283,6 +223,7 @@ class TTSProvider(TTSProviderBase):
                 )
 
     async def text_to_speak(self, text, _):
+        self._mark_trace("tts_first_segment")
         try:
             if self.ws is None:
                 logger.bind(tag=TAG).warning(f"WebSocket连接不存在，终止发送文本")
@@ -384,6 +325,11 @@ class TTSProvider(TTSProviderBase):
                         )
                     finally:
                         self._monitor_task = None
+                # 合成正常结束后连接仍然可用，归还给连接池
+                if self.ws:
+                    ws, self.ws = self.ws, None
+                    self.last_active_time = None
+                    await get_ws_pool().release(self.ws_pool_key, ws)
         except Exception as e:
             logger.bind(tag=TAG).error(f"关闭会话失败: {str(e)}")
             # 确保清理资源
@@ -392,6 +338,8 @@ class TTSProvider(TTSProviderBase):
 
     async def close(self):
         """资源清理"""
+        # 监听任务还在运行说明会话未结束，连接不能再给其他会话使用
+        reusable = self._monitor_task is None or self._monitor_task.done()
         if self._monitor_task:
             try:
                 self._monitor_task.cancel()
@@ -403,12 +351,9 @@ class TTSProvider(TTSProviderBase):
             self._monitor_task = None
 
         if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
+            ws, self.ws = self.ws, None
             self.last_active_time = None
+            await get_ws_pool().release(self.ws_pool_key, ws, reusable)
 
     async def _start_monitor_tts_response(self):
         """监听TTS响应"""
@@ -482,9 +427,8 @@ class TTSProvider(TTSProviderBase):
             audio_data = []
 
             async def _generate_audio():
-                # 刷新Token（如果需要）
-                if self._is_token_expired():
-                    self._refresh_token()
+                # 获取Token（过期时由Token管理器刷新）
+                await self._get_token()
 
                 # 建立WebSocket连接
                 ws = await websockets.connect(
@@ -6,16 +6,23 @@ import queue
 import asyncio
 import threading
 import traceback
+import concurrent.futures
+from collections import deque
 from core.utils import p3
 from datetime import datetime
-from core.utils import textUtils
 from typing import Callable, Any
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
+from core.utils.text_segmenter import SentenceSegmenter
 from core.utils.output_counter import add_device_output
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
+from core.utils.async_pipeline import LoopQueue
+from core.utils.audio_stream import AudioFileStream, FRAME_DURATION
+from core.utils.tts_cache import get_tts_cache
+from core.utils.latency_trace import mark_stage
+from core.utils.metrics import get_server_metrics
 from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
 from core.providers.tts.dto.dto import (
     TTSMessageDTO,
@@ -28,10 +35,60 @@ TAG = __name__
 logger = setup_logging()
 
 
+class _SegmentAudio(list):
+    """预合成句子的音频数据，put接口与音频队列一致"""
+
+    def put(self, item):
+        self.append(item)
+
+
+# 配置项名称匹配时不参与语音缓存键计算：密钥类配置，以及与合成结果无关的配置
+_CACHE_KEY_SECRET = re.compile(
+    r"(?:^|_)(?:key|appkey|apikey|secret|token|password|passwd|authorization|cookie)(?:$|_)",
+    re.IGNORECASE,
+)
+_CACHE_KEY_IGNORED = ("type", "output_dir", "delete_audio_file", "tts_segment")
+
+
+def _cache_key_config(value):
+    """去掉密钥后的provider配置，嵌套的字典和列表（如自定义请求参数、请求头）同样处理"""
+    if isinstance(value, dict):
+        return {
+            k: _cache_key_config(v)
+            for k, v in value.items()
+            if not _CACHE_KEY_SECRET.search(str(k))
+        }
+    if isinstance(value, (list, tuple)):
+        return [_cache_key_config(v) for v in value]
+    return value
+
+
 class TTSProviderBase(ABC):
+    # 运行时可能被修改的合成参数，与provider配置一起参与语音缓存键计算
+    CACHE_KEY_ATTRS = (
+        "voice",
+        "model",
+        "speed",
+        "pitch",
+        "volume",
+        "emotion",
+        "language",
+        "format",
+        "response_format",
+        "sample_rate",
+        "voice_setting",
+        "audio_setting",
+        "reference_id",
+        "api_url",
+    )
+
     def __init__(self, config, delete_audio_file):
         self.interface_type = InterfaceType.NON_STREAM
         self.conn = None
+        # 语音缓存键使用完整的provider配置（去掉密钥），参考音频、语速、说话人等都会区分缓存
+        self.cache_key_config = _cache_key_config(
+            {k: v for k, v in (config or {}).items() if k not in _CACHE_KEY_IGNORED}
+        )
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
         self.output_file = config.get("output_dir", "tmp/")
@@ -40,34 +97,18 @@ class TTSProviderBase(ABC):
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
-        self.punctuations = (
-            "。",
-            "？",
-            "?",
-            "！",
-            "!",
-            "；",
-            ";",
-            "：",
-        )
-        self.first_sentence_punctuations = (
-            "，",
-            "~",
-            "、",
-            ",",
-            "。",
-            "？",
-            "?",
-            "！",
-            "!",
-            "；",
-            ";",
-            "：",
-        )
-        self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+        # 流式分句：provider配置中的 tts_segment 优先于全局配置
+        self.segmenter = SentenceSegmenter()
+        self.segment_config = config.get("tts_segment") or {}
+        # 流式TTS正在录制的缓存：(缓存键, 音频帧列表)
+        self._tts_cache_record = None
+        # 预合成：同时合成后面的tts_lookahead句，按提交顺序放入播放队列
+        self.tts_lookahead = 0
+        self._lookahead = deque()
+        self._lookahead_lock = threading.Lock()
+        # 音频文件（本地音乐）边解码边播放：领先发送位置的最大帧数、每次解码的帧数
+        self.file_stream_lookahead = 10
+        self.file_stream_chunk = 5
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -75,15 +116,93 @@ class TTSProviderBase(ABC):
             f"tts-{datetime.now().date()}@{uuid.uuid4().hex}{extension}",
         )
 
+    def _mark_trace(self, stage):
+        """记录当前对话轮次的延迟追踪阶段"""
+        if self.conn is not None:
+            mark_stage(self.conn, stage)
+
     def handle_opus(self, opus_data: bytes):
+        self._mark_trace("tts_first_audio")
         logger.bind(tag=TAG).debug(f"The number of frames pushed into the queue {len(opus_data)}")
+        if self._tts_cache_record is not None:
+            self._tts_cache_record[1].append(opus_data)
         self.tts_audio_queue.put((SentenceType.MIDDLE, opus_data, None))
 
+    def cache_key_params(self) -> dict:
+        """影响合成结果的参数，用于计算语音缓存键：provider配置加上当前的合成参数"""
+        attrs = {}
+        for attr in self.CACHE_KEY_ATTRS:
+            value = getattr(self, attr, None)
+            if value not in (None, ""):
+                attrs[attr] = value
+        return {"config": self.cache_key_config, "attrs": attrs}
+
+    def _tts_cache_key(self, text, audio_format="opus"):
+        provider = f"{type(self).__module__}.{type(self).__qualname__}"
+        return get_tts_cache().make_key(
+            provider, self.cache_key_params(), audio_format, text
+        )
+
+    def _play_cached_tts(self, text, is_last=False) -> bool:
+        """流式TTS在text_to_speak开头调用：命中缓存时直接推送音频并返回True，
+        未命中时开始录制本句的音频帧，合成成功后由 _commit_tts_cache 写入缓存"""
+        cache_key = self._tts_cache_key(text)
+        cached_frames = get_tts_cache().get(cache_key)
+        if cached_frames is None:
+            self._tts_cache_record = (cache_key, []) if cache_key else None
+            return False
+
+        self._tts_cache_record = None
+        logger.bind(tag=TAG).info(f"TTS cache hit: {text}")
+        self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+        for opus_data in cached_frames:
+            self.handle_opus(opus_data)
+        if is_last:
+            self._process_before_stop_play_files()
+        return True
+
+    def _commit_tts_cache(self):
+        record, self._tts_cache_record = self._tts_cache_record, None
+        if record is not None:
+            get_tts_cache().put(*record)
+
     def handle_audio_file(self, file_audio: bytes, text):
         self.before_stop_play_files.append((file_audio, text))
 
-    def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
+    def _queue_audio_file(self, tts_file, text):
+        """流式TTS：音频文件在本次会话的语音之后播放，先记录路径，会话结束时再边解码边发送"""
+        self.before_stop_play_files.append((tts_file, text))
+
+    def to_tts_stream(
+        self, text, opus_handler: Callable[[bytes], None] = None, audio_queue=None
+    ) -> None:
+        self._mark_trace("tts_first_segment")
         text = MarkdownCleaner.clean_markdown(text)
+        if audio_queue is None:
+            audio_queue = self.tts_audio_queue
+        tts_cache = get_tts_cache()
+        audio_format = (
+            "opus" if self.delete_audio_file or self.conn is None else self.conn.audio_format
+        )
+        cache_key = self._tts_cache_key(text, audio_format)
+        cached_frames = tts_cache.get(cache_key)
+        if cached_frames is not None:
+            logger.bind(tag=TAG).info(f"TTS cache hit: {text}")
+            if self.delete_audio_file:
+                audio_queue.put((SentenceType.FIRST, None, text))
+            for audio_data in cached_frames:
+                opus_handler(audio_data)
+            return None
+
+        # 未命中时边下发边收集音频帧，合成成功后写入缓存
+        frames = []
+        audio_handler = opus_handler
+        if cache_key is not None:
+
+            def audio_handler(audio_data):
+                frames.append(audio_data)
+                opus_handler(audio_data)
+
         max_repeat_time = 5
         if self.delete_audio_file:
             # Files that need to be deleted can be directly converted to audio data
@@ -91,13 +210,14 @@ class TTSProviderBase(ABC):
                 try:
                     audio_bytes = asyncio.run(self.text_to_speak(text, None))
                     if audio_bytes:
-                        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                        audio_queue.put((SentenceType.FIRST, None, text))
                         audio_bytes_to_data_stream(
                             audio_bytes,
                             file_type=self.audio_file_type,
                             is_opus=True,
-                            callback=opus_handler,
+                            callback=audio_handler,
                         )
+                        tts_cache.put(cache_key, frames)
                         break
                     else:
                         max_repeat_time -= 1
@@ -105,6 +225,7 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).warning(
                         f"Speech generation failed{5 - max_repeat_time + 1} times: {text}，mistake: {e}"
                     )
+                    get_server_metrics().record_provider_retry("tts", self)
                     max_repeat_time -= 1
             if max_repeat_time > 0:
                 logger.bind(tag=TAG).info(
@@ -114,6 +235,7 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(
                     f"Speech generation failed: {text}，Please check if your network or service is working properly"
                 )
+                get_server_metrics().record_provider_error("tts", self)
             return None
         else:
             tmp_file = self.generate_filename()
@@ -125,6 +247,7 @@ class TTSProviderBase(ABC):
                         logger.bind(tag=TAG).warning(
                             f"Speech generation failed{5 - max_repeat_time + 1} times: {text}，mistake: {e}"
                         )
+                        get_server_metrics().record_provider_retry("tts", self)
                         # 未执行成功，删除文件
                         if os.path.exists(tmp_file):
                             os.remove(tmp_file)
@@ -138,8 +261,11 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).error(
                         f"Speech generation failed: {text}，Please check if your network or service is working properly"
                     )
-                    self.tts_audio_queue.put((SentenceType.FIRST, None, text))
-                self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                    get_server_metrics().record_provider_error("tts", self)
+                    audio_queue.put((SentenceType.FIRST, None, text))
+                self._process_audio_file_stream(tmp_file, callback=audio_handler)
+                if max_repeat_time > 0:
+                    tts_cache.put(cache_key, frames)
             except Exception as e:
                 logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
                 return None
@@ -148,6 +274,11 @@ class TTSProviderBase(ABC):
         text = MarkdownCleaner.clean_markdown(text)
         max_repeat_time = 5
         if self.delete_audio_file:
+            tts_cache = get_tts_cache()
+            cache_key = self._tts_cache_key(text)
+            cached_frames = tts_cache.get(cache_key)
+            if cached_frames is not None:
+                return list(cached_frames)
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
@@ -160,6 +291,7 @@ class TTSProviderBase(ABC):
                             is_opus=True,
                             callback=lambda data: audio_datas.append(data)
                         )
+                        tts_cache.put(cache_key, audio_datas)
                         return audio_datas
                     else:
                         max_repeat_time -= 1
@@ -167,6 +299,7 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).warning(
                         f"Speech generation failed{5 - max_repeat_time + 1} times: {text}，mistake: {e}"
                     )
+                    get_server_metrics().record_provider_retry("tts", self)
                     max_repeat_time -= 1
             if max_repeat_time > 0:
                 logger.bind(tag=TAG).info(
@@ -176,6 +309,7 @@ class TTSProviderBase(ABC):
                 logger.bind(tag=TAG).error(
                     f"Speech generation failed: {text}，Please check if your network or service is working properly"
                 )
+                get_server_metrics().record_provider_error("tts", self)
             return None
         else:
             tmp_file = self.generate_filename()
@@ -187,6 +321,7 @@ class TTSProviderBase(ABC):
                         logger.bind(tag=TAG).warning(
                             f"Speech generation failed{5 - max_repeat_time + 1} times: {text}，mistake: {e}"
                         )
+                        get_server_metrics().record_provider_retry("tts", self)
                         # 未执行成功，删除文件
                         if os.path.exists(tmp_file):
                             os.remove(tmp_file)
@@ -200,6 +335,7 @@ class TTSProviderBase(ABC):
                     logger.bind(tag=TAG).error(
                         f"Speech generation failed: {text}，Please check if your network or service is working properly"
                     )
+                    get_server_metrics().record_provider_error("tts", self)
 
                 return tmp_file
             except Exception as e:
@@ -252,6 +388,21 @@ class TTSProviderBase(ABC):
 
     async def open_audio_channels(self, conn):
         self.conn = conn
+        tts_lookahead = conn.config.get("tts_lookahead", 0)
+        self.tts_lookahead = int(tts_lookahead) if tts_lookahead else 0
+        self.segmenter.configure_from(
+            {**(conn.config.get("tts_segment") or {}), **self.segment_config}
+        )
+        stream_config = conn.config.get("audio_file_stream") or {}
+        lookahead_ms = stream_config.get("lookahead_ms")
+        chunk_ms = stream_config.get("chunk_ms")
+        if lookahead_ms:
+            self.file_stream_lookahead = max(1, int(lookahead_ms) // FRAME_DURATION)
+        if chunk_ms:
+            self.file_stream_chunk = max(1, int(chunk_ms) // FRAME_DURATION)
+        if conn.async_pipeline:
+            self._open_async_audio_channels(conn)
+            return
         # tts 消化线程
         self.tts_priority_thread = threading.Thread(
             target=self.tts_text_priority_thread, daemon=True
@@ -264,43 +415,72 @@ class TTSProviderBase(ABC):
         )
         self.audio_play_priority_thread.start()
 
+    def _open_async_audio_channels(self, conn):
+        """异步流水线模式：音频队列由协程消费，默认的非流式文本处理也改为协程"""
+        audio_queue = LoopQueue(conn.loop)
+        audio_queue.drain_from(self.tts_audio_queue)
+        self.tts_audio_queue = audio_queue
+        conn.spawn_pipeline_task(self._audio_play_priority_task)
+
+        if type(self).tts_text_priority_thread is TTSProviderBase.tts_text_priority_thread:
+            text_queue = LoopQueue(conn.loop)
+            text_queue.drain_from(self.tts_text_queue)
+            self.tts_text_queue = text_queue
+            conn.spawn_pipeline_task(self._tts_text_priority_task)
+        else:
+            # 重写了文本处理线程的流式TTS，文本侧仍使用线程
+            self.tts_priority_thread = threading.Thread(
+                target=self.tts_text_priority_thread, daemon=True
+            )
+            self.tts_priority_thread.start()
+
     # 这里默认是非流式的处理方式
     # 流式处理方式请在子类中重写
     def tts_text_priority_thread(self):
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = self.tts_text_queue.get(
+                    timeout=self.segmenter.wait_timeout(1)
+                )
                 if message.sentence_type == SentenceType.FIRST:
                     self.conn.client_abort = False
                 if self.conn.client_abort:
                     logger.bind(tag=TAG).info("Upon receiving an interruption message, the TTS text processing thread is terminated")
+                    self.cancel_lookahead()
                     continue
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
+                    self.segmenter.reset()
                     self.tts_audio_first_sentence = True
+                    self.cancel_lookahead()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
+                    segment_text = self.segmenter.append(message.content_detail)
                     if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
+                        if self.tts_lookahead > 0:
+                            self._synthesize_ahead(segment_text)
+                        else:
+                            self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
                 elif ContentType.FILE == message.content_type:
+                    self._wait_lookahead()
                     self._process_remaining_text_stream(opus_handler=self.handle_opus)
                     tts_file = message.content_file
                     if tts_file and os.path.exists(tts_file):
-                        self._process_audio_file_stream(
-                            tts_file, callback=self.handle_opus
-                        )
+                        self._stream_audio_file(tts_file)
                 if message.sentence_type == SentenceType.LAST:
+                    self._wait_lookahead()
                     self._process_remaining_text_stream(opus_handler=self.handle_opus)
                     self.tts_audio_queue.put(
                         (message.sentence_type, [], message.content_detail)
                     )
 
             except queue.Empty:
+                # 超过分句等待时间仍未出现标点时，合成已缓冲的文本
+                segment_text = self.segmenter.poll()
+                if segment_text and not self.conn.client_abort:
+                    if self.tts_lookahead > 0:
+                        self._synthesize_ahead(segment_text)
+                    else:
+                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
                 continue
             except Exception as e:
                 logger.bind(tag=TAG).error(
@@ -308,6 +488,88 @@ class TTSProviderBase(ABC):
                 )
                 continue
 
+    def _synthesize_segment(self, text):
+        """在线程池中合成一句，音频先缓存在本句的列表中，由 _flush_lookahead 按顺序放入播放队列"""
+        segment_audio = _SegmentAudio()
+        if self.conn.client_abort:
+            return segment_audio
+
+        def opus_handler(audio_data):
+            self._mark_trace("tts_first_audio")
+            segment_audio.put((SentenceType.MIDDLE, audio_data, None))
+
+        self.to_tts_stream(text, opus_handler=opus_handler, audio_queue=segment_audio)
+        return segment_audio
+
+    def _dispatch_lookahead(self, text) -> bool:
+        """提交一句的预合成，线程池饱和时返回False"""
+        future = self.conn.submit_task("transcode", self._synthesize_segment, text)
+        if future is None:
+            return False
+        with self._lookahead_lock:
+            self._lookahead.append(future)
+        future.add_done_callback(lambda _: self._flush_lookahead())
+        return True
+
+    def _flush_lookahead(self):
+        """按提交顺序把已合成完的句子放入播放队列，前一句未完成时后面的句子继续等待"""
+        with self._lookahead_lock:
+            while self._lookahead and self._lookahead[0].done():
+                future = self._lookahead.popleft()
+                if future.cancelled():
+                    continue
+                if future.exception() is not None:
+                    logger.bind(tag=TAG).error(f"TTS预合成失败: {future.exception()}")
+                    continue
+                for item in future.result():
+                    self.tts_audio_queue.put(item)
+
+    def _lookahead_head(self, limit):
+        """预合成的句子数达到limit时返回最早的一句，否则返回None"""
+        with self._lookahead_lock:
+            if len(self._lookahead) >= limit:
+                return self._lookahead[0]
+        return None
+
+    def cancel_lookahead(self):
+        """打断或新一轮对话开始时取消排队中的预合成，已在合成中的结果直接丢弃"""
+        with self._lookahead_lock:
+            pending = list(self._lookahead)
+            self._lookahead.clear()
+        # cancel会同步触发完成回调，需在锁外调用
+        for future in pending:
+            future.cancel()
+
+    def _synthesize_ahead(self, text):
+        """预合成模式下提交一句，预合成句数已满时等待最早的一句播放"""
+        while (head := self._lookahead_head(self.tts_lookahead)) is not None:
+            concurrent.futures.wait([head])
+            self._flush_lookahead()
+        if not self._dispatch_lookahead(text):
+            self._wait_lookahead()
+            self.to_tts_stream(text, opus_handler=self.handle_opus)
+
+    def _wait_lookahead(self):
+        """等待所有预合成的句子放入播放队列"""
+        while (head := self._lookahead_head(1)) is not None:
+            concurrent.futures.wait([head])
+            self._flush_lookahead()
+
+    async def _synthesize_ahead_async(self, text):
+        while (head := self._lookahead_head(self.tts_lookahead)) is not None:
+            await asyncio.wait([asyncio.wrap_future(head)])
+            self._flush_lookahead()
+        if not self._dispatch_lookahead(text):
+            await self._wait_lookahead_async()
+            await self.conn.worker_pools.run(
+                "transcode", self.to_tts_stream, text, self.handle_opus
+            )
+
+    async def _wait_lookahead_async(self):
+        while (head := self._lookahead_head(1)) is not None:
+            await asyncio.wait([asyncio.wrap_future(head)])
+            self._flush_lookahead()
+
     def _audio_play_priority_thread(self):
         # 需要上报的文本和音频列表
         enqueue_text = None
@@ -355,6 +617,119 @@ class TTSProviderBase(ABC):
             except Exception as e:
                 logger.bind(tag=TAG).error(f"audio_play_priority_thread: {text} {e}")
 
+    async def _tts_text_priority_task(self):
+        """非流式TTS文本处理协程（异步流水线模式），合成和转码提交到transcode线程池"""
+        pools = self.conn.worker_pools
+        while not self.conn.stop_event.is_set():
+            try:
+                try:
+                    message = await asyncio.wait_for(
+                        self.tts_text_queue.get(), self.segmenter.wait_timeout(1)
+                    )
+                except asyncio.TimeoutError:
+                    # 超过分句等待时间仍未出现标点时，合成已缓冲的文本
+                    segment_text = self.segmenter.poll()
+                    if segment_text and not self.conn.client_abort:
+                        if self.tts_lookahead > 0:
+                            await self._synthesize_ahead_async(segment_text)
+                        else:
+                            await pools.run(
+                                "transcode",
+                                self.to_tts_stream,
+                                segment_text,
+                                self.handle_opus,
+                            )
+                    continue
+                if message.sentence_type == SentenceType.FIRST:
+                    self.conn.client_abort = False
+                if self.conn.client_abort:
+                    logger.bind(tag=TAG).info("Upon receiving an interruption message, the TTS text processing task is terminated")
+                    self.cancel_lookahead()
+                    continue
+                if message.sentence_type == SentenceType.FIRST:
+                    # 初始化参数
+                    self.segmenter.reset()
+                    self.tts_audio_first_sentence = True
+                    self.cancel_lookahead()
+                elif ContentType.TEXT == message.content_type:
+                    segment_text = self.segmenter.append(message.content_detail)
+                    if segment_text:
+                        if self.tts_lookahead > 0:
+                            await self._synthesize_ahead_async(segment_text)
+                        else:
+                            await pools.run(
+                                "transcode",
+                                self.to_tts_stream,
+                                segment_text,
+                                self.handle_opus,
+                            )
+                elif ContentType.FILE == message.content_type:
+                    await self._wait_lookahead_async()
+                    await pools.run(
+                        "transcode",
+                        self._process_remaining_text_stream,
+                        self.handle_opus,
+                    )
+                    tts_file = message.content_file
+                    if tts_file and os.path.exists(tts_file):
+                        await self._stream_audio_file_async(tts_file)
+                if message.sentence_type == SentenceType.LAST:
+                    await self._wait_lookahead_async()
+                    await pools.run(
+                        "transcode",
+                        self._process_remaining_text_stream,
+                        self.handle_opus,
+                    )
+                    self.tts_audio_queue.put(
+                        (message.sentence_type, [], message.content_detail)
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"Processing TTS text failed: {str(e)}, Type: {type(e).__name__}, Stack trace: {traceback.format_exc()}"
+                )
+                continue
+
+    async def _audio_play_priority_task(self):
+        """音频发送协程（异步流水线模式），直接在事件循环中发送"""
+        # 需要上报的文本和音频列表
+        enqueue_text = None
+        enqueue_audio = None
+        while not self.conn.stop_event.is_set():
+            text = None
+            try:
+                sentence_type, audio_datas, text = await self.tts_audio_queue.get()
+
+                if self.conn.client_abort:
+                    logger.bind(tag=TAG).debug("Upon receiving an interruption message, skip the current audio data")
+                    enqueue_text, enqueue_audio = None, []
+                    continue
+
+                # 收到下一个文本开始或会话结束时进行上报
+                if sentence_type is not SentenceType.MIDDLE:
+                    # 上报TTS数据
+                    if enqueue_text is not None and enqueue_audio is not None:
+                        enqueue_tts_report(self.conn, enqueue_text, enqueue_audio)
+                    enqueue_audio = []
+                    enqueue_text = text
+
+                # 收集上报音频数据
+                if isinstance(audio_datas, bytes) and enqueue_audio is not None:
+                    enqueue_audio.append(audio_datas)
+
+                # 发送音频
+                await sendAudioMessage(self.conn, sentence_type, audio_datas, text)
+
+                # 记录输出和报告
+                if self.conn.max_output_size > 0 and text:
+                    add_device_output(self.conn.headers.get("device-id"), len(text))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"audio_play_priority_task: {text} {e}")
+
     async def start_session(self, session_id):
         pass
 
@@ -366,45 +741,6 @@ class TTSProviderBase(ABC):
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
-    def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(
-                segment_text_raw
-            )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
-
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
-            return segment_text
-        else:
-            return None
-
     def _process_audio_file_stream(
         self, tts_file, callback: Callable[[Any], Any]
     ) -> None:
@@ -420,7 +756,10 @@ class TTSProviderBase(ABC):
             self.audio_to_pcm_data_stream(tts_file, callback=callback)
         else:
             self.audio_to_opus_data_stream(tts_file, callback=callback)
+        self._remove_output_file(tts_file)
 
+    def _remove_output_file(self, tts_file):
+        """删除已播放的TTS输出文件，本地音乐等不在输出目录中的文件不删除"""
         if (
             self.delete_audio_file
             and tts_file is not None
@@ -429,12 +768,85 @@ class TTSProviderBase(ABC):
         ):
             os.remove(tts_file)
 
+    def _audio_backlog(self) -> int:
+        """已经解码、尚未发送给设备的音频帧数"""
+        backlog = self.tts_audio_queue.qsize()
+        rate_controller = getattr(self.conn, "audio_rate_controller", None)
+        if rate_controller is not None:
+            backlog += len(rate_controller.queue)
+        return backlog
+
+    def _file_stream_stopped(self) -> bool:
+        return self.conn.client_abort or self.conn.stop_event.is_set()
+
+    def _open_file_stream(self, tts_file) -> AudioFileStream:
+        return AudioFileStream(
+            tts_file,
+            is_opus=self.conn.audio_format != "pcm",
+            chunk_frames=self.file_stream_chunk,
+        )
+
+    def _stream_audio_file(self, tts_file):
+        """边解码边播放音频文件：只领先发送位置 file_stream_lookahead 帧，被打断时停止解码，结束后删除TTS输出文件"""
+        try:
+            with self._open_file_stream(tts_file) as stream:
+                while not self._file_stream_stopped():
+                    if self._audio_backlog() >= self.file_stream_lookahead:
+                        time.sleep(FRAME_DURATION / 2000)
+                        continue
+                    frames = stream.read()
+                    if not frames:
+                        break
+                    for frame in frames:
+                        self.tts_audio_queue.put((SentenceType.MIDDLE, frame, None))
+        finally:
+            self._remove_output_file(tts_file)
+
+    async def _stream_audio_file_async(self, tts_file):
+        """_stream_audio_file 的协程版本，解码在transcode线程池中进行，等待时不占用线程"""
+        pools = self.conn.worker_pools
+        try:
+            stream = self._open_file_stream(tts_file)
+            try:
+                while not self._file_stream_stopped():
+                    if self._audio_backlog() >= self.file_stream_lookahead:
+                        await asyncio.sleep(FRAME_DURATION / 2000)
+                        continue
+                    frames = await pools.run("transcode", stream.read)
+                    if not frames:
+                        break
+                    for frame in frames:
+                        self.tts_audio_queue.put((SentenceType.MIDDLE, frame, None))
+            finally:
+                stream.close()
+        finally:
+            self._remove_output_file(tts_file)
+
     def _process_before_stop_play_files(self):
-        for audio_datas, text in self.before_stop_play_files:
+        pending, self.before_stop_play_files = self.before_stop_play_files, []
+        if any(isinstance(audio_datas, str) for audio_datas, _ in pending):
+            # 有待播放的音频文件时在事件循环中边解码边发送，不阻塞调用方（可能是上游WebSocket的接收协程）
+            asyncio.run_coroutine_threadsafe(
+                self._play_before_stop_files(pending), self.conn.loop
+            )
+            return
+        for audio_datas, text in pending:
             self.tts_audio_queue.put((SentenceType.MIDDLE, audio_datas, text))
-        self.before_stop_play_files.clear()
         self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
+    async def _play_before_stop_files(self, pending):
+        try:
+            for audio_datas, text in pending:
+                if not isinstance(audio_datas, str):
+                    self.tts_audio_queue.put((SentenceType.MIDDLE, audio_datas, text))
+                    continue
+                try:
+                    await self._stream_audio_file_async(audio_datas)
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"播放音频文件失败: {audio_datas}, {e}")
+        finally:
+            self.tts_audio_queue.put((SentenceType.LAST, [], None))
+
     def _process_remaining_text_stream(
         self, opus_handler: Callable[[bytes], None] = None
     ):
@@ -443,12 +855,8 @@ class TTSProviderBase(ABC):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_stream(segment_text, opus_handler=opus_handler)
-                self.processed_chars += len(full_text)
-                return True
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self.to_tts_stream(segment_text, opus_handler=opus_handler)
+            return True
         return False
@@ -1,5 +1,5 @@
-import requests
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_clients
 
 
 class TTSProvider(TTSProviderBase):
@@ -29,7 +29,7 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            response = requests.request(
+            response = get_http_clients().request(
                 "POST", self.api_url, json=request_json, headers=headers
             )
             data = response.content
@@ -1,10 +1,10 @@
 import os
 import json
 import uuid
-import requests
 from config.logger import setup_logging
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -39,9 +39,13 @@ class TTSProvider(TTSProviderBase):
             request_params[k] = v
 
         if self.method.upper() == "POST":
-            resp = requests.post(self.url, json=request_params, headers=self.headers)
+            resp = get_http_clients().request(
+                "POST", self.url, json=request_params, headers=self.headers
+            )
         else:
-            resp = requests.get(self.url, params=request_params, headers=self.headers)
+            resp = get_http_clients().request(
+                "GET", self.url, params=request_params, headers=self.headers
+            )
         if resp.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as file:
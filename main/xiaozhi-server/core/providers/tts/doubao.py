@@ -1,10 +1,10 @@
 import uuid
 import json
 import base64
-import requests
 from core.utils.util import check_model_key
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -67,8 +67,8 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            resp = get_http_clients().request(
+                "POST", self.api_url, content=json.dumps(request_json), headers=self.header
             )
             if "data" in resp.json():
                 data = resp.json()["data"]
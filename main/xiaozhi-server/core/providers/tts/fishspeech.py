@@ -1,5 +1,4 @@
 import base64
-import requests
 import ormsgpack
 from pathlib import Path
 from pydantic import BaseModel, Field, conint, model_validator
@@ -8,6 +7,7 @@ from typing import Literal
 from core.utils.util import check_model_key, parse_string_to_list
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -161,9 +161,10 @@ class TTSProvider(TTSProviderBase):
 
         pydantic_data = ServeTTSRequest(**data)
 
-        response = requests.post(
+        response = get_http_clients().request(
+            "POST",
             self.api_url,
-            data=ormsgpack.packb(
+            content=ormsgpack.packb(
                 pydantic_data, option=ormsgpack.OPT_SERIALIZE_PYDANTIC
             ),
             headers={
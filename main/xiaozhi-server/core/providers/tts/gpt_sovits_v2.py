@@ -1,7 +1,7 @@
-import requests
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
 from core.utils.util import parse_string_to_list
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -90,7 +90,7 @@ class TTSProvider(TTSProviderBase):
             "repetition_penalty": self.repetition_penalty,
         }
 
-        resp = requests.post(self.url, json=request_json)
+        resp = get_http_clients().request("POST", self.url, json=request_json)
         if resp.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as file:
@@ -1,7 +1,7 @@
-import requests
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
 from core.utils.util import parse_string_to_list
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -51,7 +51,7 @@ class TTSProvider(TTSProviderBase):
             "if_sr": self.if_sr,
         }
 
-        resp = requests.get(self.url, params=request_params)
+        resp = get_http_clients().request("GET", self.url, params=request_params)
         if resp.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as file:
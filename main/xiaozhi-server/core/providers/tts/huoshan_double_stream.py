@@ -3,6 +3,7 @@ import uuid
 import json
 import queue
 import asyncio
+import functools
 import traceback
 from typing import Callable, Any
 import websockets
@@ -10,6 +11,7 @@ from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.util import check_model_key
+from core.utils.ws_pool import get_ws_pool
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from asyncio import Task
@@ -139,6 +141,20 @@ class Response:
         return super().__str__()
 
 
+async def _connect(ws_url, app_id, access_token, resource_id):
+    """建立新的WebSocket连接，鉴权信息在握手时通过请求头发送"""
+    logger.bind(tag=TAG).debug("开始建立新连接...")
+    ws_header = {
+        "X-Api-App-Key": app_id,
+        "X-Api-Access-Key": access_token,
+        "X-Api-Resource-Id": resource_id,
+        "X-Api-Connect-Id": uuid.uuid4(),
+    }
+    return await websockets.connect(
+        ws_url, additional_headers=ws_header, max_size=1000000000
+    )
+
+
 class TTSProvider(TTSProviderBase):
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
@@ -163,6 +179,18 @@ class TTSProvider(TTSProviderBase):
         self.ws_url = config.get("ws_url")
         self.authorization = config.get("authorization")
         self.header = {"Authorization": f"{self.authorization}{self.access_token}"}
+        # 相同服务地址和账号的连接可以在设备之间复用，鉴权在握手时完成，key中需要包含token
+        self.ws_pool_key = (
+            "huoshan_double_stream",
+            self.ws_url,
+            self.appId,
+            self.access_token,
+            self.resource_id,
+        )
+        # 连接池后台预热时使用，不引用provider实例，设备断开后不会被连接池持有
+        self._connect = functools.partial(
+            _connect, self.ws_url, self.appId, self.access_token, self.resource_id
+        )
         self.enable_two_way = True
         self.tts_text = ""
         self.opus_encoder = opus_encoder_utils.OpusEncoderUtils(
@@ -175,27 +203,20 @@ class TTSProvider(TTSProviderBase):
     async def open_audio_channels(self, conn):
         try:
             await super().open_audio_channels(conn)
+            # 设备接入时预热连接，首次会话不用等待握手
+            get_ws_pool().prewarm(self.ws_pool_key, self._connect)
         except Exception as e:
             logger.bind(tag=TAG).error(f"Failed to open audio channels: {str(e)}")
             self.ws = None
             raise
 
     async def _ensure_connection(self):
-        """建立新的WebSocket连接，并启动监听任务（仅第一次）"""
+        """会话开始时从连接池租用WebSocket连接并启动监听任务，会话结束后由监听任务归还"""
         try:
             if self.ws:
                 logger.bind(tag=TAG).info(f"使用已有链接...")
                 return self.ws
-            logger.bind(tag=TAG).debug("开始建立新连接...")
-            ws_header = {
-                "X-Api-App-Key": self.appId,
-                "X-Api-Access-Key": self.access_token,
-                "X-Api-Resource-Id": self.resource_id,
-                "X-Api-Connect-Id": uuid.uuid4(),
-            }
-            self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
-            )
+            self.ws = await get_ws_pool().acquire(self.ws_pool_key, self._connect)
             logger.bind(tag=TAG).debug("WebSocket连接建立成功")
             
             # 连接建立成功后，启动监听任务
@@ -273,8 +294,8 @@ class TTSProvider(TTSProviderBase):
                         f"添加音频文件到待播放列表: {message.content_file}"
                     )
                     if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        # 记录音频文件，本次会话的语音播放完后边解码边播放
+                        self._queue_audio_file(message.content_file, message.content_detail)
                 if message.sentence_type == SentenceType.LAST:
                     try:
                         logger.bind(tag=TAG).debug("开始结束TTS会话...")
@@ -297,6 +318,7 @@ class TTSProvider(TTSProviderBase):
 
     async def text_to_speak(self, text, _):
         """发送文本到TTS服务"""
+        self._mark_trace("tts_first_segment")
         try:
             # 建立新连接
             if self.ws is None:
@@ -312,11 +334,8 @@ class TTSProvider(TTSProviderBase):
         except Exception as e:
             logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
             if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+                ws, self.ws = self.ws, None
+                await get_ws_pool().release(self.ws_pool_key, ws, reusable=False)
             raise
 
     async def start_session(self, session_id):
@@ -403,6 +422,8 @@ class TTSProvider(TTSProviderBase):
 
     async def close(self):
         """资源清理方法"""
+        # 没有进行中的会话时，连接可以归还给连接池
+        reusable = not self.activate_session
         self.activate_session = False
         # 取消监听任务
         if self._monitor_task:
@@ -416,15 +437,13 @@ class TTSProvider(TTSProviderBase):
             self._monitor_task = None
 
         if self.ws:
-            try:
-                await self.ws.close()
-            except:
-                pass
-            self.ws = None
+            ws, self.ws = self.ws, None
+            await get_ws_pool().release(self.ws_pool_key, ws, reusable)
 
     async def _start_monitor_tts_response(self):
-        """监听TTS响应 - 长期运行"""
+        """监听TTS响应，会话结束后把连接归还给连接池"""
         try:
+            session_finished = False  # 标记会话是否正常结束
             while not self.conn.stop_event.is_set():
                 try:
                     # 确保 `recv()` 运行在同一个 event loop
@@ -437,12 +456,14 @@ class TTSProvider(TTSProviderBase):
                         # 如果是会话结束相关事件，即使会话ID不匹配也要重置状态
                         if res.optional.event in [EVENT_SessionCanceled, EVENT_SessionFailed, EVENT_SessionFinished]:
                             logger.bind(tag=TAG).debug(f"收到残余下行结束响应重置会话状态～～")
-                            self.activate_session = False
+                            session_finished = True
+                            break
                         continue
 
                     if res.optional.event == EVENT_SessionCanceled:
                         logger.bind(tag=TAG).debug(f"释放服务端资源成功～～")
-                        self.activate_session = False
+                        session_finished = True
+                        break
                     elif res.optional.event == EVENT_TTSSentenceStart:
                         json_data = json.loads(res.payload.decode("utf-8"))
                         self.tts_text = json_data.get("text", "")
@@ -459,8 +480,9 @@ class TTSProvider(TTSProviderBase):
                         logger.bind(tag=TAG).info(f"句子语音生成成功：{self.tts_text}")
                     elif res.optional.event == EVENT_SessionFinished:
                         logger.bind(tag=TAG).debug(f"会话结束～～")
-                        self.activate_session = False
                         self._process_before_stop_play_files()
+                        session_finished = True
+                        break
                 except websockets.ConnectionClosed:
                     logger.bind(tag=TAG).warning("WebSocket连接已关闭")
                     break
@@ -470,13 +492,12 @@ class TTSProvider(TTSProviderBase):
                     )
                     traceback.print_exc()
                     break
-            # 连接异常时关闭WebSocket
+            # 会话正常结束时连接仍然可用，归还给连接池；连接异常时关闭
             if self.ws:
-                try:
-                    await self.ws.close()
-                except:
-                    pass
-                self.ws = None
+                ws, self.ws = self.ws, None
+                await get_ws_pool().release(self.ws_pool_key, ws, session_finished)
+            if session_finished:
+                self.activate_session = False
         # 监听任务退出时清理引用
         finally:
             self._monitor_task = None
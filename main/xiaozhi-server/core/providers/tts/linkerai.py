@@ -8,7 +8,7 @@ import traceback
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.providers.tts.base import TTSProviderBase
-from core.utils import opus_encoder_utils, textUtils
+from core.utils import opus_encoder_utils
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 
 TAG = __name__
@@ -37,16 +37,15 @@ class TTSProvider(TTSProviderBase):
         """流式文本处理线程"""
         while not self.conn.stop_event.is_set():
             try:
-                message = self.tts_text_queue.get(timeout=1)
+                message = self.tts_text_queue.get(
+                    timeout=self.segmenter.wait_timeout(1)
+                )
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
+                    self.segmenter.reset()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
+                    segment_text = self.segmenter.append(message.content_detail)
                     if segment_text:
                         self.to_tts_single_stream(segment_text)
 
@@ -55,13 +54,17 @@ class TTSProvider(TTSProviderBase):
                         f"添加音频文件到待播放列表: {message.content_file}"
                     )
                     if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
+                        # 记录音频文件，本次会话的语音播放完后边解码边播放
+                        self._queue_audio_file(message.content_file, message.content_detail)
                 if message.sentence_type == SentenceType.LAST:
                     # 处理剩余的文本
                     self._process_remaining_text_stream(True)
 
             except queue.Empty:
+                # 超过分句等待时间仍未出现标点时，合成已缓冲的文本
+                segment_text = self.segmenter.poll()
+                if segment_text:
+                    self.to_tts_single_stream(segment_text)
                 continue
             except Exception as e:
                 logger.bind(tag=TAG).error(
@@ -74,19 +77,14 @@ class TTSProvider(TTSProviderBase):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
-            else:
-                self._process_before_stop_play_files()
+        segment_text = self.segmenter.flush()
+        if segment_text:
+            self.to_tts_single_stream(segment_text, is_last)
         else:
             self._process_before_stop_play_files()
 
     def to_tts_single_stream(self, text, is_last=False):
+        self._mark_trace("tts_first_segment")
         try:
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
@@ -113,6 +111,8 @@ class TTSProvider(TTSProviderBase):
 
     async def text_to_speak(self, text, is_last):
         """流式处理TTS音频，每句只推送一次音频列表"""
+        if self._play_cached_tts(text, is_last):
+            return
         await self._tts_request(text, is_last)
 
     async def close(self):
@@ -155,6 +155,7 @@ class TTSProvider(TTSProviderBase):
                         logger.bind(tag=TAG).error(
                             f"TTS请求失败: {resp.status}, {await resp.text()}"
                         )
+                        self._tts_cache_record = None
                         self.tts_audio_queue.put((SentenceType.LAST, [], None))
                         return
 
@@ -189,6 +190,7 @@ class TTSProvider(TTSProviderBase):
                             callback=self.handle_opus
                         )
                         self.pcm_buffer.clear()
+                    self._commit_tts_cache()
 
                     # 如果是最后一段，输出音频获取完毕
                     if is_last:
@@ -196,6 +198,7 @@ class TTSProvider(TTSProviderBase):
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
+            self._tts_cache_record = None
             self.tts_audio_queue.put((SentenceType.LAST, [], None))
 
     def to_tts(self, text: str) -> list:
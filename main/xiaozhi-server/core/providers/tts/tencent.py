@@ -4,9 +4,9 @@ import time
 import uuid
 import json
 import base64
-import requests
 from datetime import datetime, timezone
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_clients
 
 
 class TTSProvider(TTSProviderBase):
@@ -134,8 +134,8 @@ class TTSProvider(TTSProviderBase):
             headers = self._get_auth_headers(request_json)
 
             # 发送请求
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=headers
+            resp = get_http_clients().request(
+                "POST", self.api_url, content=json.dumps(request_json), headers=headers
             )
 
             # 检查响应
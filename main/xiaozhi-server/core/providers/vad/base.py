@@ -1,9 +1,121 @@
+import time
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional
+from config.logger import setup_logging
+from core.utils.worker_pool import get_worker_pools
+
+TAG = __name__
+logger = setup_logging()
 
 
 class VADProviderBase(ABC):
+    def __init__(self, config):
+        # 处理空字符串的情况
+        threshold = config.get("threshold", "0.5")
+        threshold_low = config.get("threshold_low", "0.2")
+        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
+        batch_interval_ms = config.get("batch_interval_ms", "10")
+        max_batch_size = config.get("max_batch_size", "64")
+
+        self.vad_threshold = float(threshold) if threshold else 0.5
+        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
+
+        self.silence_threshold_ms = (
+            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
+        )
+
+        # 至少要多少帧才算有语音
+        self.frame_window_threshold = 3
+
+        # 跨连接批量推理：收到帧后等待batch_interval秒，把所有连接已就绪的帧合并成一次推理
+        # batch_interval_ms为0时退化为逐连接即时推理
+        self.batch_interval = (
+            int(batch_interval_ms) if batch_interval_ms not in (None, "") else 10
+        ) / 1000
+        self.max_batch_size = int(max_batch_size) if max_batch_size else 64
+        self._pending = []  # [(连接状态, 帧列表, Future)]
+        self._pending_event = asyncio.Event()  # 有待推理的帧时置位，空闲时批量任务不唤醒
+        self._batch_task = None
+
     @abstractmethod
-    def is_vad(self, conn, data) -> bool:
+    async def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    @abstractmethod
+    def _infer(self, requests):
+        """批量推理
+
+        Args:
+            requests: [(连接状态, 帧列表)]
+
+        Returns:
+            list[list[float]]: 每个请求对应的语音概率列表
+        """
+        pass
+
+    async def _batch_loop(self):
+        pools = get_worker_pools()
+        while True:
+            await self._pending_event.wait()
+            # 收到第一帧后再等待batch_interval，把这段时间内其他连接的帧合并成一批
+            await asyncio.sleep(self.batch_interval)
+            self._pending_event.clear()
+            pending, self._pending = self._pending, []
+            try:
+                results = await pools.run(
+                    "inference",
+                    self._infer,
+                    [(state, chunks) for state, chunks, _ in pending],
+                )
+                for (_, _, future), probs in zip(pending, results):
+                    if not future.done():
+                        future.set_result(probs)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"VAD批量推理失败: {e}")
+                for _, _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+
+    async def _predict(self, state, chunks):
+        """提交一个连接的帧，等待本轮批量推理返回语音概率"""
+        if self.batch_interval <= 0:
+            return self._infer([(state, chunks)])[0]
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._batch_loop())
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((state, chunks, future))
+        self._pending_event.set()
+        return await future
+
+    def _update_voice_state(self, conn, speech_probs) -> bool:
+        """根据语音概率更新连接的说话状态，返回当前是否有声音"""
+        client_have_voice = False
+        for speech_prob in speech_probs:
+            # 双阈值判断
+            if speech_prob >= self.vad_threshold:
+                is_voice = True
+            elif speech_prob <= self.vad_threshold_low:
+                is_voice = False
+            else:
+                is_voice = conn.last_is_voice
+
+            # 声音没低于最低值则延续前一个状态，判断为有声音
+            conn.last_is_voice = is_voice
+
+            # 更新滑动窗口
+            conn.client_voice_window.append(is_voice)
+            client_have_voice = (
+                conn.client_voice_window.count(True) >= self.frame_window_threshold
+            )
+
+            # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+            if conn.client_have_voice and not client_have_voice:
+                stop_duration = time.time() * 1000 - conn.last_activity_time
+                if stop_duration >= self.silence_threshold_ms:
+                    conn.client_voice_stop = True
+            if client_have_voice:
+                conn.client_have_voice = True
+                conn.last_activity_time = time.time() * 1000
+
+        return client_have_voice
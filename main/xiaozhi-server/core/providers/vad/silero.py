@@ -1,100 +1,121 @@
-import time
 import numpy as np
 import torch
 import opuslib_next
 from config.logger import setup_logging
 from core.providers.vad.base import VADProviderBase
+from core.utils.worker_pool import PoolRejectedError
 
 TAG = __name__
 logger = setup_logging()
 
+# Silero 16k模型每次推理的采样点数及上下文长度
+CHUNK_SAMPLES = 512
+CONTEXT_SAMPLES = 64
+
+
+class SileroStreamState:
+    """单个连接的VAD状态：Opus解码器和模型循环状态，避免多个设备互相污染"""
+
+    def __init__(self):
+        self.decoder = opuslib_next.Decoder(16000, 1)
+        self.state = torch.zeros((2, 1, 128), dtype=torch.float32)
+        self.context = torch.zeros((1, CONTEXT_SAMPLES), dtype=torch.float32)
+
+    def __del__(self):
+        if getattr(self, "decoder", None) is not None:
+            try:
+                del self.decoder
+            except Exception:
+                pass
+
 
 class VADProvider(VADProviderBase):
     def __init__(self, config):
         logger.bind(tag=TAG).info("SileroVAD", config)
+        super().__init__(config)
         self.model, _ = torch.hub.load(
             repo_or_dir=config["model_dir"],
             source="local",
             model="silero_vad",
             force_reload=False,
         )
+        # 外层模型在内部保存循环状态，只适合单路音频；16k子模型是无状态的：
+        # forward(上下文+本帧音频, 循环状态) -> (语音概率, 新的循环状态)，各连接的状态显式传入
+        self.stateless_model = self.model._model
+        if self.stateless_model.context_size_samples != CONTEXT_SAMPLES:
+            raise ValueError(
+                f"不支持的Silero VAD模型，上下文长度为 {self.stateless_model.context_size_samples}"
+            )
+
+    def _get_stream_state(self, conn) -> SileroStreamState:
+        state = getattr(conn, "vad_state", None)
+        if not isinstance(state, SileroStreamState):
+            state = SileroStreamState()
+            conn.vad_state = state
+        return state
+
+    def _forward(self, states, chunks):
+        """对一组连接各一帧做一次批量推理，并写回各自的循环状态"""
+        x = torch.from_numpy(np.ascontiguousarray(chunks))
+        with torch.no_grad():
+            # 各连接的上下文和循环状态拼接成批次，推理后再拆分回去
+            context = torch.cat([s.context for s in states], dim=0)
+            x = torch.cat([context, x], dim=1)
+            out, new_state = self.stateless_model(
+                x, torch.cat([s.state for s in states], dim=1)
+            )
+        new_context = x[:, -CONTEXT_SAMPLES:]
+        for i, s in enumerate(states):
+            s.state = new_state[:, i : i + 1].clone()
+            s.context = new_context[i : i + 1].clone()
+        return out.reshape(-1).tolist()
+
+    def _infer(self, requests):
+        """按顺序处理每个连接的多帧，同一轮中不同连接的帧合并为一个批次"""
+        results = [[] for _ in requests]
+        max_frames = max(len(chunks) for _, chunks in requests)
+        for frame_index in range(max_frames):
+            rows = [i for i, (_, chunks) in enumerate(requests) if len(chunks) > frame_index]
+            for start in range(0, len(rows), self.max_batch_size):
+                group = rows[start : start + self.max_batch_size]
+                probs = self._forward(
+                    [requests[i][0] for i in group],
+                    np.stack([requests[i][1][frame_index] for i in group]),
+                )
+                for i, prob in zip(group, probs):
+                    results[i].append(prob)
+        return results
 
-        self.decoder = opuslib_next.Decoder(16000, 1)
-
-        # 处理空字符串的情况
-        threshold = config.get("threshold", "0.5")
-        threshold_low = config.get("threshold_low", "0.2")
-        min_silence_duration_ms = config.get("min_silence_duration_ms", "1000")
-
-        self.vad_threshold = float(threshold) if threshold else 0.5
-        self.vad_threshold_low = float(threshold_low) if threshold_low else 0.2
-
-        self.silence_threshold_ms = (
-            int(min_silence_duration_ms) if min_silence_duration_ms else 1000
-        )
-
-        # 至少要多少帧才算有语音
-        self.frame_window_threshold = 3
-
-    def __del__(self):
-        if hasattr(self, 'decoder') and self.decoder is not None:
-            try:
-                del self.decoder
-            except Exception:
-                pass
-
-    def is_vad(self, conn, opus_packet):
+    async def is_vad(self, conn, opus_packet):
         # 手动模式：直接返回True，不进行实时VAD检测，所有音频都缓存
         if conn.client_listen_mode == "manual":
             return True
-            
+
         try:
-            pcm_frame = self.decoder.decode(opus_packet, 960)
+            state = self._get_stream_state(conn)
+            pcm_frame = state.decoder.decode(opus_packet, 960)
             conn.client_audio_buffer.extend(pcm_frame)  # 将新数据加入缓冲区
 
-            # 处理缓冲区中的完整帧（每次处理512采样点）
-            client_have_voice = False
-            while len(conn.client_audio_buffer) >= 512 * 2:
-                # 提取前512个采样点（1024字节）
-                chunk = conn.client_audio_buffer[: 512 * 2]
-                conn.client_audio_buffer = conn.client_audio_buffer[512 * 2 :]
-
-                # 转换为模型需要的张量格式
-                audio_int16 = np.frombuffer(chunk, dtype=np.int16)
-                audio_float32 = audio_int16.astype(np.float32) / 32768.0
-                audio_tensor = torch.from_numpy(audio_float32)
-
-                # 检测语音活动
-                with torch.no_grad():
-                    speech_prob = self.model(audio_tensor, 16000).item()
-
-                # 双阈值判断
-                if speech_prob >= self.vad_threshold:
-                    is_voice = True
-                elif speech_prob <= self.vad_threshold_low:
-                    is_voice = False
-                else:
-                    is_voice = conn.last_is_voice
-
-                # 声音没低于最低值则延续前一个状态，判断为有声音
-                conn.last_is_voice = is_voice
-
-                # 更新滑动窗口
-                conn.client_voice_window.append(is_voice)
-                client_have_voice = (
-                    conn.client_voice_window.count(True) >= self.frame_window_threshold
-                )
-
-                # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
-                if conn.client_have_voice and not client_have_voice:
-                    stop_duration = time.time() * 1000 - conn.last_activity_time
-                    if stop_duration >= self.silence_threshold_ms:
-                        conn.client_voice_stop = True
-                if client_have_voice:
-                    conn.client_have_voice = True
-                    conn.last_activity_time = time.time() * 1000
-
-            return client_have_voice
+            # 取出缓冲区中的完整帧（每帧512采样点），一次性转换为模型需要的格式
+            frame_count = len(conn.client_audio_buffer) // (CHUNK_SAMPLES * 2)
+            if frame_count == 0:
+                return False
+            audio_int16 = np.frombuffer(
+                conn.client_audio_buffer, dtype=np.int16, count=frame_count * CHUNK_SAMPLES
+            )
+            chunks = (audio_int16.astype(np.float32) / 32768.0).reshape(
+                frame_count, CHUNK_SAMPLES
+            )
+            # 释放对bytearray的引用后才能原地截断缓冲区
+            del audio_int16
+            del conn.client_audio_buffer[: frame_count * CHUNK_SAMPLES * 2]
+
+            # 检测语音活动
+            speech_probs = await self._predict(state, chunks)
+            return self._update_voice_state(conn, speech_probs)
+        except PoolRejectedError:
+            # 推理线程池饱和时沿用上一次的说话状态
+            return conn.client_have_voice
         except opuslib_next.OpusError as e:
             logger.bind(tag=TAG).info(f"解码错误: {e}")
         except Exception as e:
@@ -0,0 +1,166 @@
+import os
+import numpy as np
+import onnxruntime
+import opuslib_next
+from config.logger import setup_logging
+from core.providers.vad.base import VADProviderBase
+from core.utils.worker_pool import PoolRejectedError
+
+TAG = __name__
+logger = setup_logging()
+
+# Silero 16k模型每次推理的采样点数及上下文长度
+CHUNK_SAMPLES = 512
+CONTEXT_SAMPLES = 64
+# 每个连接预分配的缓冲区大小（采样点），足够容纳多个60ms的Opus帧
+BUFFER_SAMPLES = 4096
+
+
+class PcmRingBuffer:
+    """预分配的float32音频缓冲区
+
+    写入时直接把int16 PCM转换到预分配的内存中，读取时返回包含上下文的零拷贝窗口视图，
+    空间不足时只把未消费的尾部（不足一帧）和上下文搬回开头。
+    """
+
+    def __init__(self, capacity=BUFFER_SAMPLES):
+        self.buffer = np.zeros(CONTEXT_SAMPLES + capacity, dtype=np.float32)
+        self.read_pos = CONTEXT_SAMPLES
+        self.write_pos = CONTEXT_SAMPLES
+
+    def write(self, pcm_bytes):
+        samples = np.frombuffer(memoryview(pcm_bytes), dtype=np.int16)
+        size = len(samples)
+        if self.write_pos + size > len(self.buffer):
+            self._compact(size)
+        np.multiply(
+            samples,
+            1.0 / 32768.0,
+            out=self.buffer[self.write_pos : self.write_pos + size],
+            casting="unsafe",
+        )
+        self.write_pos += size
+
+    def _compact(self, incoming):
+        keep_from = self.read_pos - CONTEXT_SAMPLES
+        keep_size = self.write_pos - keep_from
+        if keep_size + incoming > len(self.buffer):
+            # 单次写入超过容量时扩容，正常的60ms帧不会走到这里
+            new_buffer = np.zeros(keep_size + incoming + BUFFER_SAMPLES, dtype=np.float32)
+            new_buffer[:keep_size] = self.buffer[keep_from : self.write_pos]
+            self.buffer = new_buffer
+        else:
+            self.buffer[:keep_size] = self.buffer[keep_from : self.write_pos]
+        self.read_pos = CONTEXT_SAMPLES
+        self.write_pos = keep_size
+
+    def take_windows(self):
+        """取出所有完整帧，每个窗口为[上下文64 + 帧512]的视图"""
+        frame_count = (self.write_pos - self.read_pos) // CHUNK_SAMPLES
+        windows = []
+        for _ in range(frame_count):
+            windows.append(
+                self.buffer[
+                    self.read_pos - CONTEXT_SAMPLES : self.read_pos + CHUNK_SAMPLES
+                ]
+            )
+            self.read_pos += CHUNK_SAMPLES
+        return windows
+
+
+class SileroOnnxStreamState:
+    """单个连接的VAD状态：Opus解码器、音频缓冲区和模型循环状态"""
+
+    def __init__(self):
+        self.decoder = opuslib_next.Decoder(16000, 1)
+        self.audio = PcmRingBuffer()
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+
+    def __del__(self):
+        if getattr(self, "decoder", None) is not None:
+            try:
+                del self.decoder
+            except Exception:
+                pass
+
+
+class VADProvider(VADProviderBase):
+    def __init__(self, config):
+        logger.bind(tag=TAG).info("SileroVAD(ONNX)", config)
+        super().__init__(config)
+        model_path = config.get("model_path") or os.path.join(
+            config["model_dir"], "src", "silero_vad", "data", "silero_vad.onnx"
+        )
+        num_threads = config.get("num_threads", "1")
+
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = int(num_threads) if num_threads else 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, providers=["CPUExecutionProvider"], sess_options=opts
+        )
+        self._sample_rate = np.array(16000, dtype=np.int64)
+
+    def _get_stream_state(self, conn) -> SileroOnnxStreamState:
+        state = getattr(conn, "vad_state", None)
+        if not isinstance(state, SileroOnnxStreamState):
+            state = SileroOnnxStreamState()
+            conn.vad_state = state
+        return state
+
+    def _forward(self, states, windows):
+        """对一组连接各一帧做一次批量推理，循环状态显式传入和传出"""
+        if len(states) == 1:
+            x = windows[0].reshape(1, -1)
+            state = states[0].state
+        else:
+            x = np.stack(windows)
+            state = np.concatenate([s.state for s in states], axis=1)
+        out, new_state = self.session.run(
+            None, {"input": x, "state": state, "sr": self._sample_rate}
+        )
+        for i, s in enumerate(states):
+            s.state = new_state[:, i : i + 1]
+        return out.reshape(-1).tolist()
+
+    def _infer(self, requests):
+        """按顺序处理每个连接的多帧，同一轮中不同连接的帧合并为一个批次"""
+        results = [[] for _ in requests]
+        max_frames = max(len(windows) for _, windows in requests)
+        for frame_index in range(max_frames):
+            rows = [i for i, (_, windows) in enumerate(requests) if len(windows) > frame_index]
+            for start in range(0, len(rows), self.max_batch_size):
+                group = rows[start : start + self.max_batch_size]
+                probs = self._forward(
+                    [requests[i][0] for i in group],
+                    [requests[i][1][frame_index] for i in group],
+                )
+                for i, prob in zip(group, probs):
+                    results[i].append(prob)
+        return results
+
+    async def is_vad(self, conn, opus_packet):
+        # 手动模式：直接返回True，不进行实时VAD检测，所有音频都缓存
+        if conn.client_listen_mode == "manual":
+            return True
+
+        try:
+            state = self._get_stream_state(conn)
+            pcm_frame = state.decoder.decode(opus_packet, 960)
+            state.audio.write(pcm_frame)
+
+            # 窗口是缓冲区的视图，同一连接的下一包要等本次推理返回后才会写入
+            windows = state.audio.take_windows()
+            if not windows:
+                return False
+
+            # 检测语音活动
+            speech_probs = await self._predict(state, windows)
+            return self._update_voice_state(conn, speech_probs)
+        except PoolRejectedError:
+            # 推理线程池饱和时沿用上一次的说话状态
+            return conn.client_have_voice
+        except opuslib_next.OpusError as e:
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
@@ -0,0 +1,209 @@
+"""
+阿里云智能语音访问Token管理
+
+阿里云的语音合成、语音识别（一句话识别、实时识别）都需要先用 AccessKey 换取临时Token。
+各个provider原先在初始化时同步请求 CreateToken，每个设备接入都要多一次HTTP往返，
+重连高峰时还会触发阿里云的Token接口限流。这里按 AccessKeyId 在进程内共享Token：
+- Token未过期时直接返回，不发起请求
+- 距离过期不足 REFRESH_AHEAD 秒时后台提前刷新，调用方继续使用当前Token
+- 同一个 AccessKeyId 同时只会有一个刷新请求，并发的调用方等待同一个结果
+"""
+
+import hmac
+import time
+import uuid
+import base64
+import asyncio
+import hashlib
+import threading
+from urllib import parse
+from datetime import datetime
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+import requests
+from config.logger import setup_logging
+from core.utils.worker_pool import get_worker_pools, PoolRejectedError
+
+TAG = __name__
+logger = setup_logging()
+
+TOKEN_URL = "http://nls-meta.cn-shanghai.aliyuncs.com/"
+# 过期前多少秒开始后台刷新
+REFRESH_AHEAD = 600
+# 按过期时间提前多少秒视为已过期，避免请求途中过期
+EXPIRE_MARGIN = 60
+
+
+class AccessToken:
+    @staticmethod
+    def _encode_text(text):
+        encoded_text = parse.quote_plus(text)
+        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
+
+    @staticmethod
+    def _encode_dict(dic):
+        keys = dic.keys()
+        dic_sorted = [(key, dic[key]) for key in sorted(keys)]
+        encoded_text = parse.urlencode(dic_sorted)
+        return encoded_text.replace("+", "%20").replace("*", "%2A").replace("%7E", "~")
+
+    @staticmethod
+    def create_token(access_key_id, access_key_secret):
+        parameters = {
+            "AccessKeyId": access_key_id,
+            "Action": "CreateToken",
+            "Format": "JSON",
+            "RegionId": "cn-shanghai",  # 使用上海地域进行Token获取
+            "SignatureMethod": "HMAC-SHA1",
+            "SignatureNonce": str(uuid.uuid1()),
+            "SignatureVersion": "1.0",
+            "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "Version": "2019-02-28",
+        }
+        # 构造规范化的请求字符串
+        query_string = AccessToken._encode_dict(parameters)
+        # 构造待签名字符串
+        string_to_sign = (
+            "GET"
+            + "&"
+            + AccessToken._encode_text("/")
+            + "&"
+            + AccessToken._encode_text(query_string)
+        )
+        # 计算签名
+        secreted_string = hmac.new(
+            bytes(access_key_secret + "&", encoding="utf-8"),
+            bytes(string_to_sign, encoding="utf-8"),
+            hashlib.sha1,
+        ).digest()
+        signature = base64.b64encode(secreted_string)
+        # 进行URL编码
+        signature = AccessToken._encode_text(signature)
+        full_url = f"{TOKEN_URL}?Signature={signature}&{query_string}"
+        response = requests.get(full_url, timeout=10)
+        if response.ok:
+            root_obj = response.json()
+            key = "Token"
+            if key in root_obj:
+                token = root_obj[key]["Id"]
+                expire_time = root_obj[key]["ExpireTime"]
+                return token, expire_time
+        logger.bind(tag=TAG).error(f"获取阿里云Token失败: {response.text}")
+        return None, None
+
+
+def parse_expire_time(expire_time) -> float:
+    """解析CreateToken返回的过期时间（时间戳或UTC时间字符串）"""
+    if not expire_time:
+        raise ValueError("无法获取有效的Token过期时间")
+    expire_str = str(expire_time).strip()
+    try:
+        if expire_str.isdigit():
+            return float(int(expire_str))
+        return datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ").timestamp()
+    except Exception as e:
+        raise ValueError(f"无效的过期时间格式: {expire_str}") from e
+
+
+class AliyunTokenManager:
+    """按AccessKeyId共享的阿里云Token缓存"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # access_key_id -> (token, 过期时间戳)
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        # access_key_id -> 进行中的刷新
+        self._refreshing: Dict[str, Future] = {}
+
+    def _refresh(self, access_key_id: str, access_key_secret: str) -> str:
+        token, expire_time = AccessToken.create_token(access_key_id, access_key_secret)
+        if not token:
+            raise ValueError("无法获取有效的访问Token")
+        expire_at = parse_expire_time(expire_time) - EXPIRE_MARGIN
+        with self._lock:
+            self._tokens[access_key_id] = (token, expire_at)
+        logger.bind(tag=TAG).info(
+            f"阿里云Token已刷新，过期时间: {datetime.fromtimestamp(expire_at + EXPIRE_MARGIN)}"
+        )
+        return token
+
+    def _start_refresh(self, access_key_id: str, access_key_secret: str) -> Future:
+        """发起刷新，已有进行中的刷新时返回同一个Future"""
+        with self._lock:
+            future = self._refreshing.get(access_key_id)
+            if future is not None:
+                return future
+            future = Future()
+            self._refreshing[access_key_id] = future
+
+        def _run():
+            token, error = None, None
+            try:
+                token = self._refresh(access_key_id, access_key_secret)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"刷新阿里云Token失败: {e}")
+                error = e
+            # 先移除再设置结果，等待方拿到结果后再次刷新时会发起新的请求
+            with self._lock:
+                self._refreshing.pop(access_key_id, None)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(token)
+
+        try:
+            get_worker_pools().submit("background", _run)
+        except PoolRejectedError:
+            # 后台线程池饱和时不能让Token刷新排队失败
+            threading.Thread(target=_run, daemon=True).start()
+        return future
+
+    def _lookup(
+        self, access_key_id: str, access_key_secret: str, force: bool, stale_token
+    ) -> Tuple[Optional[str], Optional[Future]]:
+        """返回可直接使用的Token，或需要等待的刷新"""
+        with self._lock:
+            cached = self._tokens.get(access_key_id)
+        now = time.time()
+        if cached is not None:
+            token, expire_at = cached
+            # force时只有当前缓存的仍是调用方用过的失效Token才刷新，避免重复刷新
+            invalid = force and (stale_token is None or token == stale_token)
+            if not invalid and now < expire_at:
+                if now > expire_at - REFRESH_AHEAD:
+                    self._start_refresh(access_key_id, access_key_secret)
+                return token, None
+        return None, self._start_refresh(access_key_id, access_key_secret)
+
+    async def get_token(
+        self,
+        access_key_id: str,
+        access_key_secret: str,
+        force: bool = False,
+        stale_token: Optional[str] = None,
+    ) -> str:
+        """
+        获取Token，需要刷新时不阻塞事件循环
+
+        Args:
+            force: 服务端返回鉴权失败时传True，强制刷新
+            stale_token: 鉴权失败的Token，缓存已经被其他调用方刷新过时直接返回新Token
+        """
+        token, future = self._lookup(access_key_id, access_key_secret, force, stale_token)
+        if future is None:
+            return token
+        return await asyncio.wrap_future(future)
+
+
+# 全局单例
+_token_manager_instance = None
+_token_manager_lock = threading.Lock()
+
+
+def get_aliyun_token_manager() -> AliyunTokenManager:
+    """获取阿里云Token管理器（单例模式）"""
+    global _token_manager_instance
+    with _token_manager_lock:
+        if _token_manager_instance is None:
+            _token_manager_instance = AliyunTokenManager()
+        return _token_manager_instance
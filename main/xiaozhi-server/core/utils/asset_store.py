@@ -0,0 +1,163 @@
+"""
+预编译音频资源库
+
+config/assets 下的提示音（绑定码数字、唤醒词回复、超出字数提示、结束提示音等）在启动时
+预先编码为p3格式（[1字节类型, 1字节保留, 2字节长度] + Opus帧）保存到 tmp/asset_store，
+编译结果只加载一次，按帧切分为bytes后常驻内存，多个设备同时触发也不需要再解码和编码。
+
+源文件的修改时间变化后会重新编译；编译结果的文件名带有源文件的修改时间，
+旧版本的帧在仍被引用时保持可用，不会被覆盖。
+"""
+
+import os
+import struct
+import threading
+from typing import Dict, List, Optional, Tuple
+from config.logger import setup_logging
+from core.utils.audio_decode import decode_audio_to_pcm
+
+TAG = __name__
+logger = setup_logging()
+
+ASSETS_DIR = "config/assets"
+STORE_DIR = "tmp/asset_store"
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".p3")
+
+_HEADER = struct.Struct(">BBH")
+
+
+class _CompiledAsset:
+    """一个编译好的资源：按帧切分后的Opus/PCM数据"""
+
+    def __init__(self, path: str, mtime_ns: int):
+        self.mtime_ns = mtime_ns
+        self.frames: List[bytes] = []
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            _, _, data_len = _HEADER.unpack_from(data, offset)
+            offset += _HEADER.size
+            self.frames.append(data[offset : offset + data_len])
+            offset += data_len
+
+
+class OpusAssetStore:
+    """预编译的提示音资源库"""
+
+    def __init__(self, assets_dir: str = ASSETS_DIR, store_dir: str = STORE_DIR):
+        self.assets_dir = os.path.abspath(assets_dir)
+        self.store_dir = store_dir
+        self._assets: Dict[Tuple[str, bool], _CompiledAsset] = {}
+        self._lock = threading.Lock()
+
+    def contains(self, audio_file_path: str) -> bool:
+        """是否为资源目录下的音频文件"""
+        path = os.path.abspath(audio_file_path)
+        return (
+            path.startswith(self.assets_dir + os.sep)
+            and path.lower().endswith(AUDIO_EXTENSIONS)
+        )
+
+    def _compiled_path(self, path: str, is_opus: bool, mtime_ns: int) -> str:
+        name = os.path.relpath(path, self.assets_dir).replace(os.sep, "__")
+        fmt = "opus" if is_opus else "pcm"
+        return os.path.join(self.store_dir, f"{name}.{fmt}.{mtime_ns}.p3")
+
+    def _compile(self, path: str, is_opus: bool, compiled_path: str):
+        """解码并编码为p3文件，先写临时文件再替换"""
+        # 延迟导入，避免与util模块循环引用
+        from core.utils.util import pcm_to_data_stream
+
+        if path.endswith(".p3") and is_opus:
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            chunks = []
+
+            def _append(frame):
+                chunks.append(_HEADER.pack(0, 0, len(frame)))
+                chunks.append(frame)
+
+            pcm_to_data_stream(decode_audio_to_pcm(path), is_opus, _append)
+            data = b"".join(chunks)
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        tmp_path = f"{compiled_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, compiled_path)
+
+        # 清理同一资源的旧版本，删除失败时忽略
+        prefix = os.path.basename(compiled_path).rsplit(".", 2)[0] + "."
+        for name in os.listdir(self.store_dir):
+            if name.startswith(prefix) and name != os.path.basename(compiled_path):
+                try:
+                    os.remove(os.path.join(self.store_dir, name))
+                except OSError:
+                    pass
+
+    def get_frames(self, audio_file_path: str, is_opus: bool = True) -> Optional[List[bytes]]:
+        """获取资源的帧列表，未编译或源文件已修改时先编译"""
+        path = os.path.abspath(audio_file_path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        key = (path, is_opus)
+        asset = self._assets.get(key)
+        if asset is not None and asset.mtime_ns == mtime_ns:
+            return asset.frames
+
+        with self._lock:
+            asset = self._assets.get(key)
+            if asset is not None and asset.mtime_ns == mtime_ns:
+                return asset.frames
+            compiled_path = self._compiled_path(path, is_opus, mtime_ns)
+            if not os.path.exists(compiled_path):
+                self._compile(path, is_opus, compiled_path)
+            asset = _CompiledAsset(compiled_path, mtime_ns)
+            self._assets[key] = asset
+            return asset.frames
+
+    def is_fresh(self, audio_file_path: str, is_opus: bool = True) -> bool:
+        """资源是否已编译且源文件未修改，可直接在事件循环中读取"""
+        path = os.path.abspath(audio_file_path)
+        asset = self._assets.get((path, is_opus))
+        if asset is None:
+            return False
+        try:
+            return asset.mtime_ns == os.stat(path).st_mtime_ns
+        except OSError:
+            return False
+
+    def compile_all(self) -> int:
+        """启动时预编译资源目录下的全部音频，返回编译的资源数"""
+        count = 0
+        for root, _, files in os.walk(self.assets_dir):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if not self.contains(path):
+                    continue
+                try:
+                    self.get_frames(path, is_opus=True)
+                    count += 1
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"预编译音频资源失败: {path}, {e}")
+        logger.bind(tag=TAG).info(f"音频资源预编译完成，共 {count} 个")
+        return count
+
+
+# 全局单例
+_asset_store_instance = None
+_asset_store_lock = threading.Lock()
+
+
+def get_asset_store() -> OpusAssetStore:
+    """获取预编译音频资源库（单例模式）"""
+    global _asset_store_instance
+    with _asset_store_lock:
+        if _asset_store_instance is None:
+            _asset_store_instance = OpusAssetStore()
+        return _asset_store_instance
@@ -0,0 +1,145 @@
+"""
+异步连接流水线工具
+
+开启 async_pipeline 后，连接的ASR、TTS文本、TTS音频和上报队列由事件循环中的协程消费，
+LLM对话也在事件循环中以异步流式接口进行，不再为每个连接、每轮对话占用线程；
+只有模型推理、同步SDK调用等阻塞操作才提交到服务器级线程池。
+"""
+
+import queue
+import asyncio
+import weakref
+import threading
+from typing import Any, Callable, Iterable
+from core.utils.worker_pool import get_worker_pools
+
+
+def is_async_pipeline_enabled(config) -> bool:
+    """配置中是否开启了异步连接流水线"""
+    return str(config.get("async_pipeline", False)).lower() in ("true", "1", "yes")
+
+
+class LoopQueue:
+    """绑定到事件循环的队列
+
+    协程侧通过 await get() 消费；put() 可以在任意线程调用，
+    非事件循环线程的写入会通过 call_soon_threadsafe 投递，接口与 queue.Queue 保持兼容。
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def put(self, item, block=True, timeout=None):
+        if self._in_loop_thread():
+            self._queue.put_nowait(item)
+        else:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def get_nowait(self):
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    def task_done(self):
+        if self._in_loop_thread():
+            self._queue.task_done()
+        else:
+            self._loop.call_soon_threadsafe(self._queue.task_done)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    def drain_from(self, old_queue):
+        """把旧队列中尚未消费的数据搬到当前队列"""
+        while True:
+            try:
+                self.put(old_queue.get_nowait())
+            except queue.Empty:
+                break
+
+
+class LoopLocal:
+    """按事件循环分别创建的对象
+
+    异步SDK的客户端（httpx.AsyncClient等）绑定在创建它的事件循环上，不能跨事件循环使用。
+    事件循环被回收后对象随之释放。
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._values = weakref.WeakKeyDictionary()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            value = self._values.get(loop)
+            if value is None:
+                value = self._factory()
+                self._values[loop] = value
+            return value
+
+
+_DONE = object()
+
+
+async def iterate_in_thread(make_iter: Callable[[], Iterable], pool: str = "llm"):
+    """
+    在服务器级线程池中迭代同步生成器，把每一项交回事件循环，供只有同步接口的SDK使用
+
+    调用方停止迭代（break、任务取消）后，线程在取到下一项时退出。
+
+    Args:
+        make_iter: 返回同步可迭代对象的函数，在线程池中调用
+        pool: 线程池名称，饱和时抛出 PoolRejectedError
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    stopped = threading.Event()
+
+    def _put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, (item, error))
+        except RuntimeError:
+            # 事件循环已关闭
+            stopped.set()
+
+    def _produce():
+        try:
+            for item in make_iter():
+                if stopped.is_set():
+                    break
+                _put(item)
+        except Exception as e:
+            _put(_DONE, e)
+        else:
+            _put(_DONE)
+
+    get_worker_pools().submit(pool, _produce)
+    try:
+        while True:
+            item, error = await items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,303 @@
+"""
+进程内音频解码与重采样
+
+TTS结果和提示音统一转换为 单声道/16kHz/16位小端 PCM：
+- WAV：用 wave + numpy 直接解析
+- MP3/FLAC/OGG 等：安装了 soundfile（libsndfile）时在进程内解码
+- 采样率转换：numpy 向量化的多相滤波重采样，StreamingResampler 可分块输入
+只有上述方式都无法处理的格式才回退到 pydub（启动ffmpeg子进程）。
+
+PcmFileStream 用同样的方式分块解码音频文件，供未安装ffmpeg时边解码边播放本地音乐。
+"""
+
+import io
+import os
+import wave
+from math import gcd
+from typing import Union
+import numpy as np
+from pydub import AudioSegment
+from config.logger import setup_logging
+
+try:
+    import soundfile
+except ImportError:  # 可选依赖，未安装时MP3等格式走ffmpeg
+    soundfile = None
+
+TAG = __name__
+logger = setup_logging()
+
+TARGET_SAMPLE_RATE = 16000
+
+# soundfile（libsndfile >= 1.1）可在进程内解码的格式
+SOUNDFILE_TYPES = ("mp3", "flac", "ogg", "wav")
+
+# 每次向量化计算的输出采样点数，限制索引矩阵占用的内存
+_RESAMPLE_BLOCK = 16384
+
+# 滤波器系数按 (up, down) 缓存，常见的只有 24k/22.05k/44.1k/48k/8k -> 16k 几种
+_filter_cache = {}
+
+
+def _polyphase_filter(up: int, down: int):
+    """设计Kaiser窗低通滤波器并拆分为多相矩阵 H[相位, 抽头]"""
+    key = (up, down)
+    cached = _filter_cache.get(key)
+    if cached is not None:
+        return cached
+
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    n = np.arange(-half_len, half_len + 1)
+    h = np.sinc(n / max_rate) * np.kaiser(2 * half_len + 1, 5.0)
+    h = h / h.sum() * up
+
+    taps = -(-len(h) // up)
+    h_pad = np.zeros(taps * up, dtype=np.float32)
+    h_pad[: len(h)] = h
+    phases = h_pad.reshape(taps, up).T.copy()
+    _filter_cache[key] = (phases, half_len, taps)
+    return _filter_cache[key]
+
+
+def resample_poly(samples: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
+    """多相滤波重采样，等价于 上采样up倍 -> 低通 -> 下采样down倍，但只计算需要输出的点"""
+    g = gcd(int(orig_rate), int(target_rate))
+    up, down = int(target_rate) // g, int(orig_rate) // g
+    if up == down:
+        return samples
+    samples = np.asarray(samples, dtype=np.float32)
+    phases, half_len, taps = _polyphase_filter(up, down)
+
+    n_out = -(-len(samples) * up // down)
+    padded = np.concatenate(
+        [
+            np.zeros(taps, dtype=np.float32),
+            samples,
+            np.zeros(taps + 1, dtype=np.float32),
+        ]
+    )
+    tap_offsets = np.arange(taps)
+    out = np.empty(n_out, dtype=np.float32)
+    for start in range(0, n_out, _RESAMPLE_BLOCK):
+        m = np.arange(start, min(start + _RESAMPLE_BLOCK, n_out))
+        t = m * down + half_len
+        # 输出点m对应的输入位置k0，以及使用的滤波器相位
+        k0 = t // up
+        idx = k0[:, None] - tap_offsets[None, :] + taps
+        out[start : start + len(m)] = np.einsum(
+            "ij,ij->i", padded[idx], phases[t % up]
+        )
+    return out
+
+
+class StreamingResampler:
+    """分块输入的多相滤波重采样，输出与 resample_poly 对整段数据重采样的结果相同"""
+
+    def __init__(self, orig_rate: int, target_rate: int = TARGET_SAMPLE_RATE):
+        g = gcd(int(orig_rate), int(target_rate))
+        self.up, self.down = int(target_rate) // g, int(orig_rate) // g
+        self._received = 0
+        self._next = 0
+        if self.up == self.down:
+            return
+        self._phases, self._half_len, self._taps = _polyphase_filter(self.up, self.down)
+        self._tap_offsets = np.arange(self._taps)
+        # 前面补taps个0，与 resample_poly 的边界处理一致；_offset为_buffer[0]对应的输入序号
+        self._buffer = np.zeros(self._taps, dtype=np.float32)
+        self._offset = -self._taps
+
+    def _compute(self, end: int) -> np.ndarray:
+        """计算输出序号 [_next, end) 的采样，并丢弃之后不再需要的输入"""
+        outputs = []
+        for start in range(self._next, end, _RESAMPLE_BLOCK):
+            m = np.arange(start, min(start + _RESAMPLE_BLOCK, end))
+            t = m * self.down + self._half_len
+            idx = (t // self.up)[:, None] - self._tap_offsets[None, :] - self._offset
+            outputs.append(
+                np.einsum("ij,ij->i", self._buffer[idx], self._phases[t % self.up])
+            )
+        self._next = max(self._next, end)
+        first_needed = (self._next * self.down + self._half_len) // self.up - self._taps + 1
+        drop = min(first_needed - self._offset, len(self._buffer))
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._offset += drop
+        if not outputs:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(outputs).astype(np.float32, copy=False)
+
+    def feed(self, samples: np.ndarray) -> np.ndarray:
+        """输入一段采样，返回已经可以计算的输出采样"""
+        samples = np.asarray(samples, dtype=np.float32)
+        self._received += len(samples)
+        if self.up == self.down:
+            return samples
+        self._buffer = np.concatenate([self._buffer, samples])
+        available = self._offset + len(self._buffer)
+        # 输出m需要的最后一个输入为 (m*down+half_len)//up，必须小于available
+        end = -(-(available * self.up - self._half_len) // self.down)
+        return self._compute(max(end, self._next))
+
+    def flush(self) -> np.ndarray:
+        """输入结束，返回剩余的输出采样"""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        self._buffer = np.concatenate(
+            [self._buffer, np.zeros(self._taps + 1, dtype=np.float32)]
+        )
+        return self._compute(-(-self._received * self.up // self.down))
+
+
+def _float_to_pcm16(samples: np.ndarray) -> bytes:
+    samples = np.clip(np.rint(samples * 32768.0), -32768, 32767)
+    return samples.astype("<i2").tobytes()
+
+
+def _to_pcm16(samples: np.ndarray, sample_rate: int) -> bytes:
+    """浮点采样（已混为单声道）重采样到16kHz并转为16位PCM"""
+    return _float_to_pcm16(resample_poly(samples, sample_rate, TARGET_SAMPLE_RATE))
+
+
+def _wav_samples(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """WAV原始数据转为单声道浮点采样"""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif sample_width == 3:
+        data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        samples = (
+            data[:, 0].astype(np.int32)
+            | (data[:, 1].astype(np.int32) << 8)
+            | (data[:, 2].astype(np.int8).astype(np.int32) << 16)
+        ).astype(np.float32) / 8388608
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"不支持的WAV采样位宽: {sample_width}")
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _decode_wav(source) -> bytes:
+    with wave.open(source, "rb") as wf:
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        sample_rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if (
+        sample_width == 2
+        and channels == 1
+        and sample_rate == TARGET_SAMPLE_RATE
+    ):
+        # 已经是目标格式，直接返回
+        return raw[: len(raw) - len(raw) % 2]
+    return _to_pcm16(_wav_samples(raw, sample_width, channels), sample_rate)
+
+
+def _decode_soundfile(source) -> bytes:
+    samples, sample_rate = soundfile.read(source, dtype="float32", always_2d=True)
+    return _to_pcm16(samples.mean(axis=1), sample_rate)
+
+
+def _decode_ffmpeg(source, file_type) -> bytes:
+    # -nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
+    audio = AudioSegment.from_file(source, format=file_type, parameters=["-nostdin"])
+    audio = audio.set_channels(1).set_frame_rate(TARGET_SAMPLE_RATE).set_sample_width(2)
+    return audio.raw_data
+
+
+def decode_audio_to_pcm(source: Union[str, bytes], file_type: str = None) -> bytes:
+    """
+    把音频文件或音频二进制数据解码为 单声道/16kHz/16位小端 PCM
+
+    Args:
+        source: 音频文件路径或音频二进制数据
+        file_type: 音频格式（wav、mp3等），为空时从文件后缀获取
+    """
+    if not file_type and isinstance(source, str):
+        file_type = os.path.splitext(source)[1]
+    file_type = (file_type or "").lstrip(".").lower()
+
+    def _open():
+        return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+    if file_type == "wav":
+        try:
+            return _decode_wav(_open())
+        except (wave.Error, EOFError, ValueError) as e:
+            # 浮点WAV、WAVE_FORMAT_EXTENSIBLE等wave模块不支持的格式
+            logger.bind(tag=TAG).debug(f"wave解析失败，尝试其他解码方式: {e}")
+
+    if soundfile is not None and file_type in SOUNDFILE_TYPES:
+        try:
+            return _decode_soundfile(_open())
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"soundfile解码失败，回退到ffmpeg: {e}")
+
+    return _decode_ffmpeg(_open(), file_type or None)
+
+
+class PcmFileStream:
+    """在进程内分块解码音频文件为 单声道/16kHz/16位 PCM，支持的格式与 decode_audio_to_pcm 的进程内解码相同"""
+
+    # 每次从文件读取的输入采样数
+    BLOCK_FRAMES = 4096
+
+    def __init__(self, path: str):
+        """不支持的格式抛出 ValueError"""
+        file_type = os.path.splitext(path)[1].lstrip(".").lower()
+        self._file = None
+        if soundfile is not None and file_type in SOUNDFILE_TYPES:
+            try:
+                self._file = soundfile.SoundFile(path)
+            except Exception as e:
+                logger.bind(tag=TAG).debug(f"soundfile无法打开文件: {path}, {e}")
+        if self._file is not None:
+            sample_rate = self._file.samplerate
+            self._read_block = self._read_soundfile
+        elif file_type == "wav":
+            try:
+                self._file = wave.open(path, "rb")
+            except (wave.Error, EOFError) as e:
+                raise ValueError(f"无法解析WAV文件: {path}, {e}")
+            sample_rate = self._file.getframerate()
+            self._read_block = self._read_wav
+        else:
+            raise ValueError(f"不支持在进程内分块解码的格式: {path}")
+        self._resampler = StreamingResampler(sample_rate)
+        self._pending = bytearray()
+        self._eof = False
+
+    def _read_soundfile(self) -> np.ndarray:
+        block = self._file.read(self.BLOCK_FRAMES, dtype="float32", always_2d=True)
+        return block.mean(axis=1)
+
+    def _read_wav(self) -> np.ndarray:
+        raw = self._file.readframes(self.BLOCK_FRAMES)
+        return _wav_samples(raw, self._file.getsampwidth(), self._file.getnchannels())
+
+    def read(self, size: int) -> bytes:
+        """读取size字节PCM，文件结束时返回不足size的剩余数据"""
+        while len(self._pending) < size and not self._eof:
+            samples = self._read_block()
+            if len(samples) == 0:
+                self._eof = True
+                samples = self._resampler.flush()
+            else:
+                samples = self._resampler.feed(samples)
+            self._pending.extend(_float_to_pcm16(samples))
+        data = bytes(self._pending[:size])
+        del self._pending[:size]
+        return data
+
+    def close(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
@@ -0,0 +1,204 @@
+"""
+音频文件流式解码
+
+播放本地音乐时，原先先把整个文件解码为PCM、再全部编码为Opus才发送第一个包：
+一首5分钟的歌在每台设备上都要产生大量临时PCM数据，开始播放前还要等待数秒。
+AudioFileStream 每次只解码一小段，由播放端按发送进度拉取：
+- 16kHz/单声道/16位的WAV直接按块读取
+- p3文件（已编码的Opus帧）逐帧读取
+- 其他格式通过ffmpeg子进程输出PCM，按块读取管道
+- 未安装ffmpeg时在进程内分块解码（PcmFileStream，soundfile或wave），两者都不支持的格式才一次性解码
+
+第一次读取只返回一帧，尽快开始播放；关闭流时结束ffmpeg进程，被打断的歌曲不会继续解码。
+"""
+
+import os
+import wave
+import struct
+import subprocess
+from typing import Callable, List, Optional
+import opuslib_next
+from config.logger import setup_logging
+from core.utils.audio_decode import (
+    decode_audio_to_pcm,
+    PcmFileStream,
+    TARGET_SAMPLE_RATE,
+)
+
+TAG = __name__
+logger = setup_logging()
+
+FRAME_DURATION = 60  # 毫秒
+FRAME_SIZE = TARGET_SAMPLE_RATE * FRAME_DURATION // 1000  # 每帧采样点数
+FRAME_BYTES = FRAME_SIZE * 2  # 16位PCM每帧字节数
+
+
+class AudioFileStream:
+    """按块解码音频文件，输出60ms一帧的Opus或PCM数据"""
+
+    def __init__(self, path: str, is_opus: bool = True, chunk_frames: int = 5):
+        """
+        Args:
+            path: 音频文件路径
+            is_opus: 输出Opus帧，为False时输出16位PCM帧
+            chunk_frames: 每次读取的帧数
+        """
+        self.path = path
+        self.is_opus = is_opus
+        self.chunk_frames = max(1, int(chunk_frames))
+        self.frames_read = 0
+        # 读取n字节PCM的函数，p3文件为None
+        self._read_pcm: Optional[Callable[[int], bytes]] = None
+        self._file = None
+        self._process: Optional[subprocess.Popen] = None
+        self._encoder = None
+        self._decoder = None
+        self._opened = False
+        self._closed = False
+
+    def _open(self):
+        self._opened = True
+        ext = os.path.splitext(self.path)[1].lower()
+        if ext == ".p3":
+            self._file = open(self.path, "rb")
+            if not self.is_opus:
+                self._decoder = opuslib_next.Decoder(TARGET_SAMPLE_RATE, 1)
+            return
+
+        if self.is_opus:
+            self._encoder = opuslib_next.Encoder(
+                TARGET_SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO
+            )
+        if ext == ".wav" and self._open_wav():
+            return
+        try:
+            self._process = subprocess.Popen(
+                [
+                    "ffmpeg",
+                    "-nostdin",
+                    "-loglevel",
+                    "error",
+                    "-i",
+                    self.path,
+                    "-f",
+                    "s16le",
+                    "-ac",
+                    "1",
+                    "-ar",
+                    str(TARGET_SAMPLE_RATE),
+                    "-",
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            self._read_pcm = self._process.stdout.read
+        except FileNotFoundError:
+            try:
+                self._file = PcmFileStream(self.path)
+                self._read_pcm = self._file.read
+                return
+            except ValueError as e:
+                logger.bind(tag=TAG).debug(f"进程内分块解码不可用: {e}")
+            logger.bind(tag=TAG).warning(f"未找到ffmpeg，一次性解码音频文件: {self.path}")
+            pcm = memoryview(decode_audio_to_pcm(self.path))
+            position = [0]
+
+            def _read(size):
+                start = position[0]
+                position[0] = start + size
+                return bytes(pcm[start : start + size])
+
+            self._read_pcm = _read
+
+    def _open_wav(self) -> bool:
+        """已经是目标格式的WAV直接读取，其他WAV交给ffmpeg"""
+        try:
+            wav = wave.open(self.path, "rb")
+        except (wave.Error, EOFError):
+            return False
+        if (
+            wav.getnchannels() != 1
+            or wav.getsampwidth() != 2
+            or wav.getframerate() != TARGET_SAMPLE_RATE
+        ):
+            wav.close()
+            return False
+        self._file = wav
+        self._read_pcm = lambda size: wav.readframes(size // 2)
+        return True
+
+    def _read_p3_frame(self) -> Optional[bytes]:
+        header = self._file.read(4)
+        if len(header) < 4:
+            return None
+        _, _, data_len = struct.unpack(">BBH", header)
+        opus_data = self._file.read(data_len)
+        if len(opus_data) != data_len:
+            return None
+        if self._decoder is not None:
+            return self._decoder.decode(opus_data, FRAME_SIZE)
+        return opus_data
+
+    def _read_frame(self) -> Optional[bytes]:
+        if self._read_pcm is None:
+            return self._read_p3_frame()
+        pcm = self._read_pcm(FRAME_BYTES)
+        if not pcm:
+            return None
+        if len(pcm) < FRAME_BYTES:
+            # 最后一帧不足时补零
+            pcm += b"\x00" * (FRAME_BYTES - len(pcm))
+        if self._encoder is not None:
+            return self._encoder.encode(pcm, FRAME_SIZE)
+        return pcm
+
+    def read(self) -> List[bytes]:
+        """读取下一段音频帧，文件结束或流已关闭时返回空列表"""
+        if self._closed:
+            return []
+        if not self._opened:
+            self._open()
+        # 第一次只读一帧，尽快开始播放
+        count = 1 if self.frames_read == 0 else self.chunk_frames
+        frames = []
+        try:
+            for _ in range(count):
+                frame = self._read_frame()
+                if frame is None:
+                    break
+                frames.append(frame)
+        except (ValueError, OSError) as e:
+            # 读取过程中流被关闭
+            if not self._closed:
+                logger.bind(tag=TAG).error(f"读取音频文件失败: {self.path}, {e}")
+        self.frames_read += len(frames)
+        return frames
+
+    def close(self):
+        """停止解码，结束ffmpeg进程，可以在任意线程调用"""
+        if self._closed:
+            return
+        self._closed = True
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+        if process is not None and process.stdout is not None:
+            try:
+                process.stdout.close()
+            except Exception:
+                pass
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
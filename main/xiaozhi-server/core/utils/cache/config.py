@@ -20,6 +20,8 @@ class CacheType(Enum):
     DEVICE_PROMPT = "device_prompt"
     VOICEPRINT_HEALTH = "voiceprint_health"  # 声纹识别健康检查
     AUDIO_DATA = "audio_data"  # 音频数据缓存
+    TTS_AUDIO = "tts_audio"  # 语音合成结果缓存（按句）
+    LLM_CONVERSATION = "llm_conversation"  # 设备会话对应的上游LLM会话ID
 
 
 @dataclass
@@ -62,5 +64,11 @@ class CacheConfig:
             CacheType.AUDIO_DATA: cls(
                 strategy=CacheStrategy.TTL, ttl=600, max_size=100  # 10分钟过期
             ),
+            CacheType.TTS_AUDIO: cls(
+                strategy=CacheStrategy.TTL_LRU, ttl=None, max_size=500  # 内容寻址，按LRU淘汰
+            ),
+            CacheType.LLM_CONVERSATION: cls(
+                strategy=CacheStrategy.TTL_LRU, ttl=3600, max_size=10000  # 1小时未对话过期
+            ),
         }
         return configs.get(cache_type, cls())
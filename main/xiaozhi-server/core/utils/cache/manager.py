@@ -21,6 +21,8 @@ class GlobalCacheManager:
         self._global_lock = threading.RLock()
         self._last_cleanup = time.time()
         self._stats = {"hits": 0, "misses": 0, "evictions": 0, "cleanups": 0}
+        # 按缓存空间统计命中情况
+        self._type_stats: Dict[str, Dict[str, int]] = {}
 
     @property
     def logger(self):
@@ -52,6 +54,25 @@ class GlobalCacheManager:
                 self._locks[cache_name] = threading.RLock()
             return self._caches[cache_name]
 
+    def configure(
+        self, cache_type: CacheType, config: CacheConfig, namespace: str = ""
+    ) -> None:
+        """覆盖缓存空间的预设配置（如从配置文件读取的容量）"""
+        cache_name = self._get_cache_name(cache_type, namespace)
+        with self._global_lock:
+            self._get_or_create_cache(cache_name, config)
+            self._configs[cache_name] = config
+
+    def _record(self, cache_name: str, field: str):
+        """记录全局及缓存空间的统计"""
+        self._stats[field] += 1
+        stats = self._type_stats.get(cache_name)
+        if stats is None:
+            stats = self._type_stats.setdefault(
+                cache_name, {"hits": 0, "misses": 0, "evictions": 0}
+            )
+        stats[field] += 1
+
     def set(
         self,
         cache_type: CacheType,
@@ -84,7 +105,7 @@ class GlobalCacheManager:
                     # 移除最旧的条目
                     oldest_key = next(iter(cache))
                     del cache[oldest_key]
-                    self._stats["evictions"] += 1
+                    self._record(cache_name, "evictions")
 
             else:
                 cache[key] = entry
@@ -94,7 +115,7 @@ class GlobalCacheManager:
                     # 简单策略：随机移除一个条目
                     victim_key = next(iter(cache))
                     del cache[victim_key]
-                    self._stats["evictions"] += 1
+                    self._record(cache_name, "evictions")
 
         # 定期清理过期条目
         self._maybe_cleanup(cache_name)
@@ -106,7 +127,7 @@ class GlobalCacheManager:
         cache_name = self._get_cache_name(cache_type, namespace)
 
         if cache_name not in self._caches:
-            self._stats["misses"] += 1
+            self._record(cache_name, "misses")
             return None
 
         cache = self._caches[cache_name]
@@ -114,7 +135,7 @@ class GlobalCacheManager:
 
         with self._locks[cache_name]:
             if key not in cache:
-                self._stats["misses"] += 1
+                self._record(cache_name, "misses")
                 return None
 
             entry = cache[key]
@@ -122,7 +143,7 @@ class GlobalCacheManager:
             # 检查过期
             if entry.is_expired():
                 del cache[key]
-                self._stats["misses"] += 1
+                self._record(cache_name, "misses")
                 return None
 
             # 更新访问信息
@@ -133,7 +154,7 @@ class GlobalCacheManager:
                 del cache[key]
                 cache[key] = entry
 
-            self._stats["hits"] += 1
+            self._record(cache_name, "hits")
             return entry.value
 
     def delete(self, cache_type: CacheType, key: str, namespace: str = "") -> bool:
@@ -181,6 +202,19 @@ class GlobalCacheManager:
 
         return deleted_count
 
+    def get_stats(self) -> Dict[str, Any]:
+        """获取全局及各缓存空间的统计信息"""
+        with self._global_lock:
+            caches = {}
+            for cache_name, stats in self._type_stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                caches[cache_name] = {
+                    **stats,
+                    "size": len(self._caches.get(cache_name, {})),
+                    "hit_ratio": stats["hits"] / lookups if lookups else 0.0,
+                }
+            return {**self._stats, "caches": caches}
+
     def _cleanup_expired(self, cache_name: str) -> int:
         """清理过期条目"""
         if cache_name not in self._caches:
@@ -6,13 +6,21 @@ issues caused by frequent GC triggers.
 """
 
 import gc
+import time
 import asyncio
 import threading
+from collections import deque
 from config.logger import setup_logging
+from core.utils.latency_trace import HistogramSink
 
 TAG = __name__
 logger = setup_logging()
 
+# GC停顿直方图分桶上限（毫秒）
+GC_PAUSE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+# 未汇总的GC停顿记录上限，超过后丢弃最早的记录
+GC_PAUSE_BACKLOG = 10000
+
 
 class GlobalGCManager:
     """全局垃圾回收管理器"""
@@ -28,6 +36,38 @@ class GlobalGCManager:
         self._task = None
         self._stop_event = asyncio.Event()
         self._lock = threading.Lock()
+        # 按代统计每次回收的停顿时间，包括解释器自动触发的回收
+        self._pauses = HistogramSink(GC_PAUSE_BUCKETS)
+        # 回调中只追加到无锁队列，读取时再汇总到直方图
+        self._pause_backlog = deque(maxlen=GC_PAUSE_BACKLOG)
+        self._gc_started = None
+
+    def _on_gc(self, phase, info):
+        """gc.callbacks 回调，回收开始和结束时在触发回收的线程中调用
+
+        回收可能发生在任意分配内存的代码中，包括持有直方图锁的代码，
+        这里不能获取任何锁，否则同一线程重入时会死锁
+        """
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            pause_ms = (time.perf_counter() - self._gc_started) * 1000
+            self._gc_started = None
+            self._pause_backlog.append((str(info.get("generation")), pause_ms))
+
+    def _drain_pauses(self):
+        """把回调记录的停顿汇总到直方图，汇总过程中新产生的记录留到下次"""
+        for _ in range(len(self._pause_backlog)):
+            try:
+                generation, pause_ms = self._pause_backlog.popleft()
+            except IndexError:
+                return
+            self._pauses.observe(generation, pause_ms)
+
+    def pause_snapshot(self):
+        """各代GC停顿时间的直方图，格式同 HistogramSink.snapshot"""
+        self._drain_pauses()
+        return self._pauses.snapshot()
 
     async def start(self):
         """启动定时GC任务"""
@@ -37,6 +77,8 @@ class GlobalGCManager:
 
         logger.bind(tag=TAG).info(f"Start the global GC manager，Interval {self.interval_seconds} seconds")
         self._stop_event.clear()
+        if self._on_gc not in gc.callbacks:
+            gc.callbacks.append(self._on_gc)
         self._task = asyncio.create_task(self._gc_loop())
 
     async def stop(self):
@@ -46,6 +88,8 @@ class GlobalGCManager:
 
         logger.bind(tag=TAG).info("Stop the global GC manager")
         self._stop_event.set()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
 
         if self._task and not self._task.done():
             self._task.cancel()
@@ -73,6 +117,7 @@ class GlobalGCManager:
 
                 # 执行GC
                 await self._run_gc()
+                self._drain_pauses()
 
         except asyncio.CancelledError:
             logger.bind(tag=TAG).info("GC loop task was canceled")
@@ -0,0 +1,335 @@
+"""
+共享HTTP客户端
+
+TTS、ASR、LLM及插件中的HTTP请求原先直接调用 requests.post/get，每次请求都重新建立 TCP+TLS 连接，
+部分调用没有超时，上游卡住时会一直占用工作线程。这里按服务地址（scheme://host:port）共享 httpx 客户端：
+- 连接保持（keep-alive），同一服务的后续请求复用已建立的连接
+- 每个服务限制最大连接数，安装了 h2 时自动协商 HTTP/2
+- 默认的连接/读取超时，调用方可以按请求覆盖
+- 连接失败、服务端断开空闲连接、429/502/503/504 时按指数退避重试；
+  POST等非幂等请求可能已被服务端处理（例如LLM对话、按次计费的TTS），只在连接阶段失败和429/503时重试
+
+同步客户端是线程安全的，供工作线程和 asyncio.run 临时事件循环中的代码使用；
+异步客户端按事件循环分别创建，供长期运行的事件循环（例如连接所在的主事件循环）中的代码使用。
+"""
+
+import time
+import asyncio
+import weakref
+import threading
+from http.cookiejar import CookieJar
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+from config.logger import setup_logging
+from core.utils.metrics import get_server_metrics
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # 可选依赖，未安装时只使用HTTP/1.1
+    HTTP2_AVAILABLE = False
+
+TAG = __name__
+logger = setup_logging()
+
+# 幂等请求可以重试的状态码：限流、网关错误、服务暂不可用
+RETRY_STATUS = (429, 502, 503, 504)
+# 幂等请求可以重试的异常
+RETRY_EXCEPTIONS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.RemoteProtocolError,
+)
+# 非幂等请求只在服务端明确没有处理请求时重试：连接阶段失败、限流、服务暂不可用
+NON_IDEMPOTENT_RETRY_STATUS = (429, 503)
+NON_IDEMPOTENT_RETRY_EXCEPTIONS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE")
+
+
+class _DiscardCookieJar(CookieJar):
+    """不保存任何Cookie：客户端被所有连接共享，只复用连接，不能把一个请求的会话状态带给其他请求"""
+
+    def set_cookie(self, cookie):
+        pass
+
+    def extract_cookies(self, response, request):
+        pass
+
+
+class HttpClientRegistry:
+    """按服务地址共享的HTTP客户端"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        client_config = (config or {}).get("http_client") or {}
+        timeout = client_config.get("timeout", 60)
+        connect_timeout = client_config.get("connect_timeout", 5)
+        max_connections = client_config.get("max_connections", 20)
+        max_keepalive = client_config.get("max_keepalive_connections", 10)
+        keepalive_expiry = client_config.get("keepalive_expiry", 30)
+        retries = client_config.get("retries", 2)
+        backoff = client_config.get("retry_backoff", 0.5)
+
+        self.timeout = httpx.Timeout(
+            float(timeout) if timeout else 60,
+            connect=float(connect_timeout) if connect_timeout else 5,
+        )
+        self.limits = httpx.Limits(
+            max_connections=int(max_connections) if max_connections else 20,
+            max_keepalive_connections=int(max_keepalive) if max_keepalive else 10,
+            keepalive_expiry=float(keepalive_expiry) if keepalive_expiry else 30,
+        )
+        self.retries = int(retries) if retries is not None else 2
+        self.backoff = float(backoff) if backoff else 0.5
+        http2 = str(client_config.get("http2", True)).lower() in ("true", "1", "yes")
+        self.http2 = http2 and HTTP2_AVAILABLE
+
+        self._lock = threading.Lock()
+        self._clients: Dict[str, httpx.Client] = {}
+        # 事件循环 -> {服务地址: 异步客户端}，事件循环被回收后客户端随之释放
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def base_url(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "timeout": self.timeout,
+            "limits": self.limits,
+            "http2": self.http2,
+            # 与requests保持一致，自动跟随重定向
+            "follow_redirects": True,
+            "cookies": _DiscardCookieJar(),
+        }
+
+    def get_client(self, url: str) -> httpx.Client:
+        """获取服务地址对应的同步客户端"""
+        base = self.base_url(url)
+        client = self._clients.get(base)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(base)
+            if client is None:
+                client = httpx.Client(**self._client_kwargs())
+                self._clients[base] = client
+            return client
+
+    def get_async_client(self, url: str) -> httpx.AsyncClient:
+        """获取当前事件循环中服务地址对应的异步客户端"""
+        loop = asyncio.get_running_loop()
+        base = self.base_url(url)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(base)
+            if client is None:
+                client = httpx.AsyncClient(**self._client_kwargs())
+                clients[base] = client
+            return client
+
+    def _should_retry(
+        self, method: str, attempt: int, retries: int, response=None, error=None
+    ) -> bool:
+        if attempt >= retries:
+            return False
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if error is not None:
+            return isinstance(
+                error, RETRY_EXCEPTIONS if idempotent else NON_IDEMPOTENT_RETRY_EXCEPTIONS
+            )
+        return response.status_code in (
+            RETRY_STATUS if idempotent else NON_IDEMPOTENT_RETRY_STATUS
+        )
+
+    def _delay(self, attempt: int, response=None) -> float:
+        """指数退避，服务端返回Retry-After（秒）时以其为准"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), 10.0)
+        return self.backoff * (2**attempt)
+
+    def request(
+        self, method: str, url: str, retries: Optional[int] = None, **kwargs
+    ) -> httpx.Response:
+        """
+        发送同步请求，可重试的失败按退避策略重试
+
+        Args:
+            retries: 重试次数，为空时使用配置的次数，传0不重试
+            **kwargs: 透传给 httpx.Client.request，例如 json、data、headers、timeout
+        """
+        retries = self.retries if retries is None else retries
+        client = self.get_client(url)
+        attempt = 0
+        while True:
+            try:
+                response = client.request(method, url, **kwargs)
+            except Exception as e:
+                if not self._should_retry(method, attempt, retries, error=e):
+                    raise
+                delay = self._delay(attempt)
+                logger.bind(tag=TAG).warning(
+                    f"{method} {url} 请求失败: {e!r}，{delay:.1f}秒后重试"
+                )
+            else:
+                if not self._should_retry(method, attempt, retries, response=response):
+                    return response
+                delay = self._delay(attempt, response)
+                logger.bind(tag=TAG).warning(
+                    f"{method} {url} 返回 {response.status_code}，{delay:.1f}秒后重试"
+                )
+                response.close()
+            get_server_metrics().record_provider_retry("http", self.base_url(url))
+            time.sleep(delay)
+            attempt += 1
+
+    async def arequest(
+        self, method: str, url: str, retries: Optional[int] = None, **kwargs
+    ) -> httpx.Response:
+        """发送异步请求，重试策略与 request 相同"""
+        retries = self.retries if retries is None else retries
+        client = self.get_async_client(url)
+        attempt = 0
+        while True:
+            try:
+                response = await client.request(method, url, **kwargs)
+            except Exception as e:
+                if not self._should_retry(method, attempt, retries, error=e):
+                    raise
+                delay = self._delay(attempt)
+                logger.bind(tag=TAG).warning(
+                    f"{method} {url} 请求失败: {e!r}，{delay:.1f}秒后重试"
+                )
+            else:
+                if not self._should_retry(method, attempt, retries, response=response):
+                    return response
+                delay = self._delay(attempt, response)
+                logger.bind(tag=TAG).warning(
+                    f"{method} {url} 返回 {response.status_code}，{delay:.1f}秒后重试"
+                )
+                await response.aclose()
+            get_server_metrics().record_provider_retry("http", self.base_url(url))
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @contextmanager
+    def stream(self, method: str, url: str, retries: Optional[int] = None, **kwargs):
+        """
+        发送流式请求，在收到响应头之前的失败可以重试
+
+        用法：with registry.stream("POST", url, json=...) as response: ...
+        """
+        retries = self.retries if retries is None else retries
+        client = self.get_client(url)
+        attempt = 0
+        while True:
+            request = client.build_request(method, url, **_request_kwargs(kwargs))
+            try:
+                response = client.send(request, stream=True, **_send_kwargs(kwargs))
+            except Exception as e:
+                if not self._should_retry(method, attempt, retries, error=e):
+                    raise
+                delay = self._delay(attempt)
+            else:
+                if not self._should_retry(method, attempt, retries, response=response):
+                    break
+                delay = self._delay(attempt, response)
+                response.close()
+            logger.bind(tag=TAG).warning(f"{method} {url} 流式请求失败，{delay:.1f}秒后重试")
+            get_server_metrics().record_provider_retry("http", self.base_url(url))
+            time.sleep(delay)
+            attempt += 1
+        try:
+            yield response
+        finally:
+            response.close()
+
+    @asynccontextmanager
+    async def astream(
+        self, method: str, url: str, retries: Optional[int] = None, **kwargs
+    ):
+        """
+        发送异步流式请求，重试策略与 stream 相同
+
+        用法：async with registry.astream("POST", url, json=...) as response: ...
+        """
+        retries = self.retries if retries is None else retries
+        client = self.get_async_client(url)
+        attempt = 0
+        while True:
+            request = client.build_request(method, url, **_request_kwargs(kwargs))
+            try:
+                response = await client.send(
+                    request, stream=True, **_send_kwargs(kwargs)
+                )
+            except Exception as e:
+                if not self._should_retry(method, attempt, retries, error=e):
+                    raise
+                delay = self._delay(attempt)
+            else:
+                if not self._should_retry(method, attempt, retries, response=response):
+                    break
+                delay = self._delay(attempt, response)
+                await response.aclose()
+            logger.bind(tag=TAG).warning(f"{method} {url} 流式请求失败，{delay:.1f}秒后重试")
+            get_server_metrics().record_provider_retry("http", self.base_url(url))
+            await asyncio.sleep(delay)
+            attempt += 1
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    def close_all(self):
+        """关闭全部同步客户端的连接池"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+_SEND_KWARGS = ("auth", "follow_redirects")
+
+
+def _request_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in kwargs.items() if k not in _SEND_KWARGS}
+
+
+def _send_kwargs(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in kwargs.items() if k in _SEND_KWARGS}
+
+
+# 全局单例
+_http_client_instance = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_clients(config: Optional[Dict[str, Any]] = None) -> HttpClientRegistry:
+    """
+    获取共享HTTP客户端（单例模式）
+
+    Args:
+        config: 配置字典，仅在首次创建时使用
+
+    Returns:
+        HttpClientRegistry实例
+    """
+    global _http_client_instance
+    with _http_client_lock:
+        if _http_client_instance is None:
+            _http_client_instance = HttpClientRegistry(config)
+        return _http_client_instance
@@ -0,0 +1,313 @@
+"""
+意图识别结果缓存
+
+原先的缓存键是 md5(device_id + 原文)，标点、语气词或设备不同都不会命中，并且10分钟过期。
+IntentCache 的缓存键由两部分组成：
+- 规范化后的文本：去掉表情和标点、全角转半角、小写、中文数字转阿拉伯数字、去掉首尾的客套话和语气词及“的”
+- 函数签名：当前连接注册的全部函数（名称、描述、参数）和意图识别模型，函数变化后旧的缓存不再命中
+
+与设备无关的意图（继续聊天、基础信息、服务端插件和服务端MCP工具）在所有设备之间共享；
+设备端IoT/MCP工具、MCP接入点、Home Assistant、角色切换等与设备配置相关的意图，
+依赖对话上下文的短句，以及参数不是全部来自原文的意图（例如“再放一遍”的歌名来自上文），只在本设备内缓存。
+
+可选的相近说法匹配：规范化文本未精确命中时，与同一函数签名下已缓存的说法比较字二元组相似度，
+达到阈值、数字和否定词完全相同、且缓存意图参数中出现的原文片段在本次输入中也存在时才复用。
+"""
+
+import re
+import json
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from config.logger import setup_logging
+from core.utils.cache.manager import cache_manager
+from core.utils.cache.config import CacheConfig, CacheType
+from core.utils.cache.strategies import CacheStrategy
+from core.utils.textUtils import check_emoji
+from core.utils.intent_classifier import get_intent_functions, parse_number
+from core.providers.tools.base import ToolType
+
+TAG = __name__
+logger = setup_logging()
+
+# 不依赖工具的意图，总是可以共享
+_SHARED_INTENTS = ("continue_chat", "result_for_context")
+# 可以在设备之间共享的工具类型
+_SHARED_TOOL_TYPES = (ToolType.SERVER_PLUGIN, ToolType.SERVER_MCP)
+# 参数依赖设备配置的服务端插件（Home Assistant设备、角色列表）
+_PERSONAL_PLUGIN_PREFIXES = ("hass_", "change_role")
+# 短句（如“是的”“好”）的意图依赖对话上下文，只在本设备内缓存
+MIN_SHARED_LENGTH = 4
+
+_NON_WORD = re.compile(r"[\W_]+")
+_LEADING_FILLER = re.compile(r"^(?:请问|请你|请|麻烦你|麻烦|帮我|给我|那个|嗯|呃|哎|小智|把)+")
+_TRAILING_FILLER = re.compile(r"(?:吧|啊|呀|呢|哦|啦|嘛)+$")
+_CN_NUMBER = re.compile(r"[零一二两三四五六七八九十百]+")
+_DIGITS = re.compile(r"\d+")
+# 否定和停止类的字会反转意图，相近说法匹配时必须完全相同，例如“不要播放晴天”与“播放晴天”
+_NEGATIONS = re.compile(r"[不别没停关莫勿]")
+
+
+def _cn_number_to_digits(match) -> str:
+    value = parse_number(match.group(0))
+    return match.group(0) if value is None else str(value)
+
+
+def normalize_intent_text(text: str) -> str:
+    """规范化用户输入，作为意图缓存的文本部分"""
+    text = unicodedata.normalize("NFKC", check_emoji(text or "")).lower()
+    text = _NON_WORD.sub("", text)
+    # 结构助词和“一下”不影响意图，例如“北京的天气”与“北京天气”
+    text = text.replace("一下", "").replace("的", "")
+    text = _LEADING_FILLER.sub("", text)
+    text = _TRAILING_FILLER.sub("", text)
+    return _CN_NUMBER.sub(_cn_number_to_digits, text)
+
+
+def _bigrams(text: str) -> frozenset:
+    if len(text) < 2:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i : i + 2] for i in range(len(text) - 1))
+
+
+def _argument_values(value) -> List[str]:
+    """意图参数中的全部字符串和数字"""
+    if isinstance(value, dict):
+        return [v for item in value.values() for v in _argument_values(item)]
+    if isinstance(value, list):
+        return [v for item in value for v in _argument_values(item)]
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return [str(value)]
+    return []
+
+
+class _Utterance:
+    """已缓存的一种说法，用于相近说法匹配"""
+
+    __slots__ = ("key", "grams", "digits", "negations", "fragments")
+
+    def __init__(self, key: str, text: str, intent: str):
+        self.key = key
+        self.grams = _bigrams(text)
+        self.digits = _DIGITS.findall(text)
+        self.negations = _NEGATIONS.findall(text)
+        # 参数中出现在原文里的片段（歌名、地点、数值等），复用时本次输入中也必须出现
+        try:
+            values = _argument_values(json.loads(intent))
+        except ValueError:
+            values = []
+        fragments = (normalize_intent_text(v) for v in values)
+        self.fragments = [f for f in fragments if f and f in text]
+
+
+class IntentCache:
+    """规范化文本 + 函数签名的意图缓存，与设备无关的意图在设备之间共享"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        cache_config = (config or {}).get("intent_cache") or {}
+        self.enabled = str(cache_config.get("enabled", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        ttl = cache_config.get("ttl")
+        max_size = cache_config.get("max_size")
+        similarity = cache_config.get("similarity")
+        self.max_size = int(max_size) if max_size else 5000
+        self.similarity = float(similarity) if similarity else 0.0
+        cache_manager.configure(
+            CacheType.INTENT,
+            CacheConfig(
+                strategy=CacheStrategy.TTL_LRU,
+                ttl=float(ttl) if ttl else 86400,
+                max_size=self.max_size,
+            ),
+        )
+        self._lock = threading.Lock()
+        # (范围, 函数签名) -> {规范化文本: _Utterance}，范围为空表示共享
+        self._utterances: "OrderedDict[Tuple[str, str], OrderedDict[str, _Utterance]]" = (
+            OrderedDict()
+        )
+        self._utterance_count = 0
+
+    def signature(self, conn, model_info: str = "") -> str:
+        """当前连接注册的函数和意图识别模型的签名，函数不变时复用上次的结果"""
+        functions = get_intent_functions(conn)
+        cached = getattr(conn, "intent_cache_signature", None)
+        if cached is not None and cached[0] == functions and cached[1] == model_info:
+            return cached[2]
+        raw = json.dumps(
+            [
+                model_info,
+                sorted(
+                    (
+                        [
+                            f.get("function", {}).get("name", ""),
+                            f.get("function", {}).get("description", ""),
+                            f.get("function", {}).get("parameters", {}),
+                        ]
+                        for f in functions
+                    ),
+                    key=lambda item: item[0],
+                ),
+            ],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        signature = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+        conn.intent_cache_signature = (functions, model_info, signature)
+        return signature
+
+    @staticmethod
+    def _key(scope: str, signature: str, text: str) -> str:
+        raw = f"{scope}\n{signature}\n{text}"
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _device_scope(conn) -> str:
+        return f"device:{conn.device_id}"
+
+    def _is_shared(self, conn, text: str, intent: str) -> bool:
+        """意图是否与设备无关：不是依赖上下文的短句，参数都来自原文，且调用的函数都与设备无关"""
+        if len(text) < MIN_SHARED_LENGTH:
+            return False
+        try:
+            data = json.loads(intent)
+        except ValueError:
+            return False
+        calls = data.get("function_calls") or [data.get("function_call") or {}]
+        tool_manager = getattr(conn.func_handler, "tool_manager", None)
+        for call in calls:
+            name = call.get("name", "") if isinstance(call, dict) else ""
+            if name in _SHARED_INTENTS:
+                continue
+            if not name or name.startswith(_PERSONAL_PLUGIN_PREFIXES):
+                return False
+            # 参数值不在原文中时可能来自对话上下文，不能给其他设备复用
+            for value in _argument_values(call.get("arguments") or {}):
+                if normalize_intent_text(value) not in text:
+                    return False
+            tool_type = tool_manager.get_tool_type(name) if tool_manager else None
+            if tool_type not in _SHARED_TOOL_TYPES:
+                return False
+        return True
+
+    def get(self, conn, signature: str, text: str) -> Optional[str]:
+        """查询缓存：先精确匹配本设备和共享的缓存，再匹配相近说法"""
+        if not self.enabled:
+            return None
+        normalized = normalize_intent_text(text)
+        if not normalized:
+            return None
+        scopes = (self._device_scope(conn), "")
+        for scope in scopes:
+            intent = cache_manager.get(
+                CacheType.INTENT, self._key(scope, signature, normalized)
+            )
+            if intent is not None:
+                return intent
+        if self.similarity <= 0:
+            return None
+        for scope in scopes:
+            intent = self._get_similar(scope, signature, normalized)
+            if intent is not None:
+                return intent
+        return None
+
+    def _get_similar(self, scope: str, signature: str, normalized: str) -> Optional[str]:
+        grams = _bigrams(normalized)
+        digits = _DIGITS.findall(normalized)
+        negations = _NEGATIONS.findall(normalized)
+        with self._lock:
+            utterances = self._utterances.get((scope, signature))
+            if not utterances:
+                return None
+            best, best_score = None, self.similarity
+            for text, utterance in utterances.items():
+                if utterance.digits != digits or utterance.negations != negations:
+                    continue
+                shared = len(grams & utterance.grams)
+                score = 2 * shared / (len(grams) + len(utterance.grams))
+                if score >= best_score and all(
+                    f in normalized for f in utterance.fragments
+                ):
+                    best, best_score = (text, utterance), score
+        if best is None:
+            return None
+        text, utterance = best
+        intent = cache_manager.get(CacheType.INTENT, utterance.key)
+        if intent is None:
+            # 已过期或被淘汰
+            self._forget(scope, signature, text)
+            return None
+        logger.bind(tag=TAG).debug(f"意图缓存相近说法命中: {normalized} -> {text}")
+        return intent
+
+    def put(self, conn, signature: str, text: str, intent: str):
+        """写入缓存，与设备无关的意图写入共享范围"""
+        if not self.enabled:
+            return
+        normalized = normalize_intent_text(text)
+        if not normalized:
+            return
+        scope = "" if self._is_shared(conn, normalized, intent) else self._device_scope(conn)
+        key = self._key(scope, signature, normalized)
+        cache_manager.set(CacheType.INTENT, key, intent)
+        if self.similarity <= 0:
+            return
+        utterance = _Utterance(key, normalized, intent)
+        with self._lock:
+            utterances = self._utterances.setdefault((scope, signature), OrderedDict())
+            if normalized not in utterances:
+                self._utterance_count += 1
+            utterances[normalized] = utterance
+            utterances.move_to_end(normalized)
+            # 与缓存容量保持一致，淘汰最早写入的说法
+            while self._utterance_count > self.max_size:
+                group_key, group = next(iter(self._utterances.items()))
+                group.popitem(last=False)
+                self._utterance_count -= 1
+                if not group:
+                    del self._utterances[group_key]
+
+    def _forget(self, scope: str, signature: str, text: str):
+        with self._lock:
+            utterances = self._utterances.get((scope, signature))
+            if utterances is not None and utterances.pop(text, None) is not None:
+                self._utterance_count -= 1
+                if not utterances:
+                    del self._utterances[(scope, signature)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "similarity": self.similarity,
+                "utterances": self._utterance_count,
+                "signatures": len({signature for _, signature in self._utterances}),
+            }
+
+
+# 全局单例
+_intent_cache_instance = None
+_intent_cache_lock = threading.Lock()
+
+
+def get_intent_cache(config: Optional[Dict[str, Any]] = None) -> IntentCache:
+    """
+    获取意图识别结果缓存（单例模式）
+
+    Args:
+        config: 配置字典，仅在首次创建时使用
+
+    Returns:
+        IntentCache实例
+    """
+    global _intent_cache_instance
+    with _intent_cache_lock:
+        if _intent_cache_instance is None:
+            _intent_cache_instance = IntentCache(config)
+        return _intent_cache_instance
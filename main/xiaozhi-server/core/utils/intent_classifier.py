@@ -0,0 +1,301 @@
+"""
+本地快速意图识别
+
+intent_llm 模式下每句话都要先调用一次大模型做意图识别，而大部分请求是重复的常用指令。
+FastIntentClassifier 在调用大模型之前先在本地判断：
+- 规则：退出、设置音量、播放音乐、查询天气、询问时间日期，参数（歌名、地点、音量）直接从句子中提取，
+  歌名需要在本地音乐索引中找到高度相似的歌曲，地点需要是常用地名表中的地名
+- 函数描述模型：用当前连接注册的函数描述（名称、描述、参数说明）建立IDF加权的字二元组模型，
+  只用于没有必填参数的函数，按用户所说的二元组在某个函数描述中的覆盖率打分
+
+只有置信度足够高、且对应函数在当前连接中已注册时才返回结果，否则仍交给大模型。
+结果与大模型意图识别的JSON格式相同，由 process_intent_result 统一处理。
+"""
+
+import re
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config.logger import setup_logging
+from core.utils.music_index import normalize_title
+from core.utils.place_names import is_place_name
+
+TAG = __name__
+logger = setup_logging()
+
+# 按函数描述识别的最低得分与领先第二名的最小差值
+DEFAULT_MIN_SCORE = 0.75
+MIN_MARGIN = 0.2
+# 歌名与本地歌曲的最低相似度
+MIN_SONG_SCORE = 0.8
+
+# 疑问语气，例如“怎么退出了”不是要退出
+_QUESTION = re.compile(r"怎么|为什么|为啥|如何|吗|么")
+_POLITE = r"(?:请|请你|帮我|给我|麻烦|你)?"
+_TAIL = r"(?:吧|了|啦|呀|啊|呢)?"
+
+_EXIT = re.compile(
+    rf"^(?:好的?|那|那就|嗯)?(?:再见|拜拜|退出(?:系统|对话)?|结束(?:对话|聊天)|不聊了|我不想(?:和|跟)你说话了){_TAIL}$"
+)
+_CONTEXT = (
+    # 时间
+    re.compile(rf"^(?:请问)?(?:现在|当前)?(?:是)?(?:几点(?:钟)?|什么时间|时间是多少){_TAIL}$"),
+    # 日期、星期
+    re.compile(
+        rf"^(?:请问)?今天(?:是)?(?:几号|几月几号|几月几日|星期几|周几|礼拜几|什么日期|什么日子){_TAIL}$"
+    ),
+    # 农历
+    re.compile(rf"^(?:请问)?今天(?:的)?(?:农历|阴历)(?:是)?(?:几号|多少|什么|哪天)?{_TAIL}$"),
+)
+_RANDOM_MUSIC = re.compile(
+    rf"^{_POLITE}(?:播放|放|来|唱|听)(?:一|1)?(?:首|点|个|下)?(?:歌|歌曲|音乐)(?:听听|听)?{_TAIL}$"
+    rf"|^我(?:想|要)听(?:歌|音乐){_TAIL}$"
+)
+_SONG = re.compile(
+    rf"^{_POLITE}(?:播放|放一首|来一首|唱一首|我想听|我要听)(?:一下)?(?P<name>.+?)(?:这首歌|的歌)?{_TAIL}$"
+)
+_WEATHER = re.compile(
+    r"^(?:请问|帮我查一?下|查一?下|查询)?(?P<location>.{0,10}?)(?:的)?天气(?:怎么样|如何|预报|情况)?(?:啊|呢)?$"
+)
+_WEATHER_TIME = re.compile(r"今天|明天|后天|现在|这几天|最近|本周|这周|的")
+_VOLUME = re.compile(
+    r"^(?:请|帮我)?(?:把)?(?:音量|声音)(?:调|设置|设|开|改)?(?:到|为|成)?"
+    r"(?:百分之)?(?P<value>\d{1,3}|[零一二两三四五六七八九十百]+)(?:%)?" + _TAIL + "$"
+)
+
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+
+# 与意图无关的常见字词，不参与函数描述模型的打分
+_FILLER = re.compile(r"请问|请|帮我|给我|麻烦|一下|查询|查|看看|告诉我|我想|我要|现在|当前|是多少|多少|什么|怎么样")
+
+
+def parse_number(text: str) -> Optional[int]:
+    """解析0~100的阿拉伯数字或中文数字"""
+    if text.isdigit():
+        return int(text)
+    if text == "一百" or text == "百":
+        return 100
+    if "百" in text:
+        return None
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        tens_value = _CN_DIGITS.get(tens, None) if tens else 1
+        ones_value = _CN_DIGITS.get(ones, None) if ones else 0
+        if tens_value is None or ones_value is None:
+            return None
+        return tens_value * 10 + ones_value
+    if len(text) == 1:
+        return _CN_DIGITS.get(text)
+    return None
+
+
+def _bigrams(text: str) -> List[str]:
+    if len(text) < 2:
+        return [text] if text else []
+    return [text[i : i + 2] for i in range(len(text) - 1)]
+
+
+def _function_text(info: Dict[str, Any]) -> str:
+    """函数描述和参数说明，规范化后用于建立模型"""
+    params = info.get("parameters") or {}
+    text = info.get("description", "") + "".join(
+        p.get("description", "") for p in params.get("properties", {}).values()
+    )
+    return normalize_title(text)
+
+
+def _function_call(name: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+    call = {"name": name}
+    if arguments:
+        call["arguments"] = arguments
+    return json.dumps({"function_call": call}, ensure_ascii=False)
+
+
+class _DescriptionModel:
+    """按函数描述识别无必填参数的函数"""
+
+    def __init__(self, functions: List[Dict[str, Any]]):
+        # IDF：出现在越多函数描述中的二元组越不能区分函数
+        total = len(functions) or 1
+        df: Dict[str, int] = {}
+        self.docs: Dict[str, set] = {}
+        for func in functions:
+            info = func.get("function", {})
+            grams = set(_bigrams(_function_text(info)))
+            for gram in grams:
+                df[gram] = df.get(gram, 0) + 1
+            if grams and not (info.get("parameters") or {}).get("required"):
+                self.docs[info.get("name", "")] = grams
+        self.idf = {g: math.log((total + 1) / (n + 1)) + 1 for g, n in df.items()}
+        self.default_idf = math.log(total + 1) + 1
+
+    def predict(self, text: str) -> Tuple[Optional[str], float, float]:
+        """返回 (函数名, 得分, 领先第二名的差值)，得分为用户所说的二元组在函数描述中的加权覆盖率"""
+        grams = set(_bigrams(_FILLER.sub("", normalize_title(text))))
+        if not grams or not self.docs:
+            return None, 0.0, 0.0
+        weights = {g: self.idf.get(g, self.default_idf) for g in grams}
+        total = sum(weights.values())
+        scores = sorted(
+            (
+                (sum(w for g, w in weights.items() if g in doc) / total, name)
+                for name, doc in self.docs.items()
+            ),
+            reverse=True,
+        )
+        best_score, best_name = scores[0]
+        second = scores[1][0] if len(scores) > 1 else 0.0
+        return best_name, best_score, best_score - second
+
+
+class FastIntentClassifier:
+    """一个连接上的本地意图识别，注册的函数变化时重新创建"""
+
+    def __init__(
+        self,
+        functions: List[Dict[str, Any]],
+        min_score: float = DEFAULT_MIN_SCORE,
+        music_index=None,
+    ):
+        self.functions = functions
+        self.min_score = min_score
+        self.music_index = music_index
+        self.tools = {
+            func.get("function", {}).get("name"): func.get("function", {})
+            for func in functions
+        }
+        self.volume_tool = self._find_volume_tool()
+        self.model = _DescriptionModel(functions)
+
+    def _find_volume_tool(self) -> Optional[Tuple[str, str, List[str]]]:
+        """设备的设置音量函数：(函数名, 音量参数名, 必填参数)"""
+        for name, info in self.tools.items():
+            if not name or "volume" not in name.lower():
+                continue
+            params = info.get("parameters") or {}
+            for param_name, param in params.get("properties", {}).items():
+                if param.get("type") in ("integer", "number") and (
+                    "volume" in param_name.lower() or "音量" in param.get("description", "")
+                ):
+                    return name, param_name, params.get("required", [])
+        return None
+
+    def classify(self, text: str) -> Optional[Tuple[str, str]]:
+        """识别成功时返回 (意图JSON, 规则名)，否则返回None"""
+        is_question = bool(_QUESTION.search(text)) or text.rstrip().endswith(("?", "？"))
+        clean = normalize_title(text)
+        if not clean:
+            return None
+
+        if not is_question and _EXIT.match(clean) and "handle_exit_intent" in self.tools:
+            return (
+                _function_call("handle_exit_intent", {"say_goodbye": "再见，祝您生活愉快！"}),
+                "exit",
+            )
+
+        for pattern in _CONTEXT:
+            if pattern.match(clean):
+                return _function_call("result_for_context"), "time"
+
+        result = self._classify_volume(clean)
+        if result is not None:
+            return result, "volume"
+
+        if "play_music" in self.tools:
+            if _RANDOM_MUSIC.match(clean):
+                return _function_call("play_music", {"song_name": "random"}), "music"
+            result = self._classify_song(clean)
+            if result is not None:
+                return result, "music"
+
+        if "get_weather" in self.tools:
+            match = _WEATHER.match(clean)
+            if match:
+                # 天气前面只能是地名，例如“你觉得天气怎么样”“聊聊天气”仍交给大模型
+                location = _WEATHER_TIME.sub("", match.group("location"))
+                if not location or is_place_name(location):
+                    arguments = {"lang": "zh_CN"}
+                    if location:
+                        arguments["location"] = location
+                    return _function_call("get_weather", arguments), "weather"
+
+        name, score, margin = self.model.predict(clean)
+        if name and score >= self.min_score and margin >= MIN_MARGIN:
+            return _function_call(name), "description"
+        return None
+
+    def _classify_volume(self, clean: str) -> Optional[str]:
+        if self.volume_tool is None:
+            return None
+        match = _VOLUME.match(clean)
+        if not match:
+            return None
+        value = parse_number(match.group("value"))
+        if value is None or not 0 <= value <= 100:
+            return None
+        name, param_name, required = self.volume_tool
+        arguments: Dict[str, Any] = {param_name: value}
+        if "response_success" in required:
+            arguments["response_success"] = f"音量已调整到{value}"
+        if "response_failure" in required:
+            arguments["response_failure"] = "音量调整失败"
+        return _function_call(name, arguments)
+
+    def _classify_song(self, clean: str) -> Optional[str]:
+        if self.music_index is None:
+            return None
+        match = _SONG.match(clean)
+        if not match:
+            return None
+        results = self.music_index.search(match.group("name"), limit=1)
+        if not results or results[0][1] < MIN_SONG_SCORE:
+            return None
+        return _function_call("play_music", {"song_name": match.group("name")})
+
+
+def get_intent_functions(conn) -> List[Dict[str, Any]]:
+    """意图识别使用的函数：注册的函数加上设备MCP工具，返回新的列表"""
+    functions = list(conn.func_handler.get_functions() or [])
+    mcp_client = getattr(conn, "mcp_client", None)
+    if mcp_client is not None:
+        functions.extend(mcp_client.get_available_tools() or [])
+    return functions
+
+
+def classify_fast_intent(conn, text: str) -> Optional[str]:
+    """
+    在调用大模型意图识别前本地识别常用指令
+
+    Returns:
+        与大模型意图识别相同格式的JSON字符串，置信度不足时返回None
+    """
+    intent_config = getattr(conn.intent, "config", None) or {}
+    if str(intent_config.get("fast_intent", True)).lower() not in ("true", "1", "yes"):
+        return None
+    if conn.func_handler is None:
+        return None
+
+    start = time.monotonic()
+    functions = get_intent_functions(conn)
+    classifier = getattr(conn, "fast_intent_classifier", None)
+    if classifier is None or classifier.functions != functions:
+        min_score = intent_config.get("fast_intent_min_score")
+        classifier = FastIntentClassifier(
+            functions, float(min_score) if min_score else DEFAULT_MIN_SCORE
+        )
+        conn.fast_intent_classifier = classifier
+    if classifier.music_index is None and "play_music" in classifier.tools:
+        from plugins_func.functions.play_music import get_ready_music_index
+
+        # 音乐索引在后台建立，建立完成前不识别具体歌名
+        classifier.music_index = get_ready_music_index(conn)
+
+    result = classifier.classify(text)
+    if result is None:
+        return None
+    intent, rule = result
+    logger.bind(tag=TAG).info(
+        f"本地意图识别({rule}): {intent}, 耗时: {(time.monotonic() - start) * 1000:.2f}ms"
+    )
+    return intent
@@ -0,0 +1,256 @@
+"""
+对话轮次端到端延迟追踪
+
+VAD检测到说话结束时为本轮对话创建 TurnTrace，沿途各阶段调用 mark 记录相对时间（毫秒），
+最后一个音频包发送完成（TTS stop）或下一轮开始时结束，交给配置的输出（sink）：
+- memory: 进程内环形缓冲，保留最近的若干轮，用于排查
+- jsonl: 追加写入JSON Lines文件，用于离线分析
+- histogram: 按阶段累计的Prometheus风格直方图，供 /metrics 输出
+
+可以通过 register_sink 注册自定义输出。
+"""
+
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from config.logger import setup_logging
+from core.utils.worker_pool import get_worker_pools, PoolRejectedError
+
+TAG = __name__
+logger = setup_logging()
+
+# 追踪的阶段，按一轮对话中出现的顺序排列
+STAGES = (
+    "vad_stop",
+    "opus_decode",
+    "asr_result",
+    "intent",
+    "memory_query",
+    "llm_first_token",
+    "tts_first_segment",
+    "tts_first_audio",
+    "first_packet_sent",
+    "last_packet_sent",
+)
+
+# 直方图分桶上限（毫秒）
+DEFAULT_BUCKETS = (50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+
+class TurnTrace:
+    """一轮对话的各阶段时间点，相对VAD检测到说话结束的毫秒数"""
+
+    def __init__(self, session_id: str, device_id: Optional[str]):
+        self.session_id = session_id
+        self.device_id = device_id
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self.stages: Dict[str, float] = {"vad_stop": 0.0}
+        self.finished = False
+        self.interrupted = False
+
+    def mark(self, stage: str, overwrite: bool = False):
+        """记录阶段时间，默认只记录第一次出现的时间"""
+        if self.finished or (stage in self.stages and not overwrite):
+            return
+        self.stages[stage] = round((time.monotonic() - self._start) * 1000, 1)
+
+    def has(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "device_id": self.device_id,
+            "started_at": self.started_at,
+            "interrupted": self.interrupted,
+            "stages": {s: self.stages[s] for s in STAGES if s in self.stages},
+            "total_ms": max(self.stages.values()),
+        }
+
+
+class TraceSink(ABC):
+    """追踪输出的基类"""
+
+    @abstractmethod
+    def emit(self, trace: Dict[str, Any]):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryRingSink(TraceSink):
+    """保留最近 size 轮的追踪"""
+
+    def __init__(self, size: int = 200):
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def emit(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)
+        return traces[-limit:] if limit else traces
+
+
+class JsonLinesSink(TraceSink):
+    """追加写入JSON Lines文件，写文件放到后台线程池，不阻塞事件循环"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _write(self, line: str):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def emit(self, trace):
+        line = json.dumps(trace, ensure_ascii=False) + "\n"
+        try:
+            get_worker_pools().submit("background", self._write, line)
+        except PoolRejectedError:
+            # 后台线程池饱和时丢弃，追踪不应影响对话
+            pass
+
+
+class HistogramSink(TraceSink):
+    """按阶段累计的直方图（Prometheus风格的累积分桶）"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # 阶段 -> [各分桶计数..., +Inf计数], 总和
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+
+    def observe(self, stage: str, value_ms: float):
+        with self._lock:
+            counts = self._counts.setdefault(stage, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value_ms <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[stage] = self._sums.get(stage, 0.0) + value_ms
+
+    def emit(self, trace):
+        for stage, value in trace["stages"].items():
+            if stage != "vad_stop":
+                self.observe(stage, value)
+        self.observe("total", trace["total_ms"])
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{阶段: {"buckets": [(上限, 累计计数)...], "count": 总数, "sum": 总和}}"""
+        with self._lock:
+            return {
+                stage: {
+                    "buckets": list(zip(self.buckets, counts[:-1])),
+                    "count": counts[-1],
+                    "sum": self._sums[stage],
+                }
+                for stage, counts in self._counts.items()
+            }
+
+
+# sink名称 -> 根据配置创建sink的函数
+_SINK_FACTORIES: Dict[str, Callable[[Dict[str, Any]], TraceSink]] = {
+    "memory": lambda conf: MemoryRingSink(int(conf.get("ring_size") or 200)),
+    "jsonl": lambda conf: JsonLinesSink(
+        conf.get("jsonl_path") or "tmp/latency_trace.jsonl"
+    ),
+    "histogram": lambda conf: HistogramSink(conf.get("buckets") or DEFAULT_BUCKETS),
+}
+
+
+def register_sink(name: str, factory: Callable[[Dict[str, Any]], TraceSink]):
+    """注册自定义追踪输出，配置 latency_trace.sinks 中使用同名即可启用"""
+    _SINK_FACTORIES[name] = factory
+
+
+class LatencyTracer:
+    """创建和结束对话轮次追踪，并把结果交给各个输出"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        trace_config = (config or {}).get("latency_trace") or {}
+        self.enabled = str(trace_config.get("enabled", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self.sinks: Dict[str, TraceSink] = {}
+        for name in trace_config.get("sinks") or ["memory", "histogram"]:
+            factory = _SINK_FACTORIES.get(name)
+            if factory is None:
+                logger.bind(tag=TAG).warning(f"不支持的延迟追踪输出: {name}")
+                continue
+            try:
+                self.sinks[name] = factory(trace_config)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"创建延迟追踪输出 {name} 失败: {e}")
+
+    def start_turn(self, conn) -> Optional[TurnTrace]:
+        """VAD检测到说话结束时调用，上一轮尚未结束时按被打断结束"""
+        if not self.enabled:
+            return None
+        previous = getattr(conn, "turn_trace", None)
+        if previous is not None and not previous.finished:
+            previous.interrupted = True
+            self.finish(previous)
+        conn.turn_trace = TurnTrace(conn.session_id, conn.device_id)
+        return conn.turn_trace
+
+    def finish(self, trace: Optional[TurnTrace]):
+        """结束一轮追踪并输出，重复调用只输出一次"""
+        if trace is None or trace.finished:
+            return
+        trace.finished = True
+        data = trace.to_dict()
+        logger.bind(tag=TAG).debug(f"对话延迟: {data['stages']}")
+        for name, sink in self.sinks.items():
+            try:
+                sink.emit(data)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"延迟追踪输出 {name} 失败: {e}")
+
+    def get_sink(self, name: str) -> Optional[TraceSink]:
+        return self.sinks.get(name)
+
+
+def mark_stage(conn, stage: str, overwrite: bool = False):
+    """记录当前轮次的阶段时间，连接没有进行中的追踪时忽略"""
+    trace = getattr(conn, "turn_trace", None)
+    if trace is not None:
+        trace.mark(stage, overwrite)
+
+
+# 全局单例
+_tracer_instance = None
+_tracer_lock = threading.Lock()
+
+
+def get_latency_tracer(config: Optional[Dict[str, Any]] = None) -> LatencyTracer:
+    """
+    获取延迟追踪器（单例模式）
+
+    Args:
+        config: 配置字典，仅在首次创建时使用
+
+    Returns:
+        LatencyTracer实例
+    """
+    global _tracer_instance
+    with _tracer_lock:
+        if _tracer_instance is None:
+            _tracer_instance = LatencyTracer(config)
+        return _tracer_instance
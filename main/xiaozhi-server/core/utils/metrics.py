@@ -0,0 +1,414 @@
+"""
+服务器运行指标
+
+各个共享服务（线程池、缓存、延迟追踪、GC管理器）各自维护统计，这里补充它们之外的计数：
+当前连接、TTS/ASR/LLM提供商的失败与重试次数、音频包发送速率，
+并在 /metrics 请求时把全部统计按 Prometheus 文本格式输出。
+
+计数只在内存中累加，开销与一次加锁相当，不影响对话链路。
+"""
+
+import time
+import weakref
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 每个连接上统计深度的队列：(指标标签, 取队列的函数)
+CONNECTION_QUEUES = (
+    ("asr_audio_queue", lambda conn: conn.asr_audio_queue),
+    ("tts_text_queue", lambda conn: conn.tts.tts_text_queue),
+    ("tts_audio_queue", lambda conn: conn.tts.tts_audio_queue),
+    ("report_queue", lambda conn: conn.report_queue),
+)
+
+
+def provider_name(provider) -> str:
+    """提供商名称，取实现类所在模块名（例如 core.providers.tts.edge -> edge）"""
+    if provider is None:
+        return "unknown"
+    if isinstance(provider, str):
+        return provider
+    return type(provider).__module__.rsplit(".", 1)[-1]
+
+
+class RateMeter:
+    """按秒分桶的滑动窗口计数，用于计算最近 window 秒内的平均速率"""
+
+    def __init__(self, window: int = 10):
+        self.window = max(1, int(window))
+        self._seconds = [0] * self.window
+        self._counts = [0] * self.window
+
+    def add(self, count: int = 1):
+        now = int(time.monotonic())
+        i = now % self.window
+        if self._seconds[i] != now:
+            self._seconds[i] = now
+            self._counts[i] = 0
+        self._counts[i] += count
+
+    def rate(self) -> float:
+        now = int(time.monotonic())
+        total = sum(
+            count
+            for second, count in zip(self._seconds, self._counts)
+            if now - second < self.window
+        )
+        return total / self.window
+
+
+class ServerMetrics:
+    """连接、提供商失败/重试、线程池拒绝对话和音频发送的计数"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        metrics_config = (config or {}).get("metrics") or {}
+        rate_window = metrics_config.get("rate_window", 10)
+        self.enabled = str(metrics_config.get("enabled", False)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        self._lock = threading.Lock()
+        # 连接关闭后自动移除，不会因为异常退出的连接而泄漏
+        self._connections = weakref.WeakSet()
+        self._connections_total = 0
+        # (类型, 提供商) -> 次数
+        self._provider_errors: Dict[Tuple[str, str], int] = {}
+        self._provider_retries: Dict[Tuple[str, str], int] = {}
+        # 线程池 -> 因线程池饱和而没有完成的对话轮次
+        self._pool_rejected: Dict[str, int] = {}
+        self._audio_packets = 0
+        self._packet_rate = RateMeter(int(rate_window) if rate_window else 10)
+
+    def connection_opened(self, conn):
+        with self._lock:
+            self._connections.add(conn)
+            self._connections_total += 1
+
+    def connection_closed(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+
+    def active_connections(self) -> List[Any]:
+        with self._lock:
+            return list(self._connections)
+
+    def record_provider_error(self, kind: str, provider):
+        """记录一次提供商调用失败，kind 为 tts、asr、llm"""
+        key = (kind, provider_name(provider))
+        with self._lock:
+            self._provider_errors[key] = self._provider_errors.get(key, 0) + 1
+
+    def record_provider_retry(self, kind: str, provider):
+        """记录一次失败后的重试"""
+        key = (kind, provider_name(provider))
+        with self._lock:
+            self._provider_retries[key] = self._provider_retries.get(key, 0) + 1
+
+    def record_pool_rejected(self, pool: str):
+        """记录一次因服务器线程池饱和而无法处理的对话，与提供商失败分开统计"""
+        with self._lock:
+            self._pool_rejected[pool] = self._pool_rejected.get(pool, 0) + 1
+
+    def record_audio_packets(self, count: int = 1):
+        with self._lock:
+            self._audio_packets += count
+            self._packet_rate.add(count)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active_connections": len(self._connections),
+                "connections_total": self._connections_total,
+                "provider_errors": dict(self._provider_errors),
+                "provider_retries": dict(self._provider_retries),
+                "pool_rejected": dict(self._pool_rejected),
+                "audio_packets_sent": self._audio_packets,
+                "audio_packets_per_second": self._packet_rate.rate(),
+            }
+
+
+def _qsize(q) -> int:
+    try:
+        return q.qsize()
+    except Exception:
+        return 0
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class PrometheusWriter:
+    """Prometheus 文本格式（0.0.4）的简单输出"""
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def header(self, name: str, metric_type: str, help_text: str):
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, value, labels: Optional[Dict[str, Any]] = None):
+        if labels:
+            label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            name = f"{name}{{{label_str}}}"
+        if isinstance(value, float):
+            value = repr(round(value, 6))
+        self._lines.append(f"{name} {value}")
+
+    def metric(
+        self,
+        name: str,
+        metric_type: str,
+        help_text: str,
+        samples: Iterable[Tuple[Optional[Dict[str, Any]], Any]],
+    ):
+        self.header(name, metric_type, help_text)
+        for labels, value in samples:
+            self.sample(name, value, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        snapshot: Dict[str, Dict[str, Any]],
+        label: str,
+        scale: float = 1.0,
+    ):
+        """输出 HistogramSink.snapshot() 格式的直方图，scale 用于单位换算"""
+        self.header(name, "histogram", help_text)
+        for key, data in snapshot.items():
+            for bound, count in data["buckets"]:
+                self.sample(
+                    f"{name}_bucket", count, {label: key, "le": repr(round(bound * scale, 6))}
+                )
+            self.sample(f"{name}_bucket", data["count"], {label: key, "le": "+Inf"})
+            self.sample(f"{name}_sum", data["sum"] * scale, {label: key})
+            self.sample(f"{name}_count", data["count"], {label: key})
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+def render_prometheus() -> str:
+    """收集各共享服务的统计，输出 Prometheus 文本格式"""
+    from core.utils.cache.manager import cache_manager
+    from core.utils.gc_manager import get_gc_manager
+    from core.utils.latency_trace import get_latency_tracer
+    from core.utils.text_segmenter import segment_metrics
+    from core.utils.worker_pool import get_worker_pools
+
+    writer = PrometheusWriter()
+    metrics = get_server_metrics()
+    stats = metrics.stats()
+
+    # 连接
+    writer.metric(
+        "xiaozhi_active_connections",
+        "gauge",
+        "当前设备连接数",
+        [(None, stats["active_connections"])],
+    )
+    writer.metric(
+        "xiaozhi_connections_total",
+        "counter",
+        "累计设备连接数",
+        [(None, stats["connections_total"])],
+    )
+
+    # 对话各阶段延迟
+    histogram = get_latency_tracer().get_sink("histogram")
+    if histogram is not None:
+        writer.histogram(
+            "xiaozhi_turn_stage_latency_seconds",
+            "说话结束到各阶段的耗时",
+            histogram.snapshot(),
+            "stage",
+            scale=0.001,
+        )
+
+    # TTS分句：各切分原因的次数，以及第一句从开始回复到切分的等待时间
+    segments = segment_metrics.snapshot()
+    writer.metric(
+        "xiaozhi_tts_segment_cuts_total",
+        "counter",
+        "TTS分句按切分原因（punctuation/deadline_*/max_chars/max_wait/flush）的次数",
+        [
+            ({"reason": reason}, count)
+            for reason, (count, _) in sorted(segments["cuts"].items())
+        ],
+    )
+    writer.metric(
+        "xiaozhi_tts_segment_chars_total",
+        "counter",
+        "TTS分句按切分原因的累计字符数",
+        [
+            ({"reason": reason}, chars)
+            for reason, (_, chars) in sorted(segments["cuts"].items())
+        ],
+    )
+    writer.header(
+        "xiaozhi_tts_first_segment_wait_seconds", "summary", "第一句从开始回复到切分的等待时间"
+    )
+    for reason, (count, wait) in sorted(segments["first_segment"].items()):
+        labels = {"reason": reason}
+        writer.sample("xiaozhi_tts_first_segment_wait_seconds_sum", float(wait), labels)
+        writer.sample("xiaozhi_tts_first_segment_wait_seconds_count", count, labels)
+
+    # 提供商失败与重试
+    writer.metric(
+        "xiaozhi_provider_errors_total",
+        "counter",
+        "TTS/ASR/LLM提供商调用失败次数",
+        [
+            ({"kind": kind, "provider": provider}, count)
+            for (kind, provider), count in sorted(stats["provider_errors"].items())
+        ],
+    )
+    writer.metric(
+        "xiaozhi_provider_retries_total",
+        "counter",
+        "TTS/ASR/LLM提供商调用失败后的重试次数（kind=http 为共享HTTP客户端按服务地址的重试）",
+        [
+            ({"kind": kind, "provider": provider}, count)
+            for (kind, provider), count in sorted(stats["provider_retries"].items())
+        ],
+    )
+
+    writer.metric(
+        "xiaozhi_pool_rejected_total",
+        "counter",
+        "服务器线程池饱和导致无法处理的对话次数（本地过载，不计入提供商失败）",
+        [
+            ({"pool": pool}, count)
+            for pool, count in sorted(stats["pool_rejected"].items())
+        ],
+    )
+
+    # 队列深度：所有连接的总和与单个连接的最大值
+    depths = {name: [] for name, _ in CONNECTION_QUEUES}
+    for conn in metrics.active_connections():
+        for name, get_queue in CONNECTION_QUEUES:
+            try:
+                depths[name].append(_qsize(get_queue(conn)))
+            except AttributeError:
+                # 连接尚未初始化完成
+                continue
+    writer.metric(
+        "xiaozhi_queue_depth",
+        "gauge",
+        "所有连接上队列中的消息总数",
+        [({"queue": name}, sum(values)) for name, values in depths.items()],
+    )
+    writer.metric(
+        "xiaozhi_queue_depth_max",
+        "gauge",
+        "单个连接上队列中的最大消息数",
+        [({"queue": name}, max(values, default=0)) for name, values in depths.items()],
+    )
+
+    # 线程与线程池饱和度
+    writer.metric(
+        "xiaozhi_threads",
+        "gauge",
+        "进程中的线程数",
+        [(None, threading.active_count())],
+    )
+    pool_stats = get_worker_pools().stats()
+    for field, metric_type, help_text in (
+        ("max_workers", "gauge", "线程池最大线程数"),
+        ("active", "gauge", "线程池中运行中的任务数"),
+        ("queued", "gauge", "线程池中排队中的任务数"),
+        ("saturation", "gauge", "线程池饱和度（运行中任务数/最大线程数）"),
+        ("completed", "counter", "线程池累计完成的任务数"),
+        ("rejected", "counter", "线程池饱和时拒绝的任务数"),
+    ):
+        suffix = "_total" if metric_type == "counter" else ""
+        writer.metric(
+            f"xiaozhi_worker_pool_{field}{suffix}",
+            metric_type,
+            help_text,
+            [({"pool": name}, pool[field]) for name, pool in pool_stats.items()],
+        )
+
+    # 缓存命中率，按 CacheType 汇总各命名空间
+    by_type: Dict[str, List[int]] = {}
+    for cache_name, cache in cache_manager.get_stats()["caches"].items():
+        totals = by_type.setdefault(cache_name.split(":", 1)[0], [0, 0, 0, 0])
+        totals[0] += cache["hits"]
+        totals[1] += cache["misses"]
+        totals[2] += cache["evictions"]
+        totals[3] += cache["size"]
+    for index, name, metric_type, help_text in (
+        (0, "xiaozhi_cache_hits_total", "counter", "缓存命中次数"),
+        (1, "xiaozhi_cache_misses_total", "counter", "缓存未命中次数"),
+        (2, "xiaozhi_cache_evictions_total", "counter", "缓存淘汰次数"),
+        (3, "xiaozhi_cache_entries", "gauge", "缓存条目数"),
+    ):
+        writer.metric(
+            name,
+            metric_type,
+            help_text,
+            [({"cache_type": t}, v[index]) for t, v in sorted(by_type.items())],
+        )
+    writer.metric(
+        "xiaozhi_cache_hit_ratio",
+        "gauge",
+        "缓存命中率",
+        [
+            ({"cache_type": t}, v[0] / (v[0] + v[1]) if v[0] + v[1] else 0.0)
+            for t, v in sorted(by_type.items())
+        ],
+    )
+
+    # GC停顿
+    gc_manager = get_gc_manager()
+    writer.histogram(
+        "xiaozhi_gc_pause_seconds",
+        "垃圾回收停顿时间（按代）",
+        gc_manager.pause_snapshot(),
+        "generation",
+        scale=0.001,
+    )
+
+    # 音频发送
+    writer.metric(
+        "xiaozhi_audio_packets_sent_total",
+        "counter",
+        "累计发送给设备的音频包数",
+        [(None, stats["audio_packets_sent"])],
+    )
+    writer.metric(
+        "xiaozhi_audio_packets_per_second",
+        "gauge",
+        "最近统计窗口内平均每秒发送的音频包数",
+        [(None, stats["audio_packets_per_second"])],
+    )
+    return writer.render()
+
+
+# 全局单例
+_metrics_instance = None
+_metrics_lock = threading.Lock()
+
+
+def get_server_metrics(config: Optional[Dict[str, Any]] = None) -> ServerMetrics:
+    """
+    获取服务器运行指标（单例模式）
+
+    Args:
+        config: 配置字典，仅在首次创建时使用
+
+    Returns:
+        ServerMetrics实例
+    """
+    global _metrics_instance
+    with _metrics_lock:
+        if _metrics_instance is None:
+            _metrics_instance = ServerMetrics(config)
+        return _metrics_instance
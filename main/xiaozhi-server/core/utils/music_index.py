@@ -0,0 +1,419 @@
+"""
+本地音乐索引
+
+原先每次点歌都要用 difflib 与目录下的每个文件逐一比较，并且每隔 refresh_time 秒用 rglob
+重新遍历整个音乐目录，曲库达到数万首时两者都很慢。MusicIndex 为每首歌保存：
+- 规范化后的歌名（NFKC、小写、去掉标点和空白）
+- 拼音和拼音首字母（安装 pypinyin 时），用于纠正语音识别的同音字
+- 歌名二元组、拼音音节二元组、首字母二元组和单字的倒排表
+
+查询时先用倒排表取出共享片段最多的少量候选，再对候选计算相似度，不再遍历整个曲库。
+
+索引保存在 tmp/music_index 下，重启后直接加载。刷新时只比较各个目录的修改时间：
+增加、删除、重命名文件都会改变所在目录的修改时间，未变化的目录直接复用上次的文件列表，
+变化的目录只重新计算新增文件的拼音。刷新在后台线程池中进行，不阻塞点歌。
+"""
+
+import os
+import re
+import json
+import heapq
+import time
+import random
+import difflib
+import hashlib
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config.logger import setup_logging
+from core.utils.worker_pool import get_worker_pools, PoolRejectedError
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 可选依赖，未安装时只按文字匹配
+    lazy_pinyin = None
+
+TAG = __name__
+logger = setup_logging()
+
+INDEX_DIR = "tmp/music_index"
+INDEX_VERSION = 1
+DEFAULT_MUSIC_EXT = (".mp3", ".wav", ".p3")
+# 相似度低于该值视为不匹配（与原先的 difflib 阈值一致）
+DEFAULT_THRESHOLD = 0.4
+# 倒排表召回后参与相似度计算的候选数
+CANDIDATE_LIMIT = 32
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_title(text: str) -> str:
+    """规范化歌名：全角转半角、小写、去掉标点和空白"""
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def to_pinyin(title: str) -> Tuple[str, ...]:
+    """规范化歌名的拼音音节，未安装 pypinyin 时为空"""
+    if lazy_pinyin is None or not title:
+        return ()
+    return tuple(lazy_pinyin(title))
+
+
+def _initials(syllables: Tuple[str, ...]) -> str:
+    return "".join(s[0] for s in syllables if s)
+
+
+def _bigrams(items) -> List:
+    if len(items) < 2:
+        return [items] if items else []
+    return [items[i : i + 2] for i in range(len(items) - 1)]
+
+
+class _Track:
+    """索引中的一首歌"""
+
+    __slots__ = ("path", "title", "path_title", "pinyin", "initials")
+
+    def __init__(self, path: str, pinyin: Optional[Iterable[str]] = None):
+        self.path = path
+        stem = os.path.splitext(path)[0]
+        self.title = normalize_title(os.path.basename(stem))
+        # 包含子目录名（例如 周杰伦/晴天），用户可能连同歌手一起说出
+        self.path_title = normalize_title(stem)
+        self.pinyin = tuple(pinyin) if pinyin is not None else to_pinyin(self.title)
+        self.initials = _initials(self.pinyin)
+
+    def keys(self) -> set:
+        """倒排表中的片段：t 歌名二元组，p 拼音音节二元组，i 首字母二元组，u 单字"""
+        keys = {"t" + g for g in _bigrams(self.path_title)}
+        keys.update("p" + " ".join(g) for g in _bigrams(self.pinyin))
+        keys.update("i" + g for g in _bigrams(self.initials))
+        keys.update("u" + c for c in self.path_title)
+        return keys
+
+
+class _Query:
+    """规范化后的查询，与 _Track 使用相同的片段"""
+
+    def __init__(self, text: str):
+        self.title = normalize_title(text)
+        self.pinyin = to_pinyin(self.title)
+        self.pinyin_text = "".join(self.pinyin)
+        # 纯字母的查询可能是拼音首字母，例如 lzlh
+        self.maybe_initials = self.title.isascii() and self.title.isalpha()
+
+    def keys(self) -> set:
+        keys = {"t" + g for g in _bigrams(self.title)}
+        keys.update("p" + " ".join(g) for g in _bigrams(self.pinyin))
+        if self.maybe_initials:
+            keys.update("i" + g for g in _bigrams(self.title))
+        return keys
+
+    def unigram_keys(self) -> set:
+        return {"u" + c for c in self.title}
+
+    def score(self, track: _Track) -> float:
+        ratio = max(
+            difflib.SequenceMatcher(None, self.title, track.title).ratio(),
+            difflib.SequenceMatcher(None, self.title, track.path_title).ratio(),
+        )
+        if self.pinyin and track.pinyin:
+            # 同音字：拼音相同时也认为匹配
+            ratio = max(
+                ratio,
+                difflib.SequenceMatcher(
+                    None, self.pinyin_text, "".join(track.pinyin)
+                ).ratio(),
+            )
+        if self.maybe_initials and track.initials:
+            ratio = max(
+                ratio,
+                difflib.SequenceMatcher(None, self.title, track.initials).ratio(),
+            )
+        return ratio
+
+
+class MusicIndex:
+    """一个音乐目录的歌名索引"""
+
+    def __init__(
+        self,
+        music_dir: str,
+        music_ext: Iterable[str] = DEFAULT_MUSIC_EXT,
+        refresh_time: float = 60,
+        index_dir: str = INDEX_DIR,
+    ):
+        self.music_dir = os.path.abspath(music_dir)
+        self.music_ext = tuple(sorted(ext.lower() for ext in music_ext))
+        self.refresh_time = float(refresh_time)
+        digest = hashlib.md5(self.music_dir.encode("utf-8")).hexdigest()[:12]
+        self.index_path = os.path.join(index_dir, f"{digest}.json")
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # 相对目录 -> {"mtime_ns": 修改时间, "files": [文件名], "subdirs": [子目录名]}
+        self._dirs: Dict[str, Dict[str, Any]] = {}
+        self._tracks: Dict[str, _Track] = {}
+        # 片段 -> 包含该片段的歌曲路径
+        self._postings: Dict[str, set] = {}
+        self._files: List[str] = []
+        self._names: List[str] = []
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._load()
+        self.refresh()
+
+    # ---- 持久化 ----
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.bind(tag=TAG).warning(f"读取音乐索引失败，将重新建立: {e}")
+            return
+        if (
+            data.get("version") != INDEX_VERSION
+            or data.get("music_dir") != self.music_dir
+            or tuple(data.get("music_ext", ())) != self.music_ext
+            # 拼音是否可用发生变化时重新计算
+            or data.get("pinyin") != (lazy_pinyin is not None)
+        ):
+            return
+        self._dirs = data.get("dirs", {})
+        for path, pinyin in data.get("tracks", {}).items():
+            self._add_track(_Track(path, pinyin))
+        self._update_lists()
+
+    def _save(self):
+        data = {
+            "version": INDEX_VERSION,
+            "music_dir": self.music_dir,
+            "music_ext": list(self.music_ext),
+            "pinyin": lazy_pinyin is not None,
+            "dirs": self._dirs,
+            "tracks": {path: list(t.pinyin) for path, t in self._tracks.items()},
+        }
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"保存音乐索引失败: {e}")
+
+    # ---- 增量刷新 ----
+
+    def _scan_dir(self, rel_dir: str, dirs: Dict[str, Dict[str, Any]]):
+        """目录修改时间未变化时复用上次的文件列表，否则重新列出目录"""
+        path = os.path.join(self.music_dir, rel_dir) if rel_dir else self.music_dir
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        entry = self._dirs.get(rel_dir)
+        if entry is None or entry["mtime_ns"] != mtime_ns:
+            files, subdirs = [], []
+            try:
+                with os.scandir(path) as it:
+                    for item in it:
+                        if item.is_dir():
+                            subdirs.append(item.name)
+                        elif (
+                            item.is_file()
+                            and os.path.splitext(item.name)[1].lower() in self.music_ext
+                        ):
+                            files.append(item.name)
+            except OSError as e:
+                logger.bind(tag=TAG).warning(f"读取音乐目录失败: {path}, {e}")
+                return
+            entry = {"mtime_ns": mtime_ns, "files": sorted(files), "subdirs": subdirs}
+        dirs[rel_dir] = entry
+        for name in entry["subdirs"]:
+            self._scan_dir(os.path.join(rel_dir, name) if rel_dir else name, dirs)
+
+    def refresh(self) -> int:
+        """比较目录修改时间，增量更新索引，返回新增和删除的歌曲数"""
+        with self._refresh_lock:
+            self._checked_at = time.monotonic()
+            dirs: Dict[str, Dict[str, Any]] = {}
+            if os.path.isdir(self.music_dir):
+                self._scan_dir("", dirs)
+            current = {
+                os.path.join(rel_dir, name) if rel_dir else name
+                for rel_dir, entry in dirs.items()
+                for name in entry["files"]
+            }
+            added = [path for path in current if path not in self._tracks]
+            removed = [path for path in self._tracks if path not in current]
+            # 拼音在锁外计算，查询不受影响
+            new_tracks = [_Track(path) for path in added]
+            dirs_changed = dirs != self._dirs
+            with self._lock:
+                for path in removed:
+                    self._remove_track(path)
+                for track in new_tracks:
+                    self._add_track(track)
+                self._dirs = dirs
+                if added or removed:
+                    self._update_lists()
+            if dirs_changed:
+                self._save()
+            if added or removed:
+                logger.bind(tag=TAG).info(
+                    f"音乐索引已更新: 新增 {len(added)} 首，删除 {len(removed)} 首，"
+                    f"共 {len(self._tracks)} 首"
+                )
+            return len(added) + len(removed)
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"刷新音乐索引失败: {e}")
+        finally:
+            self._refreshing = False
+
+    def maybe_refresh(self):
+        """距离上次检查超过 refresh_time 秒时在后台刷新，当前查询使用现有索引"""
+        if (
+            self._refreshing
+            or time.monotonic() - self._checked_at < self.refresh_time
+        ):
+            return
+        self._refreshing = True
+        try:
+            get_worker_pools().submit("background", self._background_refresh)
+        except PoolRejectedError:
+            self._refreshing = False
+
+    def _add_track(self, track: _Track):
+        self._tracks[track.path] = track
+        postings = self._postings
+        for key in track.keys():
+            paths = postings.get(key)
+            if paths is None:
+                postings[key] = {track.path}
+            else:
+                paths.add(track.path)
+
+    def _remove_track(self, path: str):
+        track = self._tracks.pop(path, None)
+        if track is None:
+            return
+        for key in track.keys():
+            paths = self._postings.get(key)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._postings[key]
+
+    def _update_lists(self):
+        self._files = sorted(self._tracks)
+        self._names = [os.path.splitext(path)[0] for path in self._files]
+
+    # ---- 查询 ----
+
+    def _candidates(self, keys: Iterable[str], size: int, limit: int) -> List[_Track]:
+        """取出共享片段最多的候选，按共享片段数相对歌名长度排序，避免长歌名仅因片段多而占满候选"""
+        with self._lock:
+            counts = Counter()
+            for key in keys:
+                paths = self._postings.get(key)
+                if paths:
+                    counts.update(paths)
+            return [
+                self._tracks[path]
+                for path in heapq.nlargest(
+                    limit,
+                    counts,
+                    key=lambda path: counts[path]
+                    / (len(self._tracks[path].path_title) + size),
+                )
+            ]
+
+    def search(
+        self, text: str, limit: int = 5, threshold: float = DEFAULT_THRESHOLD
+    ) -> List[Tuple[str, float]]:
+        """模糊查找歌曲，返回按相似度从高到低排列的 [(相对路径, 相似度)]"""
+        self.maybe_refresh()
+        query = _Query(text)
+        if not query.title:
+            return []
+        results = []
+        # 按二元组召回没有结果时（例如未安装 pypinyin 时的同音字），退回按单字召回
+        for keys in (query.keys(), query.unigram_keys()):
+            for track in self._candidates(
+                keys, len(query.title), max(CANDIDATE_LIMIT, limit)
+            ):
+                score = query.score(track)
+                if score > threshold:
+                    results.append((track.path, score))
+            if results:
+                break
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
+
+    def best_match(
+        self, text: str, threshold: float = DEFAULT_THRESHOLD
+    ) -> Optional[str]:
+        """最匹配的歌曲相对路径，没有足够相似的歌曲时返回None"""
+        results = self.search(text, limit=1, threshold=threshold)
+        return results[0][0] if results else None
+
+    def files(self) -> List[str]:
+        """全部歌曲的相对路径"""
+        self.maybe_refresh()
+        return self._files
+
+    def names(self) -> List[str]:
+        """全部歌曲去掉扩展名的相对路径"""
+        self.maybe_refresh()
+        return self._names
+
+    def random_file(self) -> Optional[str]:
+        files = self.files()
+        return random.choice(files) if files else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "music_dir": self.music_dir,
+                "tracks": len(self._tracks),
+                "dirs": len(self._dirs),
+                "postings": len(self._postings),
+                "pinyin": lazy_pinyin is not None,
+            }
+
+
+# 全局索引，按音乐目录区分
+_index_instances: Dict[str, MusicIndex] = {}
+_index_lock = threading.Lock()
+
+
+def get_music_index(
+    music_dir: str,
+    music_ext: Iterable[str] = DEFAULT_MUSIC_EXT,
+    refresh_time: float = 60,
+) -> MusicIndex:
+    """
+    获取音乐目录的索引（每个目录一个实例）
+
+    Args:
+        music_dir: 音乐目录
+        music_ext: 音乐文件扩展名，仅在首次创建时使用
+        refresh_time: 检查目录变化的间隔（秒），仅在首次创建时使用
+
+    Returns:
+        MusicIndex实例
+    """
+    key = os.path.abspath(music_dir)
+    with _index_lock:
+        index = _index_instances.get(key)
+        if index is None:
+            index = MusicIndex(key, music_ext, refresh_time)
+            _index_instances[key] = index
+        return index
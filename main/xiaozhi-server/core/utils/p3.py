@@ -56,4 +56,20 @@ def decode_opus_from_bytes(input_bytes):
         total_frames += 1
 
     total_duration = (total_frames * frame_duration_ms) / 1000.0
-    return opus_datas, total_duration
\ No newline at end of file
+    return opus_datas, total_duration
+
+
+def decode_opus_from_file_stream(input_file, callback):
+    """
+    从p3文件中逐帧读取 Opus 数据，每读到一帧调用一次 callback，不在内存中保留整个文件。
+    """
+    with open(input_file, 'rb') as f:
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                break
+            _, _, data_len = struct.unpack('>BBH', header)
+            opus_data = f.read(data_len)
+            if len(opus_data) != data_len:
+                raise ValueError(f"Data length({len(opus_data)}) mismatch({data_len}) in the file.")
+            callback(opus_data)
@@ -0,0 +1,350 @@
+"""
+TTS流式分句器
+
+LLM逐token输出，TTS按句合成。原先每收到一个token都把整段回复重新拼接一次，再对每个标点 rfind，
+回复越长越慢（O(n²)）。分句器只保存尚未切分的文本，每次只扫描新追加的字符：
+- 第一句遇到逗号等短停顿即切分，尽快开始播放；之后按句末标点切分
+- 代码块（```）内的标点不切分，整块交给 MarkdownCleaner 一次清理
+- 可以限制单句最大长度，或在缓冲的文本超过一定时间仍未出现标点时强制切分
+- 第一句超过截止时间仍没有标点时，在空白、语气助词或连词处提前切分，尽快开始播放
+
+每次切分的原因、长度和耗时记录在 SegmentMetrics 中，并在 /metrics 中输出，用于调整切分参数。
+"""
+
+import time
+import threading
+from typing import Any, Dict, Optional, Tuple
+from config.logger import setup_logging
+from core.utils import textUtils
+
+TAG = __name__
+logger = setup_logging()
+
+# 句末标点
+PUNCTUATIONS = ("。", "？", "?", "！", "!", "；", ";", "：")
+# 第一句可以切分的标点，包含逗号等短停顿
+FIRST_SENTENCE_PUNCTUATIONS = ("，", "~", "、", ",") + PUNCTUATIONS
+
+_CODE_FENCE = "```"
+
+# 第一句提前切分时可用的软边界，优先级从高到低
+# 连词之前：从连词处开始下一句，语调最自然
+SOFT_BREAK_CONJUNCTIONS = (
+    "但是",
+    "可是",
+    "不过",
+    "所以",
+    "因为",
+    "因此",
+    "然后",
+    "而且",
+    "并且",
+    "或者",
+    "还是",
+    "如果",
+    "虽然",
+    "于是",
+)
+# 语气助词、结构助词之后
+SOFT_BREAK_PARTICLES = ("的", "了", "吗", "呢", "吧", "啊", "呀", "着", "过", "地", "得")
+
+
+class FirstSegmentPolicy:
+    """
+    第一句的提前切分策略
+
+    从一轮对话开始（SentenceType.FIRST）计时，超过 deadline_ms 仍未出现第一句的标点、
+    且已缓冲至少 min_chars 个字符时，在最合适的软边界处切分：
+    连词之前 > 空白之后 > 助词之后，同一类取最靠后的位置；都没有时整段输出。
+    deadline_ms 越小首次出声越快，但切分点越可能打断语调。
+    """
+
+    def __init__(self, min_chars: int = 0, deadline_ms: int = 0):
+        self.min_chars = int(min_chars) if min_chars else 0
+        self.deadline = int(deadline_ms) / 1000 if deadline_ms else 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.deadline > 0
+
+    def find_cut(self, text: str) -> Tuple[int, str]:
+        """在text中选择切分位置，返回 (最后一个保留字符的下标, 切分类型)"""
+        start = max(self.min_chars, 1)
+        best = -1
+        for conjunction in SOFT_BREAK_CONJUNCTIONS:
+            pos = text.rfind(conjunction)
+            # 连词之前切分，前半句至少 min_chars 个字符
+            if pos >= start and pos - 1 > best:
+                best = pos - 1
+        if best >= 0:
+            return best, "conjunction"
+
+        best = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"))
+        if best >= start - 1:
+            return best, "whitespace"
+
+        best = max(text.rfind(particle) for particle in SOFT_BREAK_PARTICLES)
+        if best >= start - 1:
+            return best, "particle"
+        return len(text) - 1, "hard"
+
+
+class SegmentMetrics:
+    """切分统计：按切分原因统计次数、平均长度和第一句的平均等待时间"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 原因 -> [次数, 总字符数]
+        self._cuts: Dict[str, list] = {}
+        # 第一句的切分原因 -> [次数, 总等待秒数]
+        self._first: Dict[str, list] = {}
+
+    def record(self, reason: str, chars: int, first_wait: Optional[float] = None):
+        with self._lock:
+            cut = self._cuts.setdefault(reason, [0, 0])
+            cut[0] += 1
+            cut[1] += chars
+            if first_wait is not None:
+                first = self._first.setdefault(reason, [0, 0.0])
+                first[0] += 1
+                first[1] += first_wait
+
+    def snapshot(self) -> Dict[str, Dict[str, Tuple[int, float]]]:
+        """累计值，用于 /metrics 输出：切分原因 -> (次数, 总字符数)，第一句的切分原因 -> (次数, 总等待秒数)"""
+        with self._lock:
+            return {
+                "cuts": {reason: tuple(v) for reason, v in self._cuts.items()},
+                "first_segment": {reason: tuple(v) for reason, v in self._first.items()},
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cuts": {
+                    reason: {"count": count, "avg_chars": round(chars / count, 1)}
+                    for reason, (count, chars) in self._cuts.items()
+                },
+                "first_segment": {
+                    reason: {
+                        "count": count,
+                        "avg_wait_ms": round(wait * 1000 / count, 1),
+                    }
+                    for reason, (count, wait) in self._first.items()
+                },
+            }
+
+
+segment_metrics = SegmentMetrics()
+
+
+class SentenceSegmenter:
+    """按标点切分流式文本，每次追加只扫描新增的字符"""
+
+    def __init__(
+        self,
+        punctuations=PUNCTUATIONS,
+        first_sentence_punctuations=FIRST_SENTENCE_PUNCTUATIONS,
+        max_chars: int = 0,
+        max_wait_ms: int = 0,
+        first_policy: Optional[FirstSegmentPolicy] = None,
+    ):
+        """
+        Args:
+            punctuations: 句末标点
+            first_sentence_punctuations: 第一句可以切分的标点
+            max_chars: 单句最大字符数，超过后在空白处或直接截断，0为不限制
+            max_wait_ms: 缓冲的文本超过该时间仍未切分时整段输出，0为不限制
+            first_policy: 第一句的提前切分策略，为空时不提前切分
+        """
+        self.punctuations = frozenset(punctuations)
+        self.first_sentence_punctuations = frozenset(first_sentence_punctuations)
+        self.max_chars = 0
+        self.max_wait = 0.0
+        self.first_policy = first_policy or FirstSegmentPolicy()
+        self.configure(max_chars=max_chars, max_wait_ms=max_wait_ms)
+        self.reset()
+
+    def configure(
+        self,
+        max_chars=None,
+        max_wait_ms=None,
+        first_min_chars=None,
+        first_deadline_ms=None,
+    ):
+        """设置切分参数，参数为None时保持不变"""
+        if max_chars is not None:
+            self.max_chars = int(max_chars) if max_chars else 0
+        if max_wait_ms is not None:
+            self.max_wait = int(max_wait_ms) / 1000 if max_wait_ms else 0.0
+        if first_min_chars is not None or first_deadline_ms is not None:
+            self.first_policy = FirstSegmentPolicy(
+                self.first_policy.min_chars
+                if first_min_chars is None
+                else first_min_chars,
+                self.first_policy.deadline * 1000
+                if first_deadline_ms is None
+                else first_deadline_ms,
+            )
+
+    def configure_from(self, config: Optional[Dict[str, Any]]):
+        """从配置字典（max_chars、max_wait_ms、first_min_chars、first_deadline_ms）读取参数"""
+        config = config or {}
+        self.configure(
+            config.get("max_chars"),
+            config.get("max_wait_ms"),
+            config.get("first_min_chars"),
+            config.get("first_deadline_ms"),
+        )
+
+    def reset(self):
+        """新一轮对话开始时调用"""
+        # 尚未切分的文本
+        self._buffer = ""
+        # _buffer 中已经扫描过、没有可切分标点的长度
+        self._scanned = 0
+        self._in_code_block = False
+        # 缓冲区从空变为非空的时间
+        self._pending_since = None
+        # 本轮对话开始的时间，第一句的截止时间从这里计算
+        self._started = time.monotonic()
+        self.is_first_sentence = True
+
+    @property
+    def pending(self) -> str:
+        """尚未切分的文本"""
+        return self._buffer
+
+    def append(self, text: str) -> Optional[str]:
+        """
+        追加一段文本，有可以输出的句子时返回去除首尾标点和表情后的句子
+
+        一次最多返回一句，剩余的句子在下次追加或 flush 时返回
+        """
+        if text:
+            if not self._buffer:
+                self._pending_since = time.monotonic()
+            self._buffer += text
+        cut = self._scan()
+        if cut >= 0:
+            return self._take(cut, "punctuation")
+        return self.poll()
+
+    def poll(self) -> Optional[str]:
+        """没有新文本时调用，超过截止时间或最长等待时间后输出已缓冲的文本"""
+        cut, reason = self._limit_cut()
+        if cut < 0:
+            return None
+        return self._take(cut, reason)
+
+    def flush(self) -> Optional[str]:
+        """输出全部剩余文本（一轮回复结束时调用）"""
+        remaining = self._buffer
+        if not remaining:
+            return None
+        self._record("flush", remaining)
+        self._buffer = ""
+        self._scanned = 0
+        self._in_code_block = False
+        self._pending_since = None
+        return textUtils.get_string_no_punctuation_or_emoji(remaining) or None
+
+    def _deadlines(self):
+        """按时间强制切分的时间点"""
+        if not self._buffer:
+            return
+        if self.is_first_sentence and self.first_policy.enabled:
+            yield self._started + self.first_policy.deadline
+        if self.max_wait and self._pending_since is not None:
+            yield self._pending_since + self.max_wait
+
+    def wait_timeout(self, default: float) -> float:
+        """距离按时间强制切分还有多久，供消费线程设置队列等待时间"""
+        now = time.monotonic()
+        deadlines = list(self._deadlines())
+        if any(deadline <= now for deadline in deadlines) and self._limit_cut()[0] >= 0:
+            return 0.01
+        # 已过截止时间但仍不能切分（文本不足或在代码块中）时，等待新文本或下一个截止时间
+        remaining = [deadline - now for deadline in deadlines if deadline > now]
+        return min(default, *remaining) if remaining else default
+
+    def _scan(self) -> int:
+        """扫描新增字符，返回切分位置（含该标点），没有时返回-1"""
+        buffer = self._buffer
+        size = len(buffer)
+        first = self.is_first_sentence
+        punctuations = (
+            self.first_sentence_punctuations if first else self.punctuations
+        )
+        cut = -1
+        i = self._scanned
+        while i < size:
+            char = buffer[i]
+            if char == "`":
+                if size - i < len(_CODE_FENCE):
+                    # 可能是尚未接收完整的代码块标记，等待后续文本
+                    break
+                if buffer.startswith(_CODE_FENCE, i):
+                    self._in_code_block = not self._in_code_block
+                    i += len(_CODE_FENCE)
+                    continue
+            elif not self._in_code_block and char in punctuations:
+                cut = i
+                if first:
+                    # 第一句在最早的停顿处切分
+                    i += 1
+                    break
+            i += 1
+        self._scanned = i
+        return cut
+
+    def _limit_cut(self) -> Tuple[int, str]:
+        """按截止时间、最大长度或等待时间强制切分，返回 (切分位置, 原因)，不需要时位置为-1"""
+        if self._in_code_block or not self._buffer:
+            return -1, ""
+        now = time.monotonic()
+        policy = self.first_policy
+        if (
+            self.is_first_sentence
+            and policy.enabled
+            and self._scanned >= max(policy.min_chars, 1)
+            and now - self._started >= policy.deadline
+        ):
+            cut, kind = policy.find_cut(self._buffer[: self._scanned])
+            return cut, f"deadline_{kind}"
+        if self.max_chars and self._scanned >= self.max_chars:
+            window = self._buffer[: self.max_chars]
+            # 优先在空白处切分，避免截断英文单词
+            space = max(window.rfind(" "), window.rfind("\n"))
+            return (space if space > 0 else self.max_chars - 1), "max_chars"
+        if (
+            self.max_wait
+            and self._pending_since is not None
+            and self._scanned > 0
+            and now - self._pending_since >= self.max_wait
+        ):
+            return self._scanned - 1, "max_wait"
+        return -1, ""
+
+    def _record(self, reason: str, segment_raw: str):
+        first_wait = None
+        if self.is_first_sentence:
+            first_wait = time.monotonic() - self._started
+            if reason.startswith("deadline_"):
+                logger.bind(tag=TAG).debug(
+                    f"第一句超过截止时间，提前切分({reason}, {first_wait * 1000:.0f}ms): {segment_raw}"
+                )
+        segment_metrics.record(reason, len(segment_raw), first_wait)
+
+    def _take(self, cut: int, reason: str) -> Optional[str]:
+        """取出 _buffer[:cut+1] 作为一句"""
+        segment_raw = self._buffer[: cut + 1]
+        self._record(reason, segment_raw)
+        self._buffer = self._buffer[cut + 1 :]
+        if self.is_first_sentence:
+            # 第一句之后改用句末标点，剩余文本需要重新扫描
+            self.is_first_sentence = False
+            self._scanned = 0
+        else:
+            self._scanned = max(0, self._scanned - len(segment_raw))
+        self._pending_since = time.monotonic() if self._buffer else None
+        return textUtils.get_string_no_punctuation_or_emoji(segment_raw) or None
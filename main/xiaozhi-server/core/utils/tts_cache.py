@@ -0,0 +1,150 @@
+"""
+语音合成结果缓存
+
+按句缓存编码后的音频帧（Opus或PCM），键由 TTS类型 + 音色等合成参数 + 输出格式 + 规范化文本 计算得到。
+问候语、"正在为您播放音乐"、工具兜底回复等高频句子命中后直接下发音频，
+不再请求TTS服务，也不再经过pydub/ffmpeg转码。
+
+- 内存层：GlobalCacheManager 的 TTS_AUDIO 缓存空间（LRU），命中率统计也在其中
+- 磁盘层（可选）：以p3格式存放在 disk_dir 下，服务重启后仍可命中
+"""
+
+import os
+import re
+import json
+import struct
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+from config.logger import setup_logging
+from core.utils import p3
+from core.utils.cache.manager import cache_manager
+from core.utils.cache.config import CacheConfig, CacheType
+from core.utils.cache.strategies import CacheStrategy
+
+TAG = __name__
+logger = setup_logging()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """规范化缓存文本：去掉首尾空白并合并连续空白"""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+class TTSAudioCache:
+    """按句缓存语音合成结果"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        cache_config = (config or {}).get("tts_cache") or {}
+        self.enabled = str(cache_config.get("enabled", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        max_entries = cache_config.get("max_entries", 500)
+        max_text_length = cache_config.get("max_text_length", 50)
+        # 过长的句子基本不会重复出现，不缓存
+        self.max_text_length = int(max_text_length) if max_text_length else 50
+        self.disk_dir = cache_config.get("disk_dir") or None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        cache_manager.configure(
+            CacheType.TTS_AUDIO,
+            CacheConfig(
+                strategy=CacheStrategy.TTL_LRU,
+                ttl=None,
+                max_size=int(max_entries) if max_entries else 500,
+            ),
+        )
+
+    def make_key(
+        self, provider: str, params: Dict[str, Any], audio_format: str, text: str
+    ) -> Optional[str]:
+        """生成缓存键，文本不适合缓存时返回None"""
+        if not self.enabled:
+            return None
+        text = normalize_text(text)
+        if not text or len(text) > self.max_text_length:
+            return None
+        raw = json.dumps(
+            [provider, params, audio_format, text],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.p3")
+
+    def get(self, key: Optional[str]) -> Optional[List[bytes]]:
+        """查询缓存，内存未命中时再查磁盘并回填内存"""
+        if key is None:
+            return None
+        frames = cache_manager.get(CacheType.TTS_AUDIO, key)
+        if frames is not None:
+            return frames
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            frames, _ = p3.decode_opus_from_file(path)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"读取TTS磁盘缓存失败: {path}, {e}")
+            return None
+        frames = tuple(frames)
+        cache_manager.set(CacheType.TTS_AUDIO, key, frames)
+        return frames
+
+    def put(self, key: Optional[str], frames: List[bytes]):
+        """写入缓存，磁盘层先写临时文件再替换，避免读到不完整的文件"""
+        if key is None or not frames:
+            return
+        frames = tuple(frames)
+        cache_manager.set(CacheType.TTS_AUDIO, key, frames)
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                for frame in frames:
+                    f.write(struct.pack(">BBH", 0, 0, len(frame)))
+                    f.write(frame)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"写入TTS磁盘缓存失败: {path}, {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+# 全局单例
+_tts_cache_instance = None
+_tts_cache_lock = threading.Lock()
+
+
+def get_tts_cache(config: Optional[Dict[str, Any]] = None) -> TTSAudioCache:
+    """
+    获取语音合成缓存（单例模式）
+
+    Args:
+        config: 配置字典，仅在首次创建时使用
+
+    Returns:
+        TTSAudioCache实例
+    """
+    global _tts_cache_instance
+    with _tts_cache_lock:
+        if _tts_cache_instance is None:
+            _tts_cache_instance = TTSAudioCache(config)
+        return _tts_cache_instance
@@ -1,18 +1,16 @@
 import re
-import os
 import json
 import copy
 import wave
 import socket
-import asyncio
-import requests
 import subprocess
 import numpy as np
 import opuslib_next
 from io import BytesIO
 from core.utils import p3
-from pydub import AudioSegment
+from core.utils.audio_decode import decode_audio_to_pcm
 from typing import Callable, Any
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 emoji_map = {
@@ -110,7 +108,7 @@ def get_ip_info(ip_addr, logger):
         if is_private_ip(ip_addr):
             ip_addr = ""
         url = f"https://whois.pconline.com.cn/ipJson.jsp?json=true&ip={ip_addr}"
-        resp = requests.get(url).json()
+        resp = get_http_clients().request("GET", url, timeout=5).json()
         ip_info = {"city": resp.get("city")}
 
         # 存入缓存
@@ -252,20 +250,8 @@ def extract_json_from_string(input_string):
 def audio_to_data_stream(
     audio_file_path, is_opus=True, callback: Callable[[Any], Any] = None
 ) -> None:
-    # 获取文件后缀名
-    file_type = os.path.splitext(audio_file_path)[1]
-    if file_type:
-        file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
+    # 解码为单声道/16kHz采样率/16位小端PCM（确保与编码器匹配）
+    raw_data = decode_audio_to_pcm(audio_file_path)
     pcm_to_data_stream(raw_data, is_opus, callback)
 
 
@@ -281,6 +267,20 @@ async def audio_to_data(
     """
     from core.utils.cache.manager import cache_manager
     from core.utils.cache.config import CacheType
+    from core.utils.asset_store import get_asset_store
+    from core.utils.worker_pool import get_worker_pools
+
+    # config/assets下的提示音直接使用预编译结果，源文件修改后自动重新编译
+    asset_store = get_asset_store()
+    if asset_store.contains(audio_file_path):
+        if asset_store.is_fresh(audio_file_path, is_opus):
+            frames = asset_store.get_frames(audio_file_path, is_opus)
+        else:
+            frames = await get_worker_pools().run(
+                "transcode", asset_store.get_frames, audio_file_path, is_opus
+            )
+        if frames is not None:
+            return list(frames)
 
     # 生成缓存键，包含文件路径和编码类型
     cache_key = f"{audio_file_path}:{is_opus}"
@@ -292,20 +292,8 @@ async def audio_to_data(
             return cached_result
 
     def _sync_audio_to_data():
-        # 获取文件后缀名
-        file_type = os.path.splitext(audio_file_path)[1]
-        if file_type:
-            file_type = file_type.lstrip(".")
-        # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-        audio = AudioSegment.from_file(
-            audio_file_path, format=file_type, parameters=["-nostdin"]
-        )
-
-        # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-        # 获取原始PCM数据（16位小端）
-        raw_data = audio.raw_data
+        # 解码为单声道/16kHz采样率/16位小端PCM（确保与编码器匹配）
+        raw_data = decode_audio_to_pcm(audio_file_path)
 
         # 初始化Opus编码器
         encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
@@ -336,9 +324,8 @@ async def audio_to_data(
 
         return datas
 
-    loop = asyncio.get_running_loop()
-    # 在单独的线程中执行同步的音频处理操作
-    result = await loop.run_in_executor(None, _sync_audio_to_data)
+    # 在转码线程池中执行同步的音频处理操作
+    result = await get_worker_pools().run("transcode", _sync_audio_to_data)
 
     # 将结果存入缓存，使用配置中定义的TTL（10分钟）
     if use_cache:
@@ -357,12 +344,8 @@ def audio_bytes_to_data_stream(
         # 直接用p3解码
         return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        raw_data = audio.raw_data
+        # 其他格式在进程内解码，无法处理时才回退到ffmpeg
+        raw_data = decode_audio_to_pcm(audio_bytes, file_type)
         pcm_to_data_stream(raw_data, is_opus, callback)
 
 
@@ -0,0 +1,170 @@
+"""
+服务器级共享线程池
+
+按用途划分为多个具名线程池，所有连接共用，线程数和排队深度都有上限：
+- llm: LLM流式对话、意图识别后的回复生成
+- inference: 本地模型推理（VAD、本地ASR）
+- transcode: 语音合成和音频文件转码
+- background: 后台任务（记忆总结、聊天记录上报、连接组件初始化）
+
+排队任务数超过上限时拒绝提交（抛出 PoolRejectedError），
+负载过高时可以按预期排队或丢弃任务，而不是无限制地创建线程。
+"""
+
+import asyncio
+import threading
+from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, Future
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_POOLS = {
+    "llm": {"max_workers": 64, "max_queue": 128},
+    "inference": {"max_workers": 4, "max_queue": 256},
+    "transcode": {"max_workers": 16, "max_queue": 256},
+    "background": {"max_workers": 8, "max_queue": 512},
+}
+
+
+class PoolRejectedError(RuntimeError):
+    """线程池已饱和，拒绝接收新任务"""
+
+    def __init__(self, message: str, pool: str = ""):
+        super().__init__(message)
+        self.pool = pool
+
+
+class WorkerPool:
+    """有界线程池，统计运行中和排队中的任务数，超过上限时拒绝提交"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: Optional[int]):
+        self.name = name
+        self.max_workers = int(max_workers)
+        # max_queue为None表示不限制排队数
+        self.max_queue = None if max_queue is None else int(max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=f"pool-{name}"
+        )
+        self._lock = threading.Lock()
+        self._active = 0
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _run(self, fn, args, kwargs):
+        with self._lock:
+            self._active += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _on_done(self, future: Future):
+        # 排队中被取消的任务不会执行_run，在完成回调中释放名额才不会泄漏
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self._completed += 1
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if (
+                self.max_queue is not None
+                and self._pending >= self.max_workers + self.max_queue
+            ):
+                self._rejected += 1
+                raise PoolRejectedError(
+                    f"线程池 {self.name} 已饱和: 运行中 {self._active}, 排队 {self._pending - self._active}",
+                    self.name,
+                )
+            self._pending += 1
+        try:
+            future = self._executor.submit(self._run, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = self._pending - self._active
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "saturation": self._active / self.max_workers,
+            }
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class WorkerPoolService:
+    """服务器级线程池集合，由WebSocketServer持有"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        pool_config = (config or {}).get("worker_pools") or {}
+        self._pools: Dict[str, WorkerPool] = {}
+        for name, defaults in DEFAULT_POOLS.items():
+            conf = {**defaults, **(pool_config.get(name) or {})}
+            self._pools[name] = WorkerPool(name, conf["max_workers"], conf["max_queue"])
+
+    def get(self, name: str) -> WorkerPool:
+        if name not in self._pools:
+            raise ValueError(f"不存在的线程池: {name}")
+        return self._pools[name]
+
+    def submit(self, name: str, fn, *args, **kwargs) -> Future:
+        """提交任务，线程池饱和时抛出 PoolRejectedError"""
+        try:
+            return self.get(name).submit(fn, *args, **kwargs)
+        except PoolRejectedError as e:
+            logger.bind(tag=TAG).warning(str(e))
+            raise
+
+    async def run(self, name: str, fn, *args, **kwargs):
+        """在指定线程池中执行阻塞函数并等待结果"""
+        return await asyncio.wrap_future(self.submit(name, fn, *args, **kwargs))
+
+    def is_saturated(self, name: str) -> bool:
+        stats = self.get(name).stats()
+        if stats["max_queue"] is None:
+            return False
+        return stats["queued"] >= stats["max_queue"]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+    def shutdown(self, wait=False):
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
+
+
+# 全局单例
+_worker_pools_instance = None
+_worker_pools_lock = threading.Lock()
+
+
+def get_worker_pools(config: Optional[Dict[str, Any]] = None) -> WorkerPoolService:
+    """
+    获取服务器级线程池集合（单例模式）
+
+    Args:
+        config: 配置字典，仅在首次创建时使用
+
+    Returns:
+        WorkerPoolService实例
+    """
+    global _worker_pools_instance
+    with _worker_pools_lock:
+        if _worker_pools_instance is None:
+            _worker_pools_instance = WorkerPoolService(config)
+        return _worker_pools_instance
@@ -0,0 +1,255 @@
+"""
+上游TTS WebSocket连接池
+
+双流式TTS（火山双流、阿里云流式等）每次建立连接都要经过 DNS + TCP + TLS + 鉴权 几次往返，
+首句延迟里有相当一部分花在这里。连接池按 提供商+服务地址+账号 区分，进程内所有设备共用：
+- 设备会话开始时租用一个已建立、已鉴权的连接，结束后归还，供下一个会话或其他设备复用
+- 连接在池中空闲超过 idle_timeout 后关闭；后台定期 ping 空闲连接，失效的连接直接丢弃
+- 设备接入时可以预热，后台提前建立 min_idle 个连接，用户开口时不用再等握手
+
+连接只在事件循环线程中使用，与 websockets 的连接对象绑定在同一个事件循环上。
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from websockets.protocol import State
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 后台巡检空闲连接的间隔（秒）
+_REAP_INTERVAL = 5
+# 健康检查ping的超时时间（秒）
+_PING_TIMEOUT = 3
+
+# 连接分组：(提供商名称, 服务地址, 账号标识, ...)
+PoolKey = Tuple[Any, ...]
+
+
+class _PoolEntry:
+    """同一个 提供商配置 下的空闲连接"""
+
+    def __init__(self, connect: Callable[[], Awaitable[Any]], idle_timeout: float):
+        self.connect = connect
+        self.idle_timeout = idle_timeout
+        self.idle: Deque[Tuple[Any, float]] = deque()
+        self.filling = False
+        self.leased = 0
+
+
+class WebSocketPool:
+    """按提供商配置分组的WebSocket连接池"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        pool_config = (config or {}).get("tts_ws_pool") or {}
+        self.enabled = str(pool_config.get("enabled", True)).lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        min_idle = pool_config.get("min_idle", 1)
+        max_idle = pool_config.get("max_idle", 4)
+        idle_timeout = pool_config.get("idle_timeout", 60)
+        self.min_idle = int(min_idle) if min_idle is not None else 1
+        self.max_idle = int(max_idle) if max_idle else 4
+        self.idle_timeout = float(idle_timeout) if idle_timeout else 60
+        self._entries: Dict[PoolKey, _PoolEntry] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    def _entry(
+        self, key: PoolKey, connect: Callable[[], Awaitable[Any]], idle_timeout=None
+    ) -> _PoolEntry:
+        """获取分组，连接函数总是更新为最新的一份（例如token刷新后）"""
+        timeout = min(self.idle_timeout, idle_timeout or self.idle_timeout)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PoolEntry(connect, timeout)
+            self._entries[key] = entry
+        else:
+            entry.connect = connect
+            entry.idle_timeout = timeout
+        return entry
+
+    @staticmethod
+    def _is_open(ws) -> bool:
+        return getattr(ws, "state", None) is State.OPEN
+
+    async def _close(self, ws):
+        self._discarded += 1
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    def _ensure_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def acquire(
+        self,
+        key: PoolKey,
+        connect: Callable[[], Awaitable[Any]],
+        idle_timeout: Optional[float] = None,
+    ):
+        """
+        租用一个连接：优先取池中未过期且仍处于打开状态的连接，没有则新建
+
+        Args:
+            key: 连接分组，第一个元素为提供商名称，相同key的连接可以互换使用
+            connect: 建立新连接的协程函数
+            idle_timeout: 服务端的空闲断开时间，比池配置更短时以它为准
+        """
+        if not self.enabled:
+            return await connect()
+
+        entry = self._entry(key, connect, idle_timeout)
+        now = time.monotonic()
+        ws = None
+        while entry.idle:
+            candidate, since = entry.idle.pop()
+            if self._is_open(candidate) and now - since < entry.idle_timeout:
+                ws = candidate
+                break
+            await self._close(candidate)
+
+        if ws is None:
+            ws = await connect()
+            self._created += 1
+        else:
+            self._reused += 1
+            logger.bind(tag=TAG).debug(f"复用预建立的TTS连接: {key[0]}")
+        entry.leased += 1
+        # 被取走的连接由后台补足
+        self._schedule_fill(key, entry)
+        return ws
+
+    async def release(self, key: PoolKey, ws, reusable: bool = True):
+        """
+        归还连接。会话仍在进行、连接已断开或空闲连接已满时直接关闭
+
+        Args:
+            reusable: 连接上是否没有未完成的会话，可以交给下一个会话使用
+        """
+        if ws is None:
+            return
+        entry = self._entries.get(key)
+        if entry is not None and entry.leased > 0:
+            entry.leased -= 1
+        if (
+            not self.enabled
+            or entry is None
+            or not reusable
+            or not self._is_open(ws)
+            or len(entry.idle) >= self.max_idle
+        ):
+            await self._close(ws)
+            return
+        entry.idle.append((ws, time.monotonic()))
+        self._ensure_reaper()
+
+    def prewarm(
+        self,
+        key: PoolKey,
+        connect: Callable[[], Awaitable[Any]],
+        idle_timeout: Optional[float] = None,
+    ):
+        """设备接入时调用，在后台提前建立连接，不阻塞调用方"""
+        if not self.enabled or self.min_idle <= 0:
+            return
+        self._schedule_fill(key, self._entry(key, connect, idle_timeout))
+
+    def _schedule_fill(self, key: PoolKey, entry: _PoolEntry):
+        if self.min_idle <= 0 or entry.filling or len(entry.idle) >= self.min_idle:
+            return
+        entry.filling = True
+        asyncio.create_task(self._fill(key, entry))
+
+    async def _fill(self, key: PoolKey, entry: _PoolEntry):
+        try:
+            while len(entry.idle) < self.min_idle:
+                ws = await entry.connect()
+                self._created += 1
+                entry.idle.append((ws, time.monotonic()))
+            logger.bind(tag=TAG).debug(f"TTS连接预热完成: {key[0]}")
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"TTS连接预热失败: {key[0]}, {e}")
+        finally:
+            entry.filling = False
+        self._ensure_reaper()
+
+    async def _check(self, ws) -> bool:
+        """ping空闲连接，确认对端仍可用"""
+        if not self._is_open(ws):
+            return False
+        try:
+            pong = await ws.ping()
+            await asyncio.wait_for(pong, _PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    async def _reap_loop(self):
+        """关闭过期或失效的空闲连接，池中没有空闲连接后退出"""
+        while any(entry.idle for entry in self._entries.values()):
+            await asyncio.sleep(_REAP_INTERVAL)
+            now = time.monotonic()
+            for entry in list(self._entries.values()):
+                dead = []
+                for ws, since in list(entry.idle):
+                    if now - since >= entry.idle_timeout or not await self._check(ws):
+                        dead.append(ws)
+                # 检查期间可能有连接被租走，只关闭仍在空闲队列中的
+                for item in [item for item in entry.idle if item[0] in dead]:
+                    entry.idle.remove(item)
+                    await self._close(item[0])
+
+    async def close_all(self):
+        """关闭池中全部空闲连接"""
+        for entry in self._entries.values():
+            while entry.idle:
+                ws, _ = entry.idle.pop()
+                await self._close(ws)
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计：新建、复用、丢弃次数及各分组的空闲/租用数"""
+        return {
+            "created": self._created,
+            "reused": self._reused,
+            "discarded": self._discarded,
+            "pools": {
+                " ".join(str(k) for k in key[:2]): {
+                    "idle": len(entry.idle),
+                    "leased": entry.leased,
+                }
+                for key, entry in self._entries.items()
+            },
+        }
+
+
+# 全局单例
+_ws_pool_instance = None
+_ws_pool_lock = threading.Lock()
+
+
+def get_ws_pool(config: Optional[Dict[str, Any]] = None) -> WebSocketPool:
+    """
+    获取上游TTS WebSocket连接池（单例模式）
+
+    Args:
+        config: 配置字典，仅在首次创建时使用
+
+    Returns:
+        WebSocketPool实例
+    """
+    global _ws_pool_instance
+    with _ws_pool_lock:
+        if _ws_pool_instance is None:
+            _ws_pool_instance = WebSocketPool(config)
+        return _ws_pool_instance
@@ -34,6 +34,14 @@ from core.connection import ConnectionHandler
 from config.config_loader import get_config_from_api_async
 from core.auth import AuthManager, AuthenticationError
 from core.utils.modules_initialize import initialize_modules
+from core.utils.worker_pool import get_worker_pools
+from core.utils.tts_cache import get_tts_cache
+from core.utils.intent_cache import get_intent_cache
+from core.utils.ws_pool import get_ws_pool
+from core.utils.http_client import get_http_clients
+from core.utils.latency_trace import get_latency_tracer
+from core.utils.metrics import get_server_metrics
+from core.utils.asset_store import get_asset_store
 from core.utils.util import check_vad_update, check_asr_update
 
 TAG = __name__
@@ -44,6 +52,22 @@ class WebSocketServer:
         self.config = config
         self.logger = setup_logging()
         self.config_lock = asyncio.Lock()
+        # 服务器级共享线程池，所有连接共用
+        self.worker_pools = get_worker_pools(self.config)
+        # 语音合成结果缓存，所有连接共用
+        self.tts_cache = get_tts_cache(self.config)
+        # 意图识别结果缓存，与设备无关的意图在所有连接之间共享
+        self.intent_cache = get_intent_cache(self.config)
+        # 上游TTS WebSocket连接池，所有连接共用
+        self.ws_pool = get_ws_pool(self.config)
+        # 按服务地址共享的HTTP连接池，所有连接共用
+        self.http_clients = get_http_clients(self.config)
+        # 对话轮次延迟追踪
+        self.latency_tracer = get_latency_tracer(self.config)
+        # 运行指标，由HTTP服务的 /metrics 接口输出
+        self.metrics = get_server_metrics(self.config)
+        # 后台预编译config/assets下的提示音
+        self.worker_pools.submit("background", get_asset_store().compile_all)
         modules = initialize_modules(
             self.logger,
             self.config,
@@ -123,11 +147,13 @@ class WebSocketServer:
             self._intent,
             self,  # 传入server实例
         )
+        self.metrics.connection_opened(handler)
         try:
             await handler.handle_connection(websocket)
         except Exception as e:
             self.logger.bind(tag=TAG).error(f"处理连接时出错: {e}")
         finally:
+            self.metrics.connection_closed(handler)
             # 强制关闭连接（如果还没有关闭的话）
             try:
                 # 安全地检查WebSocket状态并关闭
@@ -143,6 +169,10 @@ class WebSocketServer:
                     f"服务器端强制关闭连接时出错: {close_error}"
                 )
 
+    def get_pool_stats(self):
+        """获取各线程池的饱和度统计"""
+        return self.worker_pools.stats()
+
     async def _http_response(self, websocket, request_headers):
         # 检查是否为 WebSocket 升级请求
         if request_headers.headers.get("connection", "").lower() == "upgrade":
@@ -0,0 +1,471 @@
+"""
+WebSocket服务端并发压测
+
+其他性能测试工具只测单个提供商接口的首包延迟，这里模拟多台ESP32设备同时连接服务端，
+测试整条对话链路（连接、VAD、ASR、LLM、TTS、音频下发）在并发下的表现：
+- 每个会话完成 hello 握手，按60ms实时节奏发送预先录制的Opus语音，或直接发送识别文本
+- 支持自动拾音（auto，依赖服务端VAD判断说话结束）和手动拾音（manual，发送 listen stop）
+- 统计 STT到首个音频包、说话结束到首个音频包的延迟、音频包到达间隔的抖动、打断延迟
+- 统计连接失败、握手超时、对话超时等错误
+
+示例：
+python performance_tester/performance_tester_ws_load.py --sessions 200 --ramp 20 --audio test.wav
+python performance_tester/performance_tester_ws_load.py --sessions 50 --text 你好 --abort-after 1000
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional
+import websockets
+from tabulate import tabulate
+
+description = "WebSocket服务端并发压测（模拟多台设备）"
+
+# 设备音频参数，与服务端 xiaozhi.audio_params 一致
+SAMPLE_RATE = 16000
+FRAME_DURATION = 60
+FRAME_SIZE = SAMPLE_RATE * FRAME_DURATION // 1000
+# 服务端开始播放时直接发送的预缓冲包数，这些包的到达间隔不计入抖动
+PRE_BUFFER_COUNT = 5
+# 没有指定语音和文本时发送的识别文本
+DEFAULT_TEXT = "你好，今天天气怎么样"
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """最近秩法计算百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def load_utterances(paths: List[str]) -> List[List[bytes]]:
+    """把音频文件编码为60ms一帧的Opus包，每个文件作为一句话"""
+    # 只在发送语音时需要，文本模式下不依赖服务端的音频工具
+    from core.utils.util import audio_to_data_stream
+
+    utterances = []
+    for path in paths:
+        frames: List[bytes] = []
+        audio_to_data_stream(path, is_opus=True, callback=frames.append)
+        if frames:
+            utterances.append(frames)
+            print(f"已加载语音: {path}，{len(frames)} 帧，{len(frames) * FRAME_DURATION / 1000:.1f}秒")
+    return utterances
+
+
+def silence_frame() -> bytes:
+    """编码一帧静音，自动拾音模式下说完话后持续发送，供服务端VAD判断说话结束"""
+    import opuslib_next
+
+    encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO)
+    return encoder.encode(b"\x00" * FRAME_SIZE * 2, FRAME_SIZE)
+
+
+class LoadReport:
+    """汇总所有会话的测量结果"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {
+            "stt_to_first_audio": [],
+            "speech_end_to_first_audio": [],
+            "packet_jitter": [],
+            "abort_to_tts_stop": [],
+            "abort_to_last_audio": [],
+        }
+        self.errors: Counter = Counter()
+        self.sessions = 0
+        self.connected = 0
+        self.turns = 0
+        self.turns_completed = 0
+        self.audio_packets = 0
+
+    def add(self, metric: str, value_ms: float):
+        self.latencies[metric].append(value_ms)
+
+    def error(self, reason: str):
+        self.errors[reason] += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            "sessions": self.sessions,
+            "connected": self.connected,
+            "turns": self.turns,
+            "turns_completed": self.turns_completed,
+            "audio_packets": self.audio_packets,
+            "errors": dict(self.errors),
+            "latencies_ms": self.latencies,
+        }
+
+    def print(self, elapsed: float):
+        print(f"\n{'=' * 60}")
+        print("WebSocket服务端并发压测结果")
+        print(f"{'=' * 60}")
+        print(
+            tabulate(
+                [
+                    ["会话数", self.sessions],
+                    ["连接成功", self.connected],
+                    ["对话轮数", self.turns],
+                    ["完成轮数", self.turns_completed],
+                    ["收到音频包", self.audio_packets],
+                    ["测试耗时", f"{elapsed:.1f}s"],
+                ],
+                tablefmt="grid",
+            )
+        )
+
+        names = {
+            "stt_to_first_audio": "STT到首个音频包",
+            "speech_end_to_first_audio": "说话结束到首个音频包",
+            "packet_jitter": "音频包间隔抖动",
+            "abort_to_tts_stop": "打断到TTS停止",
+            "abort_to_last_audio": "打断到最后一个音频包",
+        }
+        rows = []
+        for metric, values in self.latencies.items():
+            if not values:
+                continue
+            row = [names[metric], len(values)]
+            for p in (50, 90, 95, 99):
+                row.append(f"{percentile(values, p):.0f}")
+            row.append(f"{max(values):.0f}")
+            rows.append(row)
+        if rows:
+            print(
+                tabulate(
+                    rows,
+                    headers=["指标（毫秒）", "样本数", "P50", "P90", "P95", "P99", "最大"],
+                    tablefmt="grid",
+                )
+            )
+
+        if self.errors:
+            print(
+                tabulate(
+                    sorted(self.errors.items(), key=lambda x: -x[1]),
+                    headers=["错误", "次数"],
+                    tablefmt="grid",
+                )
+            )
+        print("\n测试说明：")
+        print("- 音频包间隔抖动：相邻音频包到达间隔与60ms之差的绝对值，不含开头的预缓冲包")
+        print("- 说话结束：发送最后一帧语音（手动拾音时为发送listen stop，文本模式为发送识别文本）的时间")
+        print("- 打断延迟：收到首个音频包后等待 --abort-after 毫秒发送abort，到收到TTS停止消息的时间")
+
+
+class _Turn:
+    """一轮对话的状态，由接收协程更新"""
+
+    def __init__(self):
+        self.speech_end: Optional[float] = None
+        self.stt_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+        self.last_audio_at: Optional[float] = None
+        self.abort_at: Optional[float] = None
+        self.packets = 0
+        self.stt_received = asyncio.Event()
+        self.first_audio = asyncio.Event()
+        self.stopped = asyncio.Event()
+
+
+class DeviceSession:
+    """模拟一台设备的WebSocket会话"""
+
+    def __init__(self, index: int, args, utterances, silence, report: LoadReport):
+        self.index = index
+        self.args = args
+        self.utterances = utterances
+        self.silence = silence
+        self.report = report
+        # 形如MAC地址的设备ID，同一次压测中各不相同
+        self.device_id = "02:%02x:%02x:%02x:%02x:%02x" % (
+            (args.device_seed >> 8) & 0xFF,
+            args.device_seed & 0xFF,
+            (index >> 16) & 0xFF,
+            (index >> 8) & 0xFF,
+            index & 0xFF,
+        )
+        self.ws = None
+        self.reader: Optional[asyncio.Task] = None
+        self.turn: Optional[_Turn] = None
+        self.hello = asyncio.Event()
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {
+            "device-id": self.device_id,
+            "client-id": str(uuid.uuid4()),
+            "protocol-version": "1",
+        }
+        if self.args.token:
+            headers["authorization"] = f"Bearer {self.args.token}"
+        return headers
+
+    async def run(self):
+        self.report.sessions += 1
+        try:
+            self.ws = await asyncio.wait_for(
+                websockets.connect(
+                    self.args.url,
+                    additional_headers=self._headers(),
+                    max_size=None,
+                    open_timeout=self.args.timeout,
+                ),
+                self.args.timeout,
+            )
+        except asyncio.TimeoutError:
+            self.report.error("connect_timeout")
+            return
+        except Exception as e:
+            self.report.error(f"connect_failed: {type(e).__name__}")
+            return
+
+        self.reader = asyncio.create_task(self._read())
+        try:
+            await self._send_json(
+                {
+                    "type": "hello",
+                    "version": 1,
+                    "transport": "websocket",
+                    "audio_params": {
+                        "format": "opus",
+                        "sample_rate": SAMPLE_RATE,
+                        "channels": 1,
+                        "frame_duration": FRAME_DURATION,
+                    },
+                }
+            )
+            try:
+                await asyncio.wait_for(self.hello.wait(), self.args.timeout)
+            except asyncio.TimeoutError:
+                self.report.error("hello_timeout")
+                return
+            self.report.connected += 1
+
+            for turn_index in range(self.args.turns):
+                if self.reader.done():
+                    self.report.error("connection_closed")
+                    return
+                await self._run_turn(turn_index)
+                await asyncio.sleep(self.args.think_time)
+        except websockets.ConnectionClosed:
+            self.report.error("connection_closed")
+        except Exception as e:
+            self.report.error(f"session_error: {type(e).__name__}")
+        finally:
+            self.reader.cancel()
+            try:
+                await self.ws.close()
+            except Exception:
+                pass
+
+    async def _send_json(self, message: Dict):
+        await self.ws.send(json.dumps(message, ensure_ascii=False))
+
+    async def _read(self):
+        try:
+            async for message in self.ws:
+                now = time.monotonic()
+                if isinstance(message, bytes):
+                    self._on_audio(now)
+                    continue
+                try:
+                    msg = json.loads(message)
+                except ValueError:
+                    continue
+                msg_type = msg.get("type")
+                if msg_type == "hello":
+                    self.hello.set()
+                elif self.turn is None:
+                    continue
+                elif msg_type == "stt":
+                    if self.turn.stt_at is None:
+                        self.turn.stt_at = now
+                    self.turn.stt_received.set()
+                elif msg_type == "tts" and msg.get("state") == "stop":
+                    self._on_tts_stop(now)
+        except websockets.ConnectionClosed:
+            pass
+
+    def _on_audio(self, now: float):
+        self.report.audio_packets += 1
+        turn = self.turn
+        if turn is None:
+            return
+        if turn.abort_at is not None:
+            # 打断后仍然到达的音频包，用于统计打断到最后一个音频包的时间
+            turn.last_audio_at = now
+            return
+        if turn.stopped.is_set():
+            return
+        turn.packets += 1
+        if turn.first_audio_at is None:
+            turn.first_audio_at = now
+            turn.first_audio.set()
+        elif turn.packets > PRE_BUFFER_COUNT + 1:
+            interval = (now - turn.last_audio_at) * 1000
+            self.report.add("packet_jitter", abs(interval - FRAME_DURATION))
+        turn.last_audio_at = now
+
+    def _on_tts_stop(self, now: float):
+        turn = self.turn
+        # 打断时服务端先回复stop，之后仍可能有已经发出的音频包，在 _run_turn 中稍后统计
+        if turn.abort_at is not None and not turn.stopped.is_set():
+            self.report.add("abort_to_tts_stop", (now - turn.abort_at) * 1000)
+        # 收到音频后的stop才是本轮回复结束，此前的stop属于上一轮或提示音
+        if turn.first_audio_at is not None or turn.abort_at is not None:
+            turn.stopped.set()
+
+    def _timeout(self, reason: str):
+        # 等待期间服务端断开连接时按断开统计
+        self.report.error("connection_closed" if self.reader.done() else reason)
+
+    async def _send_frames(self, frames: List[bytes], stop: Optional[asyncio.Event] = None):
+        """按实时节奏发送音频帧，stop被设置时提前结束"""
+        start = time.monotonic()
+        for i, frame in enumerate(frames):
+            if stop is not None and stop.is_set():
+                return
+            delay = start + i * FRAME_DURATION / 1000 - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.ws.send(frame)
+
+    async def _speak(self, turn: _Turn, turn_index: int):
+        args = self.args
+        if args.text:
+            await self._send_json(
+                {"type": "listen", "state": "detect", "text": random.choice(args.text)}
+            )
+            turn.speech_end = time.monotonic()
+            return
+
+        utterance = self.utterances[(self.index + turn_index) % len(self.utterances)]
+        await self._send_json({"type": "listen", "state": "start", "mode": args.mode})
+        await self._send_frames(utterance)
+        turn.speech_end = time.monotonic()
+        if args.mode == "manual":
+            await self._send_json({"type": "listen", "state": "stop"})
+        else:
+            # 自动拾音：持续发送静音，直到服务端识别出结果或超过静音时长
+            count = max(1, args.silence_ms // FRAME_DURATION)
+            await self._send_frames([self.silence] * count, turn.stt_received)
+
+    async def _run_turn(self, turn_index: int):
+        turn = _Turn()
+        self.turn = turn
+        self.report.turns += 1
+        await self._speak(turn, turn_index)
+
+        try:
+            await asyncio.wait_for(turn.first_audio.wait(), self.args.timeout)
+        except asyncio.TimeoutError:
+            self._timeout("no_audio_timeout" if turn.stt_at else "no_stt_timeout")
+            return
+        if turn.stt_at is not None:
+            self.report.add(
+                "stt_to_first_audio", (turn.first_audio_at - turn.stt_at) * 1000
+            )
+        self.report.add(
+            "speech_end_to_first_audio", (turn.first_audio_at - turn.speech_end) * 1000
+        )
+
+        if self.args.abort_after is not None:
+            await asyncio.sleep(self.args.abort_after / 1000)
+            if not turn.stopped.is_set():
+                turn.abort_at = time.monotonic()
+                await self._send_json({"type": "abort"})
+
+        try:
+            await asyncio.wait_for(turn.stopped.wait(), self.args.turn_timeout)
+        except asyncio.TimeoutError:
+            self._timeout("tts_stop_timeout")
+            return
+        if turn.abort_at is not None:
+            # 等待已经在途的音频包
+            await asyncio.sleep(self.args.drain_ms / 1000)
+            if turn.last_audio_at is not None and turn.last_audio_at > turn.abort_at:
+                self.report.add(
+                    "abort_to_last_audio", (turn.last_audio_at - turn.abort_at) * 1000
+                )
+        self.report.turns_completed += 1
+
+
+async def run_load(args) -> LoadReport:
+    utterances = []
+    silence = None
+    if not args.text and not args.audio:
+        print(f"未指定 --audio 或 --text，使用识别文本: {DEFAULT_TEXT}")
+        args.text = [DEFAULT_TEXT]
+    if not args.text:
+        utterances = load_utterances(args.audio)
+        if not utterances:
+            raise ValueError("没有可发送的语音，请检查 --audio 指定的音频文件")
+        if args.mode == "auto":
+            silence = silence_frame()
+
+    report = LoadReport()
+    sessions = [
+        DeviceSession(i, args, utterances, silence, report) for i in range(args.sessions)
+    ]
+
+    async def start(session: DeviceSession):
+        # 在 ramp 秒内均匀地建立连接，避免瞬间的握手风暴掩盖稳态表现
+        if args.ramp > 0:
+            await asyncio.sleep(args.ramp * session.index / args.sessions)
+        await session.run()
+
+    print(
+        f"开始压测: {args.url}，{args.sessions} 个会话，每个会话 {args.turns} 轮，"
+        f"{'文本' if args.text else args.mode + '拾音'}模式"
+    )
+    started = time.monotonic()
+    await asyncio.gather(*(start(s) for s in sessions))
+    report.print(time.monotonic() - started)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False)
+        print(f"原始结果已写入: {args.output}")
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="WebSocket服务端并发压测")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/xiaozhi/v1/", help="服务端WebSocket地址")
+    parser.add_argument("--sessions", type=int, default=10, help="并发会话数")
+    parser.add_argument("--ramp", type=float, default=5, help="在多少秒内建立全部连接")
+    parser.add_argument("--turns", type=int, default=3, help="每个会话的对话轮数")
+    parser.add_argument("--think-time", type=float, default=1.0, help="两轮对话之间的间隔（秒）")
+    parser.add_argument("--audio", nargs="*", default=[], help="语音文件（wav/mp3/pcm等），每个文件作为一句话轮流发送")
+    parser.add_argument("--text", nargs="*", help="不发送语音，直接发送识别文本（跳过VAD和ASR）")
+    parser.add_argument("--mode", choices=["auto", "manual"], default="auto", help="拾音模式")
+    parser.add_argument("--silence-ms", type=int, default=1500, help="自动拾音模式下说完话后最多发送的静音时长")
+    parser.add_argument("--abort-after", type=int, default=None, help="收到首个音频包后多少毫秒发送打断，不设置则不打断")
+    parser.add_argument("--drain-ms", type=int, default=500, help="打断后等待在途音频包的时长")
+    parser.add_argument("--timeout", type=float, default=15, help="连接、握手和等待首个音频包的超时（秒）")
+    parser.add_argument("--turn-timeout", type=float, default=120, help="等待一轮回复播放结束的超时（秒）")
+    parser.add_argument("--token", default=None, help="开启认证时使用的token")
+    parser.add_argument("--device-seed", type=int, default=random.randrange(1 << 16), help="设备ID前缀，用于区分多次压测")
+    parser.add_argument("--output", default=None, help="把原始测量结果写入JSON文件")
+    return parser.parse_args(argv)
+
+
+async def main():
+    # 通过 performance_tester.py 菜单调用时不解析菜单脚本的命令行参数
+    args = parse_args(None if __name__ == "__main__" else [])
+    await run_load(args)
+
+
+if __name__ == "__main__":
+    # 直接运行时从 xiaozhi-server 目录导入服务端的音频工具
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    asyncio.run(main())
@@ -1,9 +1,9 @@
 import random
-import requests
 import xml.etree.ElementTree as ET
 from bs4 import BeautifulSoup
 from config.logger import setup_logging
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -43,7 +43,7 @@ GET_NEWS_FROM_CHINANEWS_FUNCTION_DESC = {
 def fetch_news_from_rss(rss_url):
     """从RSS源获取新闻列表"""
     try:
-        response = requests.get(rss_url)
+        response = get_http_clients().request("GET", rss_url)
         response.raise_for_status()
 
         # 解析XML
@@ -85,7 +85,7 @@ def fetch_news_from_rss(rss_url):
 def fetch_news_detail(url):
     """获取新闻详情页内容并总结"""
     try:
-        response = requests.get(url)
+        response = get_http_clients().request("GET", url)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.content, "html.parser")
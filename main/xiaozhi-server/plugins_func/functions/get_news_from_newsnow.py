@@ -1,9 +1,9 @@
 import random
-import requests
 import json
 from config.logger import setup_logging
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from markitdown import MarkItDown
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -126,7 +126,7 @@ def fetch_news_from_api(conn, source="thepaper"):
             api_url = conn.config["plugins"]["get_news_from_newsnow"]["url"] + source
 
         headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(api_url, headers=headers, timeout=10)
+        response = get_http_clients().request("GET", api_url, headers=headers, timeout=10)
         response.raise_for_status()
 
         data = response.json()
@@ -146,7 +146,7 @@ def fetch_news_detail(url):
     """获取新闻详情页内容并使用MarkItDown清理HTML"""
     try:
         headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = get_http_clients().request("GET", url, headers=headers, timeout=10)
         response.raise_for_status()
 
         # 使用MarkItDown清理HTML内容
@@ -1,8 +1,8 @@
-import requests
 from bs4 import BeautifulSoup
 from config.logger import setup_logging
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from core.utils.util import get_ip_info
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -109,7 +109,7 @@ WEATHER_CODE_MAP = {
 
 def fetch_city_info(location, api_key, api_host):
     url = f"https://{api_host}/geo/v2/city/lookup?key={api_key}&location={location}&lang=zh"
-    response = requests.get(url, headers=HEADERS).json()
+    response = get_http_clients().request("GET", url, headers=HEADERS).json()
     if response.get("error") is not None:
         logger.bind(tag=TAG).error(
             f"Failed to retrieve weather information，reason：{response.get('error', {}).get('detail')}"
@@ -119,8 +119,8 @@ def fetch_city_info(location, api_key, api_host):
 
 
 def fetch_weather_page(url):
-    response = requests.get(url, headers=HEADERS)
-    return BeautifulSoup(response.text, "html.parser") if response.ok else None
+    response = get_http_clients().request("GET", url, headers=HEADERS)
+    return BeautifulSoup(response.text, "html.parser") if response.is_success else None
 
 
 def parse_weather_info(soup):
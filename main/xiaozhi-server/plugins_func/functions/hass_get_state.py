@@ -2,7 +2,7 @@ from plugins_func.register import register_function, ToolType, ActionResponse, A
 from plugins_func.functions.hass_init import initialize_hass_handler
 from config.logger import setup_logging
 import asyncio
-import requests
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -46,7 +46,7 @@ def handle_hass_get_state(conn, entity_id):
     base_url = ha_config.get("base_url")
     url = f"{base_url}/api/states/{entity_id}"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    response = requests.get(url, headers=headers, timeout=5)
+    response = get_http_clients().request("GET", url, headers=headers, timeout=5)
     if response.status_code == 200:
         responsetext = "设备状态:" + response.json()["state"] + " "
         logger.bind(tag=TAG).info(f"api返回内容: {response.json()}")
@@ -43,6 +43,7 @@ def initialize_hass_handler(conn):
     plugin_config = conn.config["plugins"][config_source]
     ha_config["base_url"] = plugin_config.get("base_url")
     ha_config["api_key"] = plugin_config.get("api_key")
+    ha_config["music_dir"] = plugin_config.get("music_dir")
 
     # 统一检查API密钥
     model_key_msg = check_model_key("home_assistant", ha_config.get("api_key"))
@@ -1,8 +1,10 @@
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from plugins_func.functions.hass_init import initialize_hass_handler
 from config.logger import setup_logging
+import os
 import asyncio
-import requests
+from core.utils.http_client import get_http_clients
+from core.utils.music_index import get_music_index
 
 TAG = __name__
 logger = setup_logging()
@@ -51,11 +53,30 @@ async def handle_hass_play_music(conn, entity_id, media_content_id):
     ha_config = initialize_hass_handler(conn)
     api_key = ha_config.get("api_key")
     base_url = ha_config.get("base_url")
+    music_dir = ha_config.get("music_dir")
+    if music_dir and media_content_id != "random":
+        # 用本地曲库索引把识别出的歌名纠正为曲库中的名称，首次建立索引不在事件循环中进行
+        best_match = await conn.worker_pools.run(
+            "background", _match_music_name, music_dir, media_content_id
+        )
+        if best_match:
+            logger.bind(tag=TAG).info(f"找到最匹配的歌曲: {best_match}")
+            media_content_id = best_match
     url = f"{base_url}/api/services/music_assistant/play_media"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     data = {"entity_id": entity_id, "media_id": media_content_id}
-    response = requests.post(url, headers=headers, json=data)
+    # 控制类请求不重试，避免重复执行
+    response = get_http_clients().request(
+        "POST", url, retries=0, headers=headers, json=data
+    )
     if response.status_code == 200:
         return f"正在播放{media_content_id}的音乐"
     else:
         return f"音乐播放失败，错误码: {response.status_code}"
+
+
+def _match_music_name(music_dir, media_content_id):
+    best_match = get_music_index(music_dir).best_match(media_content_id)
+    if best_match:
+        return os.path.splitext(os.path.basename(best_match))[0]
+    return None
@@ -2,7 +2,7 @@ from plugins_func.register import register_function, ToolType, ActionResponse, A
 from plugins_func.functions.hass_init import initialize_hass_handler
 from config.logger import setup_logging
 import asyncio
-import requests
+from core.utils.http_client import get_http_clients
 
 TAG = __name__
 logger = setup_logging()
@@ -165,7 +165,10 @@ def handle_hass_set_state(conn, entity_id, state):
         data = {"entity_id": entity_id, arg: value}
     url = f"{base_url}/api/services/{domain}/{action}"
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    response = requests.post(url, headers=headers, json=data, timeout=5)  # 设置5秒超时
+    # 控制类请求不重试，避免重复执行；设置5秒超时
+    response = get_http_clients().request(
+        "POST", url, retries=0, headers=headers, json=data, timeout=5
+    )
     logger.bind(tag=TAG).info(
         f"设置状态:{description},url:{url},return_code:{response.status_code}"
     )
@@ -1,18 +1,19 @@
 import os
 import re
-import time
 import random
-import difflib
 import traceback
-from pathlib import Path
 from core.handle.sendAudioHandle import send_stt_message
 from plugins_func.register import register_function, ToolType, ActionResponse, Action
 from core.utils.dialogue import Message
+from core.utils.music_index import get_music_index
+from core.utils.worker_pool import PoolRejectedError
 from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType, ContentType
 
 TAG = __name__
 
 MUSIC_CACHE = {}
+# 是否正在后台线程池中建立音乐索引
+_index_building = False
 
 play_music_function_desc = {
     "type": "function",
@@ -82,42 +83,9 @@ def _extract_song_name(text):
     return None
 
 
-def _find_best_match(potential_song, music_files):
-    """查找最匹配的歌曲"""
-    best_match = None
-    highest_ratio = 0
-
-    for music_file in music_files:
-        song_name = os.path.splitext(music_file)[0]
-        ratio = difflib.SequenceMatcher(None, potential_song, song_name).ratio()
-        if ratio > highest_ratio and ratio > 0.4:
-            highest_ratio = ratio
-            best_match = music_file
-    return best_match
-
-
-def get_music_files(music_dir, music_ext):
-    music_dir = Path(music_dir)
-    music_files = []
-    music_file_names = []
-    for file in music_dir.rglob("*"):
-        # 判断是否是文件
-        if file.is_file():
-            # 获取文件扩展名
-            ext = file.suffix.lower()
-            # 判断扩展名是否在列表中
-            if ext in music_ext:
-                # 添加相对路径
-                music_files.append(str(file.relative_to(music_dir)))
-                music_file_names.append(
-                    os.path.splitext(str(file.relative_to(music_dir)))[0]
-                )
-    return music_files, music_file_names
-
-
 def initialize_music_handler(conn):
     global MUSIC_CACHE
-    if MUSIC_CACHE == {}:
+    if "index" not in MUSIC_CACHE:
         if "play_music" in conn.config["plugins"]:
             MUSIC_CACHE["music_config"] = conn.config["plugins"]["play_music"]
             MUSIC_CACHE["music_dir"] = os.path.abspath(
@@ -133,17 +101,48 @@ def initialize_music_handler(conn):
             MUSIC_CACHE["music_dir"] = os.path.abspath("./music")
             MUSIC_CACHE["music_ext"] = (".mp3", ".wav", ".p3")
             MUSIC_CACHE["refresh_time"] = 60
-        # 获取音乐文件列表
-        MUSIC_CACHE["music_files"], MUSIC_CACHE["music_file_names"] = get_music_files(
-            MUSIC_CACHE["music_dir"], MUSIC_CACHE["music_ext"]
+        # 音乐索引，目录变化时在后台增量更新
+        MUSIC_CACHE["index"] = get_music_index(
+            MUSIC_CACHE["music_dir"],
+            MUSIC_CACHE["music_ext"],
+            MUSIC_CACHE["refresh_time"],
         )
-        MUSIC_CACHE["scan_time"] = time.time()
+    # 获取音乐文件列表
+    MUSIC_CACHE["music_files"] = MUSIC_CACHE["index"].files()
+    MUSIC_CACHE["music_file_names"] = MUSIC_CACHE["index"].names()
     return MUSIC_CACHE
 
 
+def _build_music_index(conn):
+    global _index_building
+    try:
+        initialize_music_handler(conn)
+    except Exception as e:
+        conn.logger.bind(tag=TAG).error(f"建立音乐索引失败: {e}")
+    finally:
+        _index_building = False
+
+
+def get_ready_music_index(conn):
+    """已建立的音乐索引；尚未建立时提交到后台线程池建立并返回None，不阻塞事件循环"""
+    global _index_building
+    if "index" in MUSIC_CACHE:
+        return MUSIC_CACHE["index"]
+    if not _index_building:
+        _index_building = True
+        try:
+            conn.worker_pools.submit("background", _build_music_index, conn)
+        except PoolRejectedError:
+            _index_building = False
+    return None
+
+
 async def handle_music_command(conn, text):
-    initialize_music_handler(conn)
     global MUSIC_CACHE
+    if "index" not in MUSIC_CACHE:
+        # 首次建立索引需要遍历音乐目录，不在事件循环中进行
+        await conn.worker_pools.run("background", initialize_music_handler, conn)
+    initialize_music_handler(conn)
 
     """处理音乐播放指令"""
     clean_text = re.sub(r"[^\w\s]", "", text).strip()
@@ -151,16 +150,9 @@ async def handle_music_command(conn, text):
 
     # 尝试匹配具体歌名
     if os.path.exists(MUSIC_CACHE["music_dir"]):
-        if time.time() - MUSIC_CACHE["scan_time"] > MUSIC_CACHE["refresh_time"]:
-            # 刷新音乐文件列表
-            MUSIC_CACHE["music_files"], MUSIC_CACHE["music_file_names"] = (
-                get_music_files(MUSIC_CACHE["music_dir"], MUSIC_CACHE["music_ext"])
-            )
-            MUSIC_CACHE["scan_time"] = time.time()
-
         potential_song = _extract_song_name(clean_text)
         if potential_song:
-            best_match = _find_best_match(potential_song, MUSIC_CACHE["music_files"])
+            best_match = MUSIC_CACHE["index"].best_match(potential_song)
             if best_match:
                 conn.logger.bind(tag=TAG).info(f"找到最匹配的歌曲: {best_match}")
                 await play_local_music(conn, specific_file=best_match)
@@ -0,0 +1,17 @@
+import struct
+
+from core.utils.asset_store import OpusAssetStore
+
+
+def test_frames_are_bytes(tmp_path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    frames = [b"\x01\x02\x03", b"", b"\x04" * 40]
+    (assets / "tone.p3").write_bytes(
+        b"".join(struct.pack(">BBH", 0, 0, len(f)) + f for f in frames)
+    )
+    store = OpusAssetStore(str(assets), str(tmp_path / "store"))
+
+    result = store.get_frames(str(assets / "tone.p3"))
+    assert result == frames
+    assert all(type(frame) is bytes for frame in result)
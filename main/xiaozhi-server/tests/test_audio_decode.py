@@ -0,0 +1,91 @@
+import wave
+
+import numpy as np
+import pytest
+
+from core.utils.audio_decode import (
+    PcmFileStream,
+    StreamingResampler,
+    decode_audio_to_pcm,
+    resample_poly,
+)
+
+RATES = (8000, 22050, 24000, 44100, 48000)
+
+
+def _noise(size, seed=0):
+    return (np.random.default_rng(seed).standard_normal(size) * 0.3).astype(np.float32)
+
+
+def _write_wav(path, samples, sample_rate, channels=1):
+    pcm = np.clip(np.rint(samples * 32768), -32768, 32767).astype("<i2")
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+
+
+@pytest.mark.parametrize("rate", RATES)
+def test_resample_poly_keeps_tone(rate):
+    t = np.arange(rate) / rate
+    out = resample_poly(np.sin(2 * np.pi * 440 * t).astype(np.float32), rate, 16000)
+    assert len(out) == 16000
+    expected = np.sin(2 * np.pi * 440 * np.arange(16000) / 16000)
+    # 去掉两端滤波器的过渡区域
+    assert np.max(np.abs(out[200:-200] - expected[200:-200])) < 1e-2
+
+
+def test_resample_poly_same_rate_is_identity():
+    samples = _noise(1000)
+    assert resample_poly(samples, 16000, 16000) is samples
+
+
+@pytest.mark.parametrize("rate", RATES + (16000,))
+def test_streaming_resampler_matches_resample_poly(rate):
+    samples = _noise(30000, seed=rate)
+    expected = resample_poly(samples, rate, 16000)
+
+    resampler = StreamingResampler(rate)
+    chunk_sizes = np.random.default_rng(rate).integers(1, 3000, 100)
+    out, pos = [], 0
+    for size in chunk_sizes:
+        out.append(resampler.feed(samples[pos : pos + size]))
+        pos += size
+        if pos >= len(samples):
+            break
+    out.append(resampler.feed(samples[pos:]))
+    out.append(resampler.flush())
+
+    assert np.array_equal(np.concatenate(out), expected)
+
+
+def test_decode_wav_at_target_format_is_unchanged(tmp_path):
+    path = tmp_path / "a.wav"
+    samples = _noise(1600)
+    _write_wav(path, samples, 16000)
+    with wave.open(str(path), "rb") as wf:
+        raw = wf.readframes(wf.getnframes())
+    assert decode_audio_to_pcm(str(path)) == raw
+
+
+def test_decode_wav_resamples_and_downmixes(tmp_path):
+    path = tmp_path / "stereo.wav"
+    _write_wav(path, np.repeat(_noise(4410), 2), 44100, channels=2)
+    assert len(decode_audio_to_pcm(str(path))) == 1600 * 2
+
+
+def test_pcm_file_stream_matches_full_decode(tmp_path):
+    path = tmp_path / "b.wav"
+    _write_wav(path, _noise(20000), 24000)
+    stream = PcmFileStream(str(path))
+    chunks = []
+    try:
+        while True:
+            chunk = stream.read(1920)
+            chunks.append(chunk)
+            if len(chunk) < 1920:
+                break
+    finally:
+        stream.close()
+    assert b"".join(chunks) == decode_audio_to_pcm(str(path))
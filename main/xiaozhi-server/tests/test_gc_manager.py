@@ -0,0 +1,26 @@
+import gc
+import threading
+
+from core.utils.gc_manager import GlobalGCManager
+
+
+def test_gc_callback_during_snapshot_does_not_deadlock():
+    manager = GlobalGCManager()
+    threshold = gc.get_threshold()
+    gc.callbacks.append(manager._on_gc)
+    gc.set_threshold(1, 1000, 1000)
+
+    def scrape():
+        for _ in range(20):
+            manager.pause_snapshot()
+
+    # 回收可能在持有直方图锁时触发，回调不能因此阻塞
+    worker = threading.Thread(target=scrape, daemon=True)
+    try:
+        worker.start()
+        worker.join(timeout=30)
+    finally:
+        gc.set_threshold(*threshold)
+        gc.callbacks.remove(manager._on_gc)
+    assert not worker.is_alive()
+    assert manager.pause_snapshot()
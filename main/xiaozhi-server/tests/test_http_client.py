@@ -0,0 +1,19 @@
+import httpx
+
+from core.utils.http_client import HttpClientRegistry
+
+
+def test_shared_client_does_not_keep_cookies():
+    def handler(request):
+        return httpx.Response(
+            200,
+            headers={"Set-Cookie": "session=device-a; Path=/"},
+            text=request.headers.get("Cookie", ""),
+        )
+
+    kwargs = dict(HttpClientRegistry()._client_kwargs(), http2=False)
+    with httpx.Client(transport=httpx.MockTransport(handler), **kwargs) as client:
+        assert client.get("http://example.com/").text == ""
+        # 上一个请求返回的Cookie不会带到后续请求
+        assert client.get("http://example.com/").text == ""
+        assert not client.cookies
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from core.utils.intent_classifier import FastIntentClassifier
+
+GET_WEATHER = {
+    "type": "function",
+    "function": {
+        "name": "get_weather",
+        "description": "获取某个地点的天气",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "location": {"type": "string", "description": "地点名"},
+                "lang": {"type": "string", "description": "语言"},
+            },
+            "required": ["lang"],
+        },
+    },
+}
+
+
+@pytest.fixture
+def classifier():
+    return FastIntentClassifier([GET_WEATHER])
+
+
+@pytest.mark.parametrize(
+    "text, location",
+    [
+        ("北京天气", "北京"),
+        ("杭州的天气怎么样", "杭州"),
+        ("查一下明天上海市的天气", "上海市"),
+        ("今天天气怎么样", None),
+    ],
+)
+def test_weather_location(classifier, text, location):
+    intent, rule = classifier.classify(text)
+    call = json.loads(intent)["function_call"]
+    assert rule == "weather"
+    assert call["name"] == "get_weather"
+    assert call["arguments"].get("location") == location
+
+
+@pytest.mark.parametrize(
+    "text", ["你觉得天气怎么样", "聊聊天气", "我讨厌这种天气", "你好天气"]
+)
+def test_weather_rejects_non_place_prefix(classifier, text):
+    assert classifier.classify(text) is None
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from core.providers.vad.silero import CHUNK_SAMPLES, SileroStreamState, VADProvider
+
+CONFIG = {"model_dir": "models/snakers4_silero-vad", "max_batch_size": 2}
+
+
+@pytest.fixture(scope="module")
+def provider():
+    return VADProvider(CONFIG)
+
+
+def _streams(frame_counts):
+    rng = np.random.default_rng(0)
+    t = np.arange(CHUNK_SAMPLES * max(frame_counts)) / 16000
+    streams = []
+    for i, count in enumerate(frame_counts):
+        # 不同连接使用不同的音频，确保状态串了会得到不同结果
+        tone = 0.3 * np.sin(2 * np.pi * (200 + 150 * i) * t)
+        noise = 0.05 * rng.standard_normal(t.shape)
+        audio = (tone + noise)[: CHUNK_SAMPLES * count].astype(np.float32)
+        streams.append(audio.reshape(count, CHUNK_SAMPLES))
+    return streams
+
+
+def _sequential(model, chunks):
+    model.reset_states()
+    return [model(torch.from_numpy(chunk), 16000).item() for chunk in chunks]
+
+
+def test_batched_matches_per_connection(provider):
+    streams = _streams([6, 4, 5])
+    expected = [_sequential(provider.model, chunks) for chunks in streams]
+
+    # 分两次送入，验证各连接的循环状态在批次之间被正确保存
+    states = [SileroStreamState() for _ in streams]
+    first = provider._infer([(s, chunks[:2]) for s, chunks in zip(states, streams)])
+    rest = provider._infer([(s, chunks[2:]) for s, chunks in zip(states, streams)])
+
+    for probs, a, b in zip(expected, first, rest):
+        assert a + b == pytest.approx(probs, abs=1e-5)
@@ -0,0 +1,114 @@
+import pytest
+
+from core.utils import text_segmenter
+from core.utils.text_segmenter import FirstSegmentPolicy, SentenceSegmenter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(text_segmenter, "time", clock)
+    return clock
+
+
+def _feed(segmenter, tokens):
+    return [segmenter.append(token) for token in tokens]
+
+
+def test_first_sentence_cuts_at_comma_then_sentence_end():
+    segmenter = SentenceSegmenter()
+    out = _feed(segmenter, ["你好", "，我是", "小智，今天", "天气不错。我们"])
+    assert out == [None, "你好", None, "我是小智，今天天气不错"]
+    assert segmenter.flush() == "我们"
+    assert segmenter.flush() is None
+
+
+def test_later_sentences_cut_at_last_sentence_end():
+    segmenter = SentenceSegmenter()
+    segmenter.is_first_sentence = False
+    assert segmenter.append("一，二。三") == "一，二"
+    assert segmenter.append("四") is None
+    assert segmenter.append("。五。六") == "三四。五"
+    assert segmenter.flush() == "六"
+
+
+def test_punctuation_inside_code_block_is_not_cut():
+    segmenter = SentenceSegmenter()
+    segmenter.is_first_sentence = False
+    out = _feed(segmenter, ["看```py\nprint('a。b')\n``", "`之后。"])
+    assert out[0] is None
+    assert "print('a。b')" in out[1]
+
+
+def test_reset_starts_a_new_turn():
+    segmenter = SentenceSegmenter()
+    assert segmenter.append("好的，") == "好的"
+    segmenter.append("没说完")
+    segmenter.reset()
+    assert segmenter.pending == ""
+    assert segmenter.append("嗯，") == "嗯"
+
+
+def test_max_chars_prefers_whitespace():
+    segmenter = SentenceSegmenter(max_chars=10)
+    assert segmenter.append("abc def ghi jkl mno") == "abc def"
+    assert segmenter.pending == "ghi jkl mno"
+
+
+def test_max_wait_outputs_buffered_text(clock):
+    segmenter = SentenceSegmenter(max_wait_ms=50)
+    assert segmenter.append("没有标点的句子") is None
+    assert segmenter.wait_timeout(1) == pytest.approx(0.05)
+    clock.now += 0.06
+    assert segmenter.wait_timeout(1) == 0.01
+    assert segmenter.poll() == "没有标点的句子"
+    assert segmenter.wait_timeout(1) == 1
+
+
+def test_first_sentence_deadline_cuts_at_soft_break(clock):
+    segmenter = SentenceSegmenter(
+        first_policy=FirstSegmentPolicy(min_chars=4, deadline_ms=300)
+    )
+    assert segmenter.append("今天天气很好但是明天") is None
+    clock.now += 0.2
+    assert segmenter.poll() is None
+    clock.now += 0.11
+    assert segmenter.poll() == "今天天气很好"
+    assert segmenter.pending == "但是明天"
+    # 第一句之后不再按截止时间切分
+    clock.now += 1
+    assert segmenter.poll() is None
+
+
+def test_first_sentence_deadline_waits_for_min_chars(clock):
+    segmenter = SentenceSegmenter(
+        first_policy=FirstSegmentPolicy(min_chars=8, deadline_ms=50)
+    )
+    segmenter.append("你好")
+    clock.now += 0.1
+    # 文本不足时不空转，等待新文本
+    assert segmenter.wait_timeout(1) == 1
+    assert segmenter.poll() is None
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("今天天气很好但是明天", (5, "conjunction")),
+        ("hello world foo", (11, "whitespace")),
+        ("我们去公园玩了再回", (6, "particle")),
+        ("一二三四五六", (5, "hard")),
+        # 连词之前的文本少于min_chars时不在连词处切分
+        ("好但是明天怎么样", (7, "hard")),
+    ],
+)
+def test_find_cut(text, expected):
+    assert FirstSegmentPolicy(min_chars=4, deadline_ms=300).find_cut(text) == expected
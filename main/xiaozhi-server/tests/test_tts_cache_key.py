@@ -0,0 +1,54 @@
+import pytest
+
+from core.providers.tts import doubao, gpt_sovits_v2, paddle_speech, custom
+
+
+def _cache_key(module, config, text="你好"):
+    return module.TTSProvider(config, delete_audio_file=True)._tts_cache_key(text)
+
+
+@pytest.mark.parametrize(
+    "module, config, field, other",
+    [
+        (
+            gpt_sovits_v2,
+            {"url": "http://127.0.0.1:9880/tts", "ref_audio_path": "a.wav"},
+            "ref_audio_path",
+            "b.wav",
+        ),
+        (
+            paddle_speech,
+            {"url": "ws://127.0.0.1:8092/paddlespeech/tts/streaming", "spk_id": 0},
+            "spk_id",
+            1,
+        ),
+        (
+            doubao,
+            {
+                "voice": "BV001_streaming",
+                "cluster": "volcano_tts",
+                "speed_ratio": 1.0,
+                "access_token": "token",
+            },
+            "speed_ratio",
+            1.5,
+        ),
+        (
+            custom,
+            {"url": "http://127.0.0.1:8080/tts", "params": {"speaker": "a"}},
+            "params",
+            {"speaker": "b"},
+        ),
+    ],
+)
+def test_voice_fields_change_cache_key(module, config, field, other):
+    changed = dict(config, **{field: other})
+    assert _cache_key(module, config) != _cache_key(module, changed)
+
+
+def test_secrets_are_not_part_of_cache_key():
+    config = {"voice": "BV001_streaming", "cluster": "volcano_tts"}
+    first = doubao.TTSProvider(dict(config, access_token="a"), True)
+    second = doubao.TTSProvider(dict(config, access_token="b"), True)
+    assert "access_token" not in first.cache_key_params()["config"]
+    assert first._tts_cache_key("你好") == second._tts_cache_key("你好")
@@ -0,0 +1,40 @@
+import asyncio
+
+from core.providers.vad.base import VADProviderBase
+
+
+class FakeVAD(VADProviderBase):
+    def __init__(self):
+        super().__init__({"batch_interval_ms": 10})
+        self.batches = []
+
+    async def is_vad(self, conn, data):
+        return False
+
+    def _infer(self, requests):
+        self.batches.append([state for state, _ in requests])
+        return [[float(len(chunks))] for _, chunks in requests]
+
+
+def test_frames_from_connections_are_batched():
+    vad = FakeVAD()
+
+    async def run():
+        results = await asyncio.gather(
+            vad._predict("a", [0, 0]), vad._predict("b", [0])
+        )
+        # 没有新帧时批量任务阻塞等待，不会定时空转
+        await asyncio.sleep(0.05)
+        assert not vad._pending_event.is_set()
+        assert not vad._batch_task.done()
+        vad._batch_task.cancel()
+        return results
+
+    assert asyncio.run(run()) == [[2.0], [1.0]]
+    assert vad.batches == [["a", "b"]]
+
+
+def test_empty_batch_interval_falls_back_to_default():
+    vad = FakeVAD.__new__(FakeVAD)
+    VADProviderBase.__init__(vad, {"batch_interval_ms": None})
+    assert vad.batch_interval == 0.01
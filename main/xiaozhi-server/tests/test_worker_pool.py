@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.utils.worker_pool import PoolRejectedError, WorkerPool, WorkerPoolService
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool("test", max_workers=1, max_queue=2)
+    yield pool
+    pool.shutdown()
+
+
+def _block(pool):
+    """占住唯一的工作线程，返回用于放行的事件"""
+    started, release = threading.Event(), threading.Event()
+    pool.submit(lambda: (started.set(), release.wait(5)))
+    assert started.wait(5)
+    return release
+
+
+def test_rejects_when_queue_is_full(pool):
+    release = _block(pool)
+    queued = [pool.submit(lambda: None) for _ in range(2)]
+    with pytest.raises(PoolRejectedError) as excinfo:
+        pool.submit(lambda: None)
+    assert excinfo.value.pool == "test"
+    assert pool.stats()["rejected"] == 1
+
+    release.set()
+    for future in queued:
+        future.result(timeout=5)
+    stats = pool.stats()
+    assert (stats["active"], stats["queued"], stats["completed"]) == (0, 0, 3)
+
+
+def test_cancelled_queued_futures_release_their_slots(pool):
+    release = _block(pool)
+    queued = [pool.submit(lambda: None) for _ in range(2)]
+    assert all(future.cancel() for future in queued)
+    assert pool.stats()["queued"] == 0
+
+    # 取消后的名额可以重新使用
+    again = [pool.submit(lambda: None) for _ in range(2)]
+    release.set()
+    for future in again:
+        future.result(timeout=5)
+    stats = pool.stats()
+    assert (stats["queued"], stats["rejected"]) == (0, 0)
+
+
+def test_shutdown_cancelling_queued_futures_releases_slots(pool):
+    release = _block(pool)
+    queued = [pool.submit(lambda: None) for _ in range(2)]
+    pool.shutdown()
+    assert all(future.cancelled() for future in queued)
+    release.set()
+    assert pool.stats()["queued"] == 0
+
+
+def test_cancelled_run_releases_slot():
+    service = WorkerPoolService(
+        {"worker_pools": {"transcode": {"max_workers": 1, "max_queue": 1}}}
+    )
+    pool = service.get("transcode")
+    release = _block(pool)
+
+    async def cancel_queued_run():
+        task = asyncio.ensure_future(service.run("transcode", lambda: None))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(cancel_queued_run())
+        assert pool.stats()["queued"] == 0
+    finally:
+        release.set()
+        service.shutdown()